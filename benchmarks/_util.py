@@ -0,0 +1,24 @@
+from typing import List, Dict
+
+
+def percentile(values: List[float], q: float) -> float:
+    """q 分位数（0~100），线性插值"""
+    if not values:
+        return float("nan")
+    data = sorted(values)
+    k = (len(data) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(data) - 1)
+    return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    """延迟分布（毫秒）"""
+    ms = [v * 1000 for v in values]
+    return {
+        "count": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else float("nan"),
+    }
@@ -0,0 +1,127 @@
+"""
+路径点表示的内存与分配基准：
+- points: 每点内存占用，对比普通 dataclass（带 __dict__）、__slots__ 版 LLA 与列式 LLABuffer
+- requests: 在仿真地形上跑 plan_route，统计每请求构造的 LLA 对象数与 tracemalloc 峰值
+（瓦片已预热，统计只含搜索、合并与序列化）。无需网络。
+
+    python -m benchmarks.bench_alloc
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import tracemalloc
+from dataclasses import dataclass
+from src.core import grid
+from src.core.grid import LLA
+from src.services import http_service as hs
+from src.sim.sim_query import SimQueryHelper
+from src.sim.maze import obstacle_field
+
+
+@dataclass
+class DictLLA:
+    """未加 __slots__ 的 LLA，作为对照"""
+    lon: float
+    lat: float
+    alt: float
+
+
+def bytes_per_point(build, n: int) -> float:
+    tracemalloc.start()
+    data = build(n)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return round(current / n, 1)
+
+
+def measure_points(n: int) -> dict:
+    result = {
+        "dict_lla": bytes_per_point(lambda k: [DictLLA(0.1 * i, 0.2 * i, -1.0 * i) for i in range(k)], n),
+        "lla": bytes_per_point(lambda k: [LLA(0.1 * i, 0.2 * i, -1.0 * i) for i in range(k)], n),
+    }
+    if hasattr(grid, "LLABuffer"):
+        result["lla_buffer"] = bytes_per_point(
+            lambda k: grid.LLABuffer.from_records([{"lon": 0.1 * i, "lat": 0.2 * i, "alt": -1.0 * i} for i in range(k)]), n)
+    return result
+
+
+class LLACounter:
+    """包装 LLA.__init__，统计期间构造的 LLA 对象数"""
+
+    def __init__(self):
+        self.count = 0
+        self._init = None
+
+    def __enter__(self):
+        self._init = LLA.__init__
+        init = self._init
+
+        def counting_init(obj, *args, **kwargs):
+            self.count += 1
+            init(obj, *args, **kwargs)
+
+        LLA.__init__ = counting_init
+        return self
+
+    def __exit__(self, *exc):
+        LLA.__init__ = self._init
+
+
+async def measure_requests(maze, n: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    free = [(x, y) for y in range(maze.num_lat) for x in range(maze.num_lon) if maze.grid[y][x] == 0]
+    step = maze.step
+    pairs = [rng.sample(free, 2) for _ in range(n)]
+
+    # 预热：生成并缓存全部瓦片
+    for (x1, y1), (x2, y2) in pairs:
+        await hs.plan_route(x1 * step, y1 * step, x2 * step, y2 * step, 0)
+
+    counts, peaks, points = [], [], []
+    for (x1, y1), (x2, y2) in pairs:
+        with LLACounter() as counter:
+            tracemalloc.start()
+            response = await hs.plan_route(x1 * step, y1 * step, x2 * step, y2 * step, 0)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        if response.get("status") != "success":
+            continue
+        counts.append(counter.count)
+        peaks.append(peak)
+        points.append(len(response["path"]))
+    return {
+        "routes": len(counts),
+        "points_per_route": round(sum(points) / len(points), 1),
+        "lla_allocs_per_request": round(sum(counts) / len(counts), 1),
+        "peak_kb_per_request": round(sum(peaks) / len(peaks) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100000, help="每点内存测量的点数")
+    parser.add_argument("--routes", type=int, default=30)
+    parser.add_argument("--size", type=int, default=200, help="地形边长（格）")
+    parser.add_argument("--range-blocks", type=int, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    maze = obstacle_field(args.size, args.size, 0.001, density=0.15, seed=args.seed)
+    hs._global_query_helper = SimQueryHelper(maze, range_blocks=args.range_blocks, cache_precision=maze.step * 5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        requests = asyncio.run(measure_requests(maze, args.routes, args.seed))
+    hs.compute_executor.shutdown()
+
+    result = {
+        "bytes_per_point": measure_points(args.points),
+        "requests": requests,
+    }
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+批量规划吞吐基准：同一组起终点对，分别通过逐个 /path-planning 请求（同等并发）
+与一次 POST /path-planning/batch 规划，比较 routes/s。关闭路线缓存，无需网络。
+
+    python -m benchmarks.bench_batch
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import time
+import httpx
+from src.services import http_service as hs
+from src.services.admission import AdmissionController
+from src.services.route_cache import RouteCache
+from src.sim.sim_query import SimQueryHelper
+from src.sim.maze import obstacle_field
+
+
+def make_pairs(maze, n: int, seed: int):
+    rng = random.Random(seed)
+    free = [(x, y) for y in range(maze.num_lat) for x in range(maze.num_lon) if maze.grid[y][x] == 0]
+    step = maze.step
+    pairs = []
+    for _ in range(n):
+        (x1, y1), (x2, y2) = rng.sample(free, 2)
+        pairs.append({"lon1": x1 * step, "lat1": y1 * step, "lon2": x2 * step, "lat2": y2 * step, "alt": 0})
+    return pairs
+
+
+def reset_service(maze, args):
+    hs._global_query_helper = SimQueryHelper(maze, range_blocks=args.range_blocks,
+                                             latency=args.upstream_latency,
+                                             cache_precision=maze.step * args.cache_cells)
+    hs.route_cache = RouteCache(max_entries=0)
+    hs.planning_admission = AdmissionController(args.workers, len(args.pairs_list) + 1, 3600)
+
+
+async def run_single(client, pairs, workers):
+    sem = asyncio.Semaphore(workers)
+
+    async def one(p):
+        async with sem:
+            return (await client.get("/path-planning", params=p)).json()
+
+    return await asyncio.gather(*(one(p) for p in pairs))
+
+
+async def run(maze, args) -> dict:
+    pairs = args.pairs_list
+    result = {"pairs": len(pairs), "workers": args.workers, "backend": hs.compute_executor.mode}
+    transport = httpx.ASGITransport(app=hs.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        reset_service(maze, args)
+        t = time.perf_counter()
+        single = await run_single(client, pairs, args.workers)
+        elapsed = time.perf_counter() - t
+        result["single"] = {
+            "elapsed_s": round(elapsed, 3),
+            "routes_per_s": round(len(pairs) / elapsed, 3),
+            "succeeded": sum(1 for r in single if r.get("status") == "success"),
+            "upstream_fetches": hs._global_query_helper.fetch_count,
+        }
+
+        reset_service(maze, args)
+        t = time.perf_counter()
+        batch = (await client.post("/path-planning/batch", json={"pairs": pairs, "workers": args.workers})).json()
+        elapsed = time.perf_counter() - t
+        result["batch"] = {
+            "elapsed_s": round(elapsed, 3),
+            "routes_per_s": round(len(pairs) / elapsed, 3),
+            "succeeded": batch["succeeded"],
+            "upstream_fetches": hs._global_query_helper.fetch_count,
+            "grid_reuse": batch["grid_reuse"],
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=100)
+    parser.add_argument("--size", type=int, default=120, help="地形边长（格）")
+    parser.add_argument("--range-blocks", type=int, default=15)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--upstream-latency", type=float, default=0.01)
+    parser.add_argument("--cache-cells", type=int, default=5, help="查询缓存精度（格）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    maze = obstacle_field(args.size, args.size, 0.001, density=0.15, seed=args.seed)
+    args.pairs_list = make_pairs(maze, args.pairs, args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        res = asyncio.run(run(maze, args))
+    hs.compute_executor.shutdown()
+    print(json.dumps(res, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+事件循环响应性基准：在 /path-planning 持续负载下测量 /query-alt 的尾延迟，
+对比 inline / thread / process 三种计算后端。无需网络（上游由 SimQueryHelper 模拟）。
+
+    python -m benchmarks.bench_event_loop
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+import httpx
+from src.services import http_service as hs
+from src.core.executor import ComputeExecutor
+from src.sim.maze import obstacle_field
+from src.sim.sim_query import SimQueryHelper
+from benchmarks._util import latency_summary
+
+
+async def run_backend(mode: str, maze, args) -> dict:
+    step = maze.step
+    hs._global_query_helper = SimQueryHelper(maze, range_blocks=args.range_blocks, latency=args.upstream_latency,
+                                             cache_precision=step)
+    hs.compute_executor = ComputeExecutor(mode, args.workers, 16)
+    transport = httpx.ASGITransport(app=hs.app)
+    probe_lat: list = []
+    plan_lat: list = []
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        probe_params = {"lon": 5 * step, "lat": 5 * step}
+        await client.get("/query-alt", params=probe_params)
+        plan_params = {
+            "lon1": maze.start[0] * step, "lat1": maze.start[1] * step,
+            "lon2": maze.end[0] * step, "lat2": maze.end[1] * step, "alt": 0,
+        }
+
+        async def planner():
+            while not stop.is_set():
+                t = time.perf_counter()
+                await client.get("/path-planning", params=plan_params)
+                plan_lat.append(time.perf_counter() - t)
+                # 全部命中缓存时请求内部可能不产生任何挂起点，主动让出事件循环
+                await asyncio.sleep(0)
+
+        async def prober():
+            # 延迟按“计划发出时刻”计，包含事件循环被计算阻塞而推迟调度的时间
+            while not stop.is_set():
+                t = time.perf_counter() + args.probe_interval
+                await asyncio.sleep(args.probe_interval)
+                await client.get("/query-alt", params=probe_params)
+                probe_lat.append(time.perf_counter() - t)
+
+        tasks = [asyncio.ensure_future(planner()) for _ in range(args.concurrency)]
+        tasks.append(asyncio.ensure_future(prober()))
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+    hs.compute_executor.shutdown()
+    return {
+        "backend": mode,
+        "query_alt": latency_summary(probe_lat),
+        "path_planning": latency_summary(plan_lat),
+        "routes_per_s": round(len(plan_lat) / args.duration, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(ComputeExecutor.MODES))
+    parser.add_argument("--size", type=int, default=160, help="地形边长（格）")
+    parser.add_argument("--range-blocks", type=int, default=21, help="每次查询返回的块数（奇数）")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发规划请求数")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0, help="每种后端的压测时长（秒）")
+    parser.add_argument("--probe-interval", type=float, default=0.02)
+    parser.add_argument("--upstream-latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    maze = obstacle_field(args.size, args.size, 0.001, density=0.15, seed=1)
+    results = []
+    for mode in args.backends:
+        with contextlib.redirect_stdout(io.StringIO()):
+            res = asyncio.run(run_backend(mode, maze, args))
+        results.append(res)
+        print(json.dumps(res, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
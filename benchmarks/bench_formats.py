@@ -0,0 +1,88 @@
+"""
+响应格式基准：对一组真实规划结果，比较各响应格式的编码耗时与字节数
+（FastAPI 默认 JSONResponse 作为基线；orjson / msgpack 未安装时跳过对应项）。无需网络。
+
+    python -m benchmarks.bench_formats
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import time
+from fastapi.responses import JSONResponse
+from src.services import http_service as hs
+from src.services import formats
+from src.sim.sim_query import SimQueryHelper
+from src.sim.maze import obstacle_field
+
+
+async def plan_routes(maze, n: int, seed: int) -> list:
+    rng = random.Random(seed)
+    free = [(x, y) for y in range(maze.num_lat) for x in range(maze.num_lon) if maze.grid[y][x] == 0]
+    step = maze.step
+    routes = []
+    while len(routes) < n:
+        (x1, y1), (x2, y2) = rng.sample(free, 2)
+        response = await hs.plan_route(x1 * step, y1 * step, x2 * step, y2 * step, 0)
+        if response.get("status") == "success":
+            routes.append(response)
+    return routes
+
+
+def response_bytes(response) -> int:
+    """响应体字节数，binary 格式另计放在 X-Route-Meta 头中的元信息"""
+    return len(response.body) + len(response.headers.get("x-route-meta", ""))
+
+
+def measure(render, routes: list, repeat: int) -> dict:
+    sizes = [response_bytes(render(r)) for r in routes]
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for r in routes:
+            render(r)
+    elapsed = time.perf_counter() - t
+    return {
+        "bytes_per_route": round(sum(sizes) / len(sizes), 1),
+        "encode_us_per_route": round(elapsed / (repeat * len(routes)) * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=50)
+    parser.add_argument("--size", type=int, default=200, help="地形边长（格）")
+    parser.add_argument("--range-blocks", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    maze = obstacle_field(args.size, args.size, 0.001, density=0.15, seed=args.seed)
+    hs._global_query_helper = SimQueryHelper(maze, range_blocks=args.range_blocks, cache_precision=maze.step * 5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        routes = asyncio.run(plan_routes(maze, args.routes, args.seed))
+    hs.compute_executor.shutdown()
+
+    cases = {
+        "json_default": lambda r: JSONResponse(r),
+        "json": lambda r: formats.render_route(r, "json"),
+        "polyline": lambda r: formats.render_route(r, "polyline"),
+        "binary_f8": lambda r: formats.render_route(r, "binary", "f8"),
+        "binary_f4": lambda r: formats.render_route(r, "binary", "f4"),
+    }
+    if formats.msgpack is not None:
+        cases["msgpack_f8"] = lambda r: formats.render_route(r, "msgpack", "f8")
+        cases["msgpack_f4"] = lambda r: formats.render_route(r, "msgpack", "f4")
+
+    result = {
+        "routes": len(routes),
+        "points_per_route": round(sum(len(r["path"]) for r in routes) / len(routes), 1),
+        "orjson": formats.orjson is not None,
+        "formats": {name: measure(render, routes, args.repeat) for name, render in cases.items()},
+    }
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
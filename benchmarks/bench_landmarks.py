@@ -0,0 +1,110 @@
+"""
+地标（ALT）启发式基准：同一网格上以八向距离与 max(八向距离, ALT) 分别执行 A*，
+比较扩展节点数与搜索耗时（同进程交替运行），并校验两者路径代价一致；同时给出地标代价表的构建耗时与内存。
+地形默认为 Maze（DFS 迷宫），可追加 src.sim.terrain 的生成器对比；起终点取在最大连通区域内。无需网络。
+
+    python -m benchmarks.bench_landmarks
+    python -m benchmarks.bench_landmarks --size 201 --landmarks 4 8 16 --terrains maze perfect-maze obstacles fractal
+"""
+import argparse
+import json
+import math
+import random
+import statistics
+import time
+from typing import List, Tuple
+import numpy as np
+from src.core.astar import AStar
+from src.core.grid import component_labels
+from src.core.landmarks import LandmarkTable
+from src.sim import terrain
+from src.sim.maze import Maze
+
+STEP = 0.001
+
+
+def make_terrain(name: str, size: int, seed: int) -> terrain.Terrain:
+    if name == "maze":
+        random.seed(seed)
+        return terrain.Terrain.from_maze(Maze(size, size, STEP))
+    if name == "perfect-maze":
+        return terrain.maze(size, size, STEP, seed=seed)
+    if name == "obstacles":
+        return terrain.obstacles(size, size, STEP, density=0.3, seed=seed)
+    return terrain.fractal(size, size, STEP, seed=seed)
+
+
+def build_astar(t: terrain.Terrain) -> AStar:
+    """整个地形作为一个网格（窗口覆盖全图）"""
+    size = max(t.num_lon, t.num_lat)
+    range_blocks = size // 2 + 1
+    range_blocks += 1 - range_blocks % 2
+    astar = AStar(0.0)
+    astar.init_arrays(t.window(t.num_lon * STEP / 2, t.num_lat * STEP / 2, range_blocks))
+    return astar
+
+
+def od_pairs(astar: AStar, n: int, seed: int) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    labels = component_labels(np.asarray(astar.altitude) <= astar.thred)
+    largest = int(np.argmax(np.bincount(labels.ravel())[1:])) + 1
+    cells = list(zip(*(v.tolist() for v in np.nonzero(labels == largest))))
+    rng = random.Random(seed)
+    return [tuple(rng.sample(cells, 2)) for _ in range(n)]
+
+
+def path_cost(astar: AStar, path) -> float:
+    return sum(astar.heuristic8d_idx(a, b) for a, b in zip(path, path[1:]))
+
+
+def bench(name: str, size: int, counts: List[int], pairs: int, seed: int) -> List[dict]:
+    astar = build_astar(make_terrain(name, size, seed))
+    queries = od_pairs(astar, pairs, seed)
+    rows = []
+    for count in counts:
+        t0 = time.perf_counter()
+        table = LandmarkTable.build(astar, count)
+        build_s = time.perf_counter() - t0
+        exp = {"octile": [], "alt": []}
+        secs = {"octile": 0.0, "alt": 0.0}
+        mismatched = 0
+        for start, end in queries:
+            astar.set_start_idx(start)
+            astar.set_end_idx(end)
+            costs = {}
+            for mode in ("octile", "alt"):
+                astar.use_landmarks([table] if mode == "alt" else [])
+                t0 = time.perf_counter()
+                path, _ = astar.path_plan()
+                secs[mode] += time.perf_counter() - t0
+                exp[mode].append(astar.expansions)
+                costs[mode] = path_cost(astar, path)
+            mismatched += not math.isclose(costs["octile"], costs["alt"], rel_tol=1e-6)
+        rows.append({
+            "terrain": name, "cells": astar.num_lon * astar.num_lat, "landmarks": table.count,
+            "build_s": round(build_s, 3), "table_mb": round(table.nbytes / 1e6, 2), "pairs": len(queries),
+            "expansions_octile": int(statistics.median(exp["octile"])),
+            "expansions_alt": int(statistics.median(exp["alt"])),
+            "expansion_ratio": round(sum(exp["alt"]) / max(1, sum(exp["octile"])), 3),
+            "search_ms_octile": round(secs["octile"] / len(queries) * 1000, 3),
+            "search_ms_alt": round(secs["alt"] / len(queries) * 1000, 3),
+            "cost_mismatch": mismatched,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=121, help="地形边长（格）")
+    parser.add_argument("--landmarks", type=int, nargs="+", default=[4, 8, 16], help="地标数")
+    parser.add_argument("--terrains", nargs="+", default=["maze"],
+                        choices=["maze", "perfect-maze", "obstacles", "fractal"])
+    parser.add_argument("--pairs", type=int, default=30, help="随机起终点对数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for name in args.terrains:
+        for row in bench(name, args.size, args.landmarks, args.pairs, args.seed):
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
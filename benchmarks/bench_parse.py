@@ -0,0 +1,79 @@
+"""
+高程响应解析基准：同一上游 JSON 响应，对比
+- llas: 标准库 json 解析 + 每点一个 LLA + Grid.init（原有路径）
+- columns: parse_elevation 直接解析为列式 LLABuffer + 向量化 Grid.init_arrays
+每瓦片的解析/建网格耗时、峰值内存（tracemalloc）与解析结果常驻缓存的大小。无需网络。
+
+    python -m benchmarks.bench_parse
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from src.core.grid import LLA, Grid
+from src.services.query import parse_elevation, estimate_entry_bytes, orjson
+
+
+def make_payload(side: int, seed: int) -> bytes:
+    """side × side 的规则高程方阵（按经度、纬度排序），与上游返回格式一致"""
+    rng = random.Random(seed)
+    step = 0.001
+    data = [
+        {"lon": 121.0 + i * step, "lat": 25.0 + j * step, "alt": round(-rng.uniform(0, 50), 2)}
+        for i in range(side) for j in range(side)
+    ]
+    return json.dumps({"code": 0, "data": data}).encode("utf-8")
+
+
+def parse_llas(content: bytes):
+    data_list = json.loads(content).get("data", [])
+    return [LLA(item["lon"], item["lat"], item.get("alt", 0)) for item in data_list]
+
+
+def measure(parse, content: bytes, repeat: int) -> dict:
+    tracemalloc.start()
+    Grid().init(parse(content))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    parse_s = build_s = 0.0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        data = parse(content)
+        t1 = time.perf_counter()
+        Grid().init(data)
+        t2 = time.perf_counter()
+        parse_s += t1 - t0
+        build_s += t2 - t1
+    return {
+        "parse_ms": round(parse_s / repeat * 1000, 3),
+        "grid_init_ms": round(build_s / repeat * 1000, 3),
+        "total_ms": round((parse_s + build_s) / repeat * 1000, 3),
+        "peak_mb": round(peak / 1024 / 1024, 3),
+        # 解析结果常驻查询缓存的估算大小
+        "retained_mb": round(estimate_entry_bytes(parse(content)) / 1024 / 1024, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sides", type=int, nargs="+", default=[30, 100, 200], help="瓦片边长（点）")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = {"orjson": orjson is not None, "tiles": []}
+    for side in args.sides:
+        content = make_payload(side, args.seed)
+        result["tiles"].append({
+            "points": side * side,
+            "payload_kb": round(len(content) / 1024, 1),
+            "llas": measure(parse_llas, content, args.repeat),
+            "columns": measure(parse_elevation, content, args.repeat),
+        })
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
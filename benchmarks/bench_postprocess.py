@@ -0,0 +1,251 @@
+"""
+轨迹后处理基准：随机生成带回退、回环与重复点的格网原始路径（默认 10k 点），对比
+- legacy: 原逐点实现（LLA 列表、多遍 Python 循环、O(n²) 回环检测），保留在此作为对照
+- pipeline: postprocess 流水线（列式数组、向量化去重/共线、空间哈希回环检测）
+的耗时，并校验两者输出一致；另给出追加 Douglas–Peucker 抽稀后的点数。无需网络。
+
+    python -m benchmarks.bench_postprocess
+"""
+import argparse
+import json
+import random
+import time
+from typing import List, Optional
+from src.core.grid import LLA, LLABuffer, distance
+from src.core.path_planner import is_colinear, merge_trajectories_smart
+
+
+def legacy_merge(
+    trajectory_segments,
+    tol=0.0001,
+    origin: Optional[LLA] = None,
+    target: Optional[LLA] = None,
+    gap_lon: Optional[float] = None,
+    gap_lat: Optional[float] = None
+):
+    """
+    合并多段轨迹：
+    1. 去掉重复点与过近点；
+    2. 合并成一条连续轨迹；
+    3. 共线点只保留首尾两点。
+    """
+    if not trajectory_segments:
+        return []
+
+    merged = []
+    for seg in trajectory_segments:
+        if not seg:
+            continue
+        if not merged:
+            merged.extend(seg)
+        else:
+            if merged[-1] == seg[0]:
+                merged.extend(seg[1:])
+            else:
+                merged.extend(seg)
+
+    filtered = [merged[0]]
+    for p in merged[1:]:
+        if distance(filtered[-1].lon, filtered[-1].lat, p.lon, p.lat) < tol:
+            continue
+        filtered.append(p)
+
+    result = [filtered[0]]
+    for i in range(1, len(filtered) - 1):
+        if is_colinear(filtered[i - 1], filtered[i], filtered[i + 1]):
+            continue
+        result.append(filtered[i])
+    result.append(filtered[-1])
+
+    # 反向回退消除：若出现 A->B->C->B->A（或局部 C->B）等回退段，消去重复路段
+    def lla_close(p: LLA, q: LLA, eps: float) -> bool:
+        return distance(p.lon, p.lat, q.lon, q.lat) < eps
+
+    stack: List[LLA] = []
+    for pt in result:
+        if stack and lla_close(stack[-1], pt, tol):
+            # 相邻重复点，跳过
+            continue
+        if len(stack) >= 2 and lla_close(stack[-2], pt, tol):
+            # 发现回退（... X, Y, X），消去 Y，并不压入 pt（等价回到 X）
+            stack.pop()
+            continue
+        stack.append(pt)
+    result = stack
+
+    # 相邻反向重叠消除：仅针对相邻两段（避免影响正常同向轨迹）
+    #    若出现 ... A->B->C 且新段 B->C 与上段 A->B 近似共线且方向明显相反，则弹出 B（合并反向段）
+    def colinear(a: LLA, b: LLA, c: LLA, ang_eps: float = 1e-3) -> bool:
+        v1x, v1y = b.lon - a.lon, b.lat - a.lat
+        v2x, v2y = c.lon - a.lon, c.lat - a.lat
+        # 归一化夹角余弦接近 ±1 视为共线
+        da = (v1x*v1x + v1y*v1y) ** 0.5
+        db = (v2x*v2x + v2y*v2y) ** 0.5
+        if da == 0 or db == 0:
+            return True
+        cosv = (v1x*v2x + v1y*v2y) / (da*db)
+        return abs(1.0 - abs(cosv)) < ang_eps
+
+    simp: List[LLA] = []
+    for p in result:
+        if not simp:
+            simp.append(p)
+            continue
+        # 相邻反向重叠，仅移除“回退”点，不改动正常同向行进
+        if len(simp) >= 2:
+            a2 = simp[-1]
+            a1 = simp[-2]
+            # 共线且方向明显相反且与上段有足够重叠（通过中点距离近似判断）
+            v1x, v1y = a2.lon - a1.lon, a2.lat - a1.lat
+            v2x, v2y = p.lon - a2.lon, p.lat - a2.lat
+            da = (v1x*v1x + v1y*v1y) ** 0.5
+            db = (v2x*v2x + v2y*v2y) ** 0.5
+            cosv = 1.0 if da == 0 or db == 0 else (v1x*v2x + v1y*v2y) / (da*db)
+            if colinear(a1, a2, p) and cosv < -0.99:
+                # 检查重叠长度（近似：a1-a2 与 a2-p 的较短长度是否>阈值）
+                min_km = 0.03
+                if min(da, db) > min_km:
+                    simp.pop()  # 移除回退点 a2
+                    # 可能仍有回退，继续用新的末尾再判一次
+                    if len(simp) >= 1:
+                        a2 = simp[-1]
+        # 追加当前点
+        if not simp or distance(simp[-1].lon, simp[-1].lat, p.lon, p.lat) >= tol:
+            simp.append(p)
+    result = simp
+
+    # 近点回环合并：若出现 ... A -> X -> ... -> A'（A' 接近 A）则收缩为 ... A（或 A -> A'）
+    def loop_prune(points: List[LLA]) -> List[LLA]:
+        if not points:
+            return points
+        kept: List[LLA] = []
+        for p in points:
+            # 基于格网间距估计“近点”阈值（单位：km）
+            if gap_lon is not None and gap_lat is not None:
+                # 使用当前纬度估算经、纬方向的 1 格物理长度
+                km_lon = distance(p.lon, p.lat, p.lon + gap_lon, p.lat)
+                km_lat = distance(p.lon, p.lat, p.lon, p.lat + gap_lat)
+                near_km = max(km_lon, km_lat) * 1.2  # 略放宽
+            else:
+                near_km = 0.03  # ~30m 作为保守近点阈值
+
+            def is_adjacent_grid(a: LLA, b: LLA) -> bool:
+                if gap_lon and gap_lat and gap_lon > 0 and gap_lat > 0:
+                    dx = round((b.lon - a.lon) / gap_lon)
+                    dy = round((b.lat - a.lat) / gap_lat)
+                    return max(abs(dx), abs(dy)) <= 1
+                # 回退：没有格距时用物理近邻
+                return distance(a.lon, a.lat, b.lon, b.lat) < near_km
+
+            # 查找是否接近某个历史点 A
+            merged = False
+            for j in range(len(kept)):
+                # 仅当存在中间段（j 严格小于当前末尾）时才认为是“回环”
+                if j < len(kept) - 1 and is_adjacent_grid(kept[j], p):
+                    # 收缩为 ... A（丢弃中间回环段），A 即 kept[j]
+                    kept = kept[:j+1]
+                    merged = True
+                    break
+            if not merged:
+                # 正常追加
+                if not kept or distance(kept[-1].lon, kept[-1].lat, p.lon, p.lat) >= tol:
+                    kept.append(p)
+        return kept
+
+    result = loop_prune(result)
+
+    # 首尾方向一致性修正：避免相邻两点与端点方向发生>90°的反向折返
+    def angle_cos(ax, ay, bx, by):
+        da = (ax**2 + ay**2) ** 0.5
+        db = (bx**2 + by**2) ** 0.5
+        if da == 0 or db == 0:
+            return 1.0
+        return (ax * bx + ay * by) / (da * db)
+
+    # 首端修正：比较 (origin->first) 与 (first->second)
+    if origin is not None and len(result) >= 2:
+        f0, f1 = result[0], result[1]
+        v1x, v1y = f1.lon - f0.lon, f1.lat - f0.lat
+        v0x, v0y = f0.lon - origin.lon, f0.lat - origin.lat
+        # 角度 > 90° 等价于余弦 < 0
+        if angle_cos(v0x, v0y, v1x, v1y) < 0:
+            # 将起点段改为 origin -> second（丢弃第一个点）
+            result = [f1] + result[2:]
+
+    # 末端修正：比较 (second_last->last) 与 (last->target)
+    if target is not None and len(result) >= 2:
+        p_last = result[-1]
+        p_prev = result[-2]
+        v1x, v1y = p_last.lon - p_prev.lon, p_last.lat - p_prev.lat
+        v2x, v2y = target.lon - p_last.lon, target.lat - p_last.lat
+        if angle_cos(v1x, v1y, v2x, v2y) < 0:
+            # 将最后一段改为 second_last -> target（丢弃最后一个点）
+            result = result[:-1]
+
+    return result
+
+
+def raw_path(points: int, segments: int, gap: float, seed: int) -> List[List[LLA]]:
+    """格网上的随机游走，含原地停留、回退与绕圈，按段切分（相邻段首尾相接）"""
+    rng = random.Random(seed)
+    x, y = 0, 0
+    walk = [(x, y)]
+    while len(walk) < points:
+        r = rng.random()
+        if r < 0.05:
+            pass
+        elif r < 0.1 and len(walk) > 1:
+            x, y = walk[-2]
+        else:
+            x += rng.choice((-1, 0, 1, 1))
+            y += rng.choice((-1, 0, 1, 1))
+        walk.append((x, y))
+    llas = [LLA(121.0 + i * gap, 25.0 + j * gap, -5.0) for i, j in walk]
+    size = max(2, len(llas) // segments)
+    return [llas[k:k + size + 1] for k in range(0, len(llas) - 1, size)]
+
+
+def timed(fn, repeat: int):
+    out = fn()
+    t = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return out, (time.perf_counter() - t) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--segments", type=int, default=20, help="每条路径的分段数（对应逐跳规划的跳数）")
+    parser.add_argument("--gap", type=float, default=0.001, help="格距（度）")
+    parser.add_argument("--simplify-km", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = []
+    for n in args.points:
+        segments = raw_path(n, args.segments, args.gap, args.seed)
+        origin, target = segments[0][0], segments[-1][-1]
+        kwargs = dict(origin=origin, target=target, gap_lon=args.gap, gap_lat=args.gap)
+        buffers = [LLABuffer.from_llas(s) for s in segments]
+
+        old, old_s = timed(lambda: legacy_merge(segments, **kwargs), args.repeat)
+        new, new_s = timed(lambda: merge_trajectories_smart(buffers, **kwargs), args.repeat)
+        simp, simp_s = timed(lambda: merge_trajectories_smart(buffers, simplify_km=args.simplify_km, **kwargs),
+                             args.repeat)
+        result.append({
+            "raw_points": sum(len(s) for s in segments),
+            "out_points": len(new),
+            "identical": [(p.lon, p.lat, p.alt) for p in old] == [(p.lon, p.lat, p.alt) for p in new],
+            "legacy_ms": round(old_s * 1000, 2),
+            "pipeline_ms": round(new_s * 1000, 2),
+            "speedup": round(old_s / new_s, 1),
+            "douglas_peucker": {"epsilon_km": args.simplify_km, "out_points": len(simp),
+                                "ms": round(simp_s * 1000, 2)},
+        })
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
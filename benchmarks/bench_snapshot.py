@@ -0,0 +1,63 @@
+"""
+网格快照基准：同一瓦片由原始采样点构建网格（Grid.init / init_arrays）与从快照加载（npz / 目录内存映射）的耗时，
+以及快照文件大小。无需网络。
+
+    python -m benchmarks.bench_snapshot
+    python -m benchmarks.bench_snapshot --range-blocks 21 101 201 --labels
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from src.core.astar import AStar
+from src.sim import terrain
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def dir_bytes(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, n)) for n in os.listdir(path))
+
+
+def bench(range_blocks: int, labels: bool, repeat: int) -> dict:
+    size = range_blocks * 2 + 10
+    t = terrain.obstacles(size, size, 0.001, density=0.2, seed=0)
+    tile = t.window(size * 0.0005, size * 0.0005, range_blocks)
+    llas = tile.tolist()
+    row = {"range_blocks": range_blocks, "cells": len(tile)}
+    row["init_ms"] = round(best_of(lambda: AStar(0.0).init(llas), repeat) * 1000, 3)
+    row["init_arrays_ms"] = round(best_of(lambda: AStar(0.0).init_arrays(tile), repeat) * 1000, 3)
+    src = AStar(0.0)
+    src.init_arrays(tile)
+    with tempfile.TemporaryDirectory() as d:
+        for name, path in (("npz", os.path.join(d, "tile.npz")), ("mmap", os.path.join(d, "tile"))):
+            t0 = time.perf_counter()
+            src.save_snapshot(path, obstacle=labels, labels=labels)
+            row[f"save_{name}_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+            row[f"load_{name}_ms"] = round(best_of(lambda: AStar(0.0).load_snapshot(path), repeat) * 1000, 3)
+            row[f"{name}_bytes"] = dir_bytes(path)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--range-blocks", type=int, nargs="+", default=[21, 101])
+    parser.add_argument("--labels", action="store_true", help="快照附带障碍掩码与连通区域标号层（计入保存耗时）")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for rb in args.range_blocks:
+        print(json.dumps(bench(rb, args.labels, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
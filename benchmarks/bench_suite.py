@@ -0,0 +1,319 @@
+"""
+离线基准套件：网格构建、搜索与合并热点，覆盖 20² ~ 2000² 网格与多种障碍密度，无需网络。
+- grid.data_init / grid.init / grid.init2 / grid.init_arrays: 规则方阵瓦片建网格
+- astar.path_plan: 对角 A*（附扩展节点数）
+- astar.get_terminal_bound: 取尽全部边界候选终点
+- astar.straight_check: 固定的一组随机线段直线可通检测
+- merge.merge_trajectories_smart: 带回退、回环与重复点的原始路径合并（点数随网格边长增长）
+
+结果写入 --output（JSON），并与基线（默认 benchmarks/baseline.json）逐用例对比耗时：
+- 默认取多次运行的最小值（受机器抖动影响比中位数小）
+- 可选 --normalize：按每个用例前后测得的固定校准负载耗时折算机器整体快慢（校准本身也有抖动，默认关闭）
+- 慢于基线超过 --tolerance（且差值超过 --noise-ms）的用例重测至多 --retries 次，仍慢才记为回退
+存在回退时退出码为 1。基线与机器相关，换机器后先用 --save-baseline 重新生成。
+纯 Python 的 init / init2 / data_init 在大网格上很慢，默认规模只到 500²，--full 才覆盖到 2000²（init2 最多 500²）。
+
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --only astar --sizes 100 500
+    python -m benchmarks.bench_suite --full --output full.json
+    python -m benchmarks.bench_suite --save-baseline
+"""
+import argparse
+import gc
+import heapq
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from src.core.grid import LLA, LLABuffer, Grid
+from src.core.astar import AStar
+from src.core.path_planner import merge_trajectories_smart
+from benchmarks.bench_postprocess import raw_path
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+GAP = 0.001
+THRED = 0.0
+FREE_ALT, OBSTACLE_ALT = -20.0, 10.0
+
+# 名称 -> (默认网格边长, --full 追加的边长, 是否按障碍密度展开)
+BENCHMARKS: Dict[str, Tuple[List[int], List[int], bool]] = {
+    "grid.data_init": ([20, 100, 500], [1000, 2000], False),
+    "grid.init": ([20, 100, 300], [500, 1000, 2000], False),
+    "grid.init2": ([20, 100], [300, 500], False),
+    "grid.init_arrays": ([20, 100, 500, 1000], [2000], False),
+    "astar.path_plan": ([20, 100, 300], [500, 1000, 2000], True),
+    "astar.get_terminal_bound": ([20, 100, 500], [1000, 2000], True),
+    "astar.straight_check": ([20, 100, 500], [1000, 2000], True),
+    "merge.merge_trajectories_smart": ([20, 100, 500], [1000, 2000], False),
+}
+# 0.0 为无障碍：A* 走对角最优情形，直线检测每条线段都检查到终点
+DENSITIES = [0.0, 0.1, 0.3]
+
+
+def tile(n: int, density: float, seed: int = 0) -> LLABuffer:
+    """n×n 规则方阵瓦片（经度为外层、纬度为内层，与上游返回顺序一致），四角 3×3 保持可通行"""
+    rng = np.random.default_rng(seed)
+    obstacle = rng.random((n, n)) < density
+    for xs in (slice(0, 3), slice(-3, None)):
+        for ys in (slice(0, 3), slice(-3, None)):
+            obstacle[xs, ys] = False
+    xs, ys = np.meshgrid(np.arange(n), np.arange(n), indexing="ij")
+    alt = np.where(obstacle, OBSTACLE_ALT, FREE_ALT)
+    return LLABuffer((121.0 + xs * GAP).ravel(), (25.0 + ys * GAP).ravel(), alt.ravel())
+
+
+def build_astar(n: int, density: float) -> AStar:
+    astar = AStar(THRED)
+    astar.init_arrays(tile(n, density))
+    return astar
+
+
+def setup(name: str, n: int, density: Optional[float]) -> Tuple[Callable[[], object], Callable[[object], Dict]]:
+    """返回 (被测函数, 由其返回值得到附加信息的函数)；准备工作不计入耗时"""
+    def no_extra(_):
+        return {}
+
+    if name.startswith("grid."):
+        buf = tile(n, 0.2)
+        data = buf.tolist()
+        if name == "grid.data_init":
+            return lambda: Grid(THRED).data_init(data, []), no_extra
+        if name == "grid.init":
+            return lambda: Grid(THRED).init(data), no_extra
+        if name == "grid.init2":
+            return lambda: Grid(THRED).init2(data), no_extra
+        return lambda: Grid(THRED).init_arrays(buf), no_extra
+
+    if name == "merge.merge_trajectories_smart":
+        segments = raw_path(n * 10, max(2, n // 20), GAP, 0)
+        buffers = [LLABuffer.from_llas(s) for s in segments]
+        kwargs = dict(origin=segments[0][0], target=segments[-1][-1], gap_lon=GAP, gap_lat=GAP)
+        return (lambda: merge_trajectories_smart(buffers, **kwargs),
+                lambda out: {"points_in": sum(len(b) for b in buffers), "points_out": len(out)})
+
+    astar = build_astar(n, density)
+    if name == "astar.path_plan":
+        def run():
+            astar.set_start_idx((0, 0))
+            astar.set_end_idx((n - 1, n - 1))
+            return astar.path_plan()
+        return run, lambda out: {"found": out[1], "path_len": len(out[0]), "expansions": astar.expansions}
+
+    if name == "astar.get_terminal_bound":
+        ori = astar.index_to_lla((n // 2, n // 2))
+        ter = LLA(astar.max_lon + 10 * GAP, astar.max_lat + 3 * GAP, 0.0)
+        return lambda: list(astar.get_terminal_bound(ori, ter)), lambda out: {"candidates": len(out)}
+
+    # astar.straight_check：固定种子的 200 条随机线段
+    rng = random.Random(0)
+    segments = []
+    for _ in range(200):
+        a = (rng.randrange(n), rng.randrange(n))
+        b = (rng.randrange(n), rng.randrange(n))
+        segments.append((astar.index_to_lla(a), astar.index_to_lla(b), a, b))
+    return (lambda: sum(astar.straight_check(*s) for s in segments),
+            lambda out: {"segments": len(segments), "clear": out})
+
+
+def measure(fn: Callable[[], object], repeat: int, budget: float) -> Tuple[object, List[float]]:
+    """
+    至少跑一次；之后在 budget 秒内最多再跑 repeat - 1 次。计时期间关闭 GC（与 timeit 相同）；
+    首次运行不足 budget 的十分之一时先预热一次，不计入结果。
+    """
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        t0 = time.perf_counter()
+        out = fn()
+        first = time.perf_counter() - t0
+        if first >= budget / 10:
+            times.append(first)
+        t_end = time.perf_counter() + budget
+        while len(times) < repeat and (not times or time.perf_counter() < t_end):
+            t0 = time.perf_counter()
+            out = fn()
+            times.append(time.perf_counter() - t0)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return out, times
+
+
+def _calibration_work():
+    """固定的纯 Python 负载（堆操作 + 字典 + 浮点），与 A*、建网格的热点相近"""
+    heap, seen = [], {}
+    for i in range(4000):
+        heapq.heappush(heap, ((i * 7919) % 4001 * 0.5, i))
+        seen[i] = math.sqrt(i) * 0.5
+    while heap:
+        heapq.heappop(heap)
+    return len(seen)
+
+
+def calibrate(runs: int = 5) -> float:
+    """校准负载的最小耗时（毫秒），用于抵消机器整体快慢的漂移"""
+    return round(min(measure(_calibration_work, runs, 0.0)[1]) * 1000, 4)
+
+
+def case_key(name: str, n: int, density: Optional[float]) -> str:
+    return f"{name}/n={n}" + (f"/d={density}" if density is not None else "")
+
+
+def cases(names: List[str], sizes: Optional[List[int]], full: bool,
+          densities: List[float]) -> List[Tuple[str, str, int, Optional[float]]]:
+    """展开为 (用例键, 基准名, 网格边长, 障碍密度) 列表"""
+    out = []
+    for name in names:
+        default_sizes, full_sizes, by_density = BENCHMARKS[name]
+        for n in sizes or (default_sizes + (full_sizes if full else [])):
+            for density in (densities if by_density else [None]):
+                out.append((case_key(name, n, density), name, n, density))
+    return out
+
+
+def run_case(name: str, n: int, density: Optional[float], repeat: int, budget: float) -> Dict:
+    fn, extra = setup(name, n, density)
+    calib = calibrate()
+    out, times = measure(fn, repeat, budget)
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "min_ms": round(min(times) * 1000, 3),
+        "runs": len(times),
+        "calibration_ms": min(calib, calibrate()),
+        **extra(out),
+    }
+
+
+def run_suite(names: List[str], sizes: Optional[List[int]], full: bool, densities: List[float],
+              repeat: int, budget: float, log=None) -> Dict[str, Dict]:
+    results = {}
+    for key, name, n, density in cases(names, sizes, full, densities):
+        results[key] = run_case(name, n, density, repeat, budget)
+        if log is not None:
+            log(f"{key:<48} {results[key]['median_ms']:>12.3f} ms  (runs={results[key]['runs']})")
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float,
+            noise_ms: float, metric: str = "min_ms", normalize: bool = False) -> Dict[str, Dict]:
+    """
+    逐用例对比耗时（metric 为 min_ms 或 median_ms）；status 为 regression / improvement / ok，基线中没有的用例为 new。
+    normalize 时按用例前后测得的校准耗时折算，抵消运行期间机器整体变快/变慢。
+    """
+    report = {}
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if base is None:
+            report[key] = {"status": "new"}
+            continue
+        speed = 1.0
+        if normalize and cur.get("calibration_ms") and base.get("calibration_ms"):
+            speed = base["calibration_ms"] / cur["calibration_ms"]
+        value = cur[metric] * speed
+        ratio = value / base[metric] if base[metric] > 0 else float("inf")
+        delta = value - base[metric]
+        if ratio > 1 + tolerance and delta > noise_ms:
+            status = "regression"
+        elif ratio < 1 / (1 + tolerance) and -delta > noise_ms:
+            status = "improvement"
+        else:
+            status = "ok"
+        report[key] = {"status": status, "baseline_ms": base[metric], "ratio": round(ratio, 3),
+                       "machine_speed": round(speed, 3)}
+    return report
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", default=None,
+                        help="只跑名称以这些前缀开头的基准，如 grid astar.path_plan")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None, help="覆盖各基准的网格边长")
+    parser.add_argument("--full", action="store_true", help="追加大网格（到 2000²），耗时较长")
+    parser.add_argument("--densities", type=float, nargs="+", default=DENSITIES)
+    parser.add_argument("--repeat", type=int, default=7, help="每个用例最多运行次数")
+    parser.add_argument("--budget", type=float, default=1.0, help="每个用例的计时预算（秒），至少运行一次")
+    parser.add_argument("--output", default="bench_suite.json", help="结果 JSON 路径")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="以本次结果覆盖基线（保留基线中未运行的用例）")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的相对变慢比例")
+    parser.add_argument("--noise-ms", type=float, default=0.2, help="小于该差值（毫秒）的变化不计为回退")
+    parser.add_argument("--metric", default="min_ms", choices=["min_ms", "median_ms"], help="与基线对比的统计量")
+    parser.add_argument("--normalize", action="store_true", help="对比时按校准负载折算机器快慢")
+    parser.add_argument("--retries", type=int, default=2, help="疑似回退的用例最多重测次数")
+    args = parser.parse_args()
+
+    names = [n for n in BENCHMARKS if not args.only or any(n.startswith(p) for p in args.only)]
+    if not names:
+        parser.error(f"没有匹配的基准，可选: {', '.join(BENCHMARKS)}")
+
+    results = run_suite(names, args.sizes, args.full, args.densities, args.repeat, args.budget, log=print)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+    report = compare(results, baseline, args.tolerance, args.noise_ms, args.metric, args.normalize)
+    # 疑似回退的用例重测，排除瞬时抖动；保留折算后更快的一次
+    by_key = {c[0]: c for c in cases(names, args.sizes, args.full, args.densities)}
+    for _ in range(args.retries):
+        suspects = [k for k, r in report.items() if r["status"] == "regression"]
+        if not suspects:
+            break
+        for key in suspects:
+            _, name, n, density = by_key[key]
+            retry = run_case(name, n, density, args.repeat, args.budget)
+            speed = retry["calibration_ms"] / results[key]["calibration_ms"] if args.normalize else 1.0
+            if retry[args.metric] < results[key][args.metric] * speed:
+                results[key] = retry
+            print(f"{key:<48} {retry['median_ms']:>12.3f} ms  (重测)")
+        report = compare(results, baseline, args.tolerance, args.noise_ms, args.metric, args.normalize)
+    for key, cur in results.items():
+        cur["compare"] = report[key]
+
+    output = {"env": environment(), "metric": args.metric, "tolerance": args.tolerance, "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+
+    regressions = [k for k, r in report.items() if r["status"] == "regression"]
+    improvements = [k for k, r in report.items() if r["status"] == "improvement"]
+    print(f"\n结果已写入 {args.output}；基线 {args.baseline if baseline else '（无）'}: "
+          f"回退 {len(regressions)}，提升 {len(improvements)}，新增 {sum(r['status'] == 'new' for r in report.values())}")
+    for key in regressions:
+        r = report[key]
+        print(f"  REGRESSION {key}: {results[key][args.metric]} ms vs {r['baseline_ms']} ms "
+              f"(x{r['ratio']}" + (f", 机器速度折算 x{r['machine_speed']})" if args.normalize else ")"))
+
+    if args.save_baseline:
+        merged = {**baseline, **{k: {f: v for f, v in r.items() if f != "compare"} for k, r in results.items()}}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"env": environment(), "results": merged}, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"基线已更新: {args.baseline}")
+    sys.exit(1 if regressions and not args.save_baseline else 0)
+
+
+if __name__ == "__main__":
+    main()
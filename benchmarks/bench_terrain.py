@@ -0,0 +1,57 @@
+"""
+仿真地形基准：各生成器（src.sim.terrain）在不同边长下的生成耗时与高程数组内存，
+以及窗口查询耗时（Maze + query_area 逐点筛选排序 vs Terrain.window 直接切片）。无需网络。
+
+    python -m benchmarks.bench_terrain
+    python -m benchmarks.bench_terrain --sizes 1000 5000 10000 --window-size 400
+"""
+import argparse
+import json
+import random
+import time
+from src.sim import terrain
+from src.sim.area_query import query_area
+from src.sim.maze import obstacle_field
+
+
+def bench_generate(sizes, seed: int) -> list:
+    rows = []
+    for size in sizes:
+        for name, gen in terrain.GENERATORS.items():
+            t0 = time.perf_counter()
+            t = gen(size, size, 0.0001, seed=seed)
+            rows.append({"generator": name, "size": size, "seconds": round(time.perf_counter() - t0, 3),
+                         "mb": round(t.nbytes / 1e6, 1), "free_share": round(float((t.altitude <= 0).mean()), 4)})
+    return rows
+
+
+def bench_window(size: int, range_blocks: int, n: int, seed: int) -> dict:
+    maze = obstacle_field(size, size, 0.001, 0.2, seed)
+    t = terrain.Terrain.from_maze(maze)
+    rng = random.Random(seed)
+    points = [(rng.uniform(0, size * 0.001), rng.uniform(0, size * 0.001)) for _ in range(n)]
+    result = {"size": size, "range_blocks": range_blocks, "queries": n}
+    for name, fn in (("query_area", lambda lon, lat: query_area(lon, lat, maze, range_blocks)),
+                     ("window", lambda lon, lat: t.window(lon, lat, range_blocks))):
+        t0 = time.perf_counter()
+        for lon, lat in points:
+            fn(lon, lat)
+        result[f"{name}_ms"] = round((time.perf_counter() - t0) / n * 1000, 4)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--window-size", type=int, default=200, help="窗口查询对比用的地形边长（Maze 构建较慢）")
+    parser.add_argument("--range-blocks", type=int, default=21)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for row in bench_generate(args.sizes, args.seed):
+        print(json.dumps(row))
+    print(json.dumps(bench_window(args.window_size, args.range_blocks, args.queries, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
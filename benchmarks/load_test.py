@@ -0,0 +1,258 @@
+"""
+端到端压测：按目标 RPS（开环，按计划时刻发出，不等待前一个请求）驱动 /path-planning，
+起终点从一组 OD 对中抽取（热门对重复出现，可命中路线缓存），输出延迟 p50/p95/p99、吞吐、
+各状态计数，以及上游高程服务的调用次数（每条路线的平均上游调用数）。
+
+默认完全在本机运行：高程替身子进程（src.sim.elevation_server，经真实 HTTP）+ 进程内规划服务；
+也可用 --url / --upstream 压测已启动的服务（地形参数需与替身服务一致，用于挑选起终点）。
+
+    python -m benchmarks.load_test --rps 5 --duration 30
+    python -m benchmarks.load_test --rps 10 --upstream-latency 0.02 --error-rate 0.02 --backend process
+    python -m benchmarks.load_test --url http://127.0.0.1:8025 --upstream http://127.0.0.1:5555 --rps 10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple, Union
+import httpx
+import uvicorn
+from src.sim.maze import Maze
+from src.sim.terrain import Terrain
+from src.sim.elevation_server import add_terrain_args, terrain_from_args
+from benchmarks._util import latency_summary
+
+OD = Tuple[float, float, float, float, float]
+
+
+def od_pairs(maze: Union[Maze, Terrain], count: int, min_cells: int, alt: float, seed: int) -> List[OD]:
+    """
+    在可通行格子中随机挑选 count 个起终点对（直线距离不少于 min_cells 格）；
+    拒绝采样，不枚举全部格子，大地形（10k×10k）也只需访问被抽中的格子
+    """
+    rng = random.Random(seed)
+
+    def sample():
+        for _ in range(1000):
+            pos = (rng.randrange(maze.num_lon), rng.randrange(maze.num_lat))
+            if maze.moveable(pos):
+                return pos
+        return None
+
+    pairs = []
+    for _ in range(count * 100):
+        if len(pairs) >= count:
+            break
+        a, b = sample(), sample()
+        if a is None or b is None:
+            break
+        (x1, y1), (x2, y2) = a, b
+        if max(abs(x1 - x2), abs(y1 - y2)) >= min_cells:
+            pairs.append((x1 * maze.step, y1 * maze.step, x2 * maze.step, y2 * maze.step, alt))
+    return pairs
+
+
+def pick_pairs(pairs: List[OD], total: int, hot: int, hot_share: float, seed: int) -> List[OD]:
+    """按请求顺序抽取 OD：hot_share 比例来自前 hot 个热门对，其余均匀来自全部对"""
+    rng = random.Random(seed + 1)
+    hot_pairs = pairs[:max(1, hot)]
+    return [rng.choice(hot_pairs) if rng.random() < hot_share else rng.choice(pairs) for _ in range(total)]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def spawn_upstream(args, port: int):
+    """以子进程启动高程替身（与规划服务不争用 GIL），就绪后 yield 其地址，退出时终止"""
+    cmd = [sys.executable, "-m", "src.sim.elevation_server", "--port", str(port),
+           "--range-blocks", str(args.range_blocks), "--terrain", args.terrain, "--size", str(args.size),
+           "--step", str(args.step), "--density", str(args.density), "--water", str(args.water), "--seed", str(args.seed),
+           "--latency", str(args.upstream_latency), "--jitter", str(args.jitter),
+           "--error-rate", str(args.error_rate), "--empty-rate", str(args.empty_rate)]
+    if args.terrain_file:
+        cmd += ["--terrain-file", args.terrain_file]
+    proc = subprocess.Popen(cmd)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 60
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("高程替身服务启动失败")
+            try:
+                httpx.get(f"{url}/stats", timeout=1).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if time.time() > deadline:
+                    raise RuntimeError("高程替身服务启动超时")
+                time.sleep(0.1)
+        yield url
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+async def drive(client: httpx.AsyncClient, schedule: List[Tuple[float, OD]], timeout: Optional[float],
+                max_in_flight: int) -> Dict:
+    """按计划时刻发出请求；延迟自计划时刻起算（包含客户端排队），超过 max_in_flight 的请求直接丢弃"""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    in_flight = 0
+    dropped = 0
+
+    async def one(t_plan: float, od: OD):
+        nonlocal in_flight
+        params = {"lon1": od[0], "lat1": od[1], "lon2": od[2], "lat2": od[3], "alt": od[4]}
+        if timeout:
+            params["timeout"] = timeout
+        try:
+            resp = await client.get("/path-planning", params=params)
+            if resp.status_code == 200:
+                statuses[resp.json().get("status", "unknown")] += 1
+            else:
+                statuses[f"http_{resp.status_code}"] += 1
+            latencies.append(time.perf_counter() - t_plan)
+        except httpx.HTTPError as e:
+            statuses[type(e).__name__] += 1
+        finally:
+            in_flight -= 1
+
+    tasks = []
+    t0 = time.perf_counter()
+    for offset, od in schedule:
+        delay = t0 + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if in_flight >= max_in_flight:
+            dropped += 1
+            continue
+        in_flight += 1
+        tasks.append(asyncio.ensure_future(one(t0 + offset, od)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - t0
+    return {"latencies": latencies, "statuses": statuses, "dropped": dropped, "elapsed": elapsed,
+            "sent": len(tasks)}
+
+
+def arrival_offsets(rps: float, duration: float, poisson: bool, seed: int) -> List[float]:
+    rng = random.Random(seed + 2)
+    offsets, t = [], 0.0
+    while True:
+        t = t + rng.expovariate(rps) if poisson else len(offsets) / rps
+        if t >= duration:
+            return offsets
+        offsets.append(t)
+
+
+async def run(args, maze: Union[Maze, Terrain], upstream: str, planner_url: Optional[str]) -> Dict:
+    offsets = arrival_offsets(args.rps, args.duration, args.poisson, args.seed)
+    pairs = od_pairs(maze, args.pairs, args.min_cells, args.alt, args.seed)
+    if not pairs:
+        raise SystemExit("地形中找不到满足 --min-cells 的起终点对")
+    schedule = list(zip(offsets, pick_pairs(pairs, len(offsets), args.hot_pairs, args.hot_share, args.seed)))
+
+    if planner_url:
+        transport, base_url = None, planner_url
+    else:
+        from src.services import http_service as hs
+        from src.core.executor import ComputeExecutor
+        host, port = upstream.rsplit("//", 1)[1].split(":")
+        hs.QUERY_HOST, hs.QUERY_PORT = host, int(port)
+        hs._global_query_helper = None
+        hs.compute_executor = ComputeExecutor(args.backend, args.workers, 16)
+        # 进程内服务每个请求都打 INFO 日志，压测期间只保留警告
+        logging.getLogger().setLevel(logging.WARNING)
+        transport, base_url = httpx.ASGITransport(app=hs.app), "http://planner"
+
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.client_timeout,
+                                 limits=limits) as client, \
+            httpx.AsyncClient(base_url=upstream, timeout=10) as upstream_client:
+        before = (await upstream_client.get("/stats")).json()
+        res = await drive(client, schedule, args.plan_timeout, args.max_in_flight)
+        after = (await upstream_client.get("/stats")).json()
+        try:
+            cache_stats = (await client.get("/admin/cache-stats")).json()
+            planning_stats = (await client.get("/admin/planning-stats")).json()
+        except (httpx.HTTPError, ValueError):
+            cache_stats, planning_stats = {}, {}
+    if not planner_url:
+        hs.compute_executor.shutdown()
+
+    completed = len(res["latencies"])
+    upstream_calls = after["calls"] - before["calls"]
+    return {
+        "target_rps": args.rps,
+        "duration_s": round(res["elapsed"], 3),
+        "scheduled": len(schedule),
+        "sent": res["sent"],
+        "dropped": res["dropped"],
+        "completed": completed,
+        "throughput_rps": round(completed / res["elapsed"], 3) if res["elapsed"] > 0 else 0.0,
+        "status": dict(res["statuses"]),
+        "latency": latency_summary(res["latencies"]),
+        "od_pairs": len(pairs),
+        "upstream": {
+            "calls": upstream_calls,
+            "errors": after["errors"] - before["errors"],
+            "timeouts": after["timeouts"] - before["timeouts"],
+            "empty": after["empty"] - before["empty"],
+            "calls_per_route": round(upstream_calls / completed, 3) if completed else None,
+        },
+        "query_cache": {k: cache_stats.get(k) for k in ("hit_count", "miss_count", "coalesced_count", "error_count")},
+        "route_cache": planning_stats.get("route_cache"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=5.0, help="目标请求速率")
+    parser.add_argument("--duration", type=float, default=10.0, help="压测时长（秒）")
+    parser.add_argument("--poisson", action="store_true", help="泊松到达（默认等间隔）")
+    parser.add_argument("--pairs", type=int, default=50, help="OD 对数量")
+    parser.add_argument("--hot-pairs", type=int, default=5, help="热门 OD 对数量")
+    parser.add_argument("--hot-share", type=float, default=0.5, help="来自热门 OD 对的请求比例")
+    parser.add_argument("--min-cells", type=int, default=20, help="OD 对的最小跨度（格）")
+    parser.add_argument("--alt", type=float, default=0.0, help="障碍阈值")
+    parser.add_argument("--plan-timeout", type=float, default=None, help="/path-planning 的 timeout 参数（秒）")
+    parser.add_argument("--client-timeout", type=float, default=60.0)
+    parser.add_argument("--max-in-flight", type=int, default=256, help="客户端最大在途请求数，超出的请求丢弃并计数")
+    parser.add_argument("--url", default=None, help="已启动的规划服务地址；不填则进程内运行")
+    parser.add_argument("--upstream", default=None, help="已启动的高程替身地址；不填则在本机启动")
+    parser.add_argument("--backend", default="thread", help="进程内规划服务的计算后端")
+    parser.add_argument("--workers", type=int, default=4)
+    add_terrain_args(parser)
+    parser.add_argument("--range-blocks", type=int, default=21, help="替身每次返回的块数（奇数，每块 2×2 点）")
+    parser.add_argument("--upstream-latency", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--empty-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    if args.url and not args.upstream:
+        parser.error("--url 需同时指定 --upstream（用于统计上游调用次数）")
+
+    maze = terrain_from_args(args)
+    with contextlib.ExitStack() as stack:
+        upstream = args.upstream
+        if upstream is None:
+            upstream = stack.enter_context(spawn_upstream(args, free_port()))
+        if args.url is None:
+            # 进程内规划服务的请求日志输出到 stdout，压测期间屏蔽
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        result = asyncio.run(run(args, maze, upstream.rstrip("/"), args.url))
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
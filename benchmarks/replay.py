@@ -0,0 +1,171 @@
+"""
+流量回放：把录制的 /path-planning 请求（RECORD_PATH，含轮转备份）在当前代码上重新执行，
+高程数据由录制的瓦片快照（RECORD_TILES_PATH）在本地提供，无需上游服务。
+输出录制时与回放时的延迟分布、状态计数，以及路线差异（状态变化 / 路径变化）。
+瓦片默认无延迟返回，回放延迟只反映本地计算（可用 --tile-latency 模拟上游耗时）。
+
+比较两个版本：分别检出后以相同参数回放，对比输出（或以 --output 保存后比较）。
+
+    python -m benchmarks.replay --log recordings/path-planning.jsonl --tiles recordings/tiles.jsonl
+    python -m benchmarks.replay --log recordings/path-planning.jsonl --tiles recordings/tiles.jsonl --timed --speed 2
+    python -m benchmarks.replay --log recordings/path-planning.jsonl --tiles recordings/tiles.jsonl --no-route-cache
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+import httpx
+from src.services.recording import RecordedQueryHelper, load_tiles, read_records, route_summary
+from benchmarks._util import latency_summary
+
+
+def request_params(params: Dict) -> Dict:
+    """录制的参数转为请求参数：去掉空值，统一以 JSON 返回以便比对路线"""
+    return {k: v for k, v in params.items() if v is not None and k != "format"}
+
+
+def diff_result(recorded: Dict, replayed: Dict) -> Optional[str]:
+    """same 时返回 None；否则返回差异类型 status_changed / route_changed"""
+    if recorded.get("status") != replayed.get("status"):
+        return "status_changed"
+    if recorded.get("digest") != replayed.get("digest"):
+        return "route_changed"
+    return None
+
+
+async def replay(records: List[Dict], client: httpx.AsyncClient, concurrency: int,
+                 timed: bool, speed: float) -> List[Dict]:
+    """
+    回放全部请求，返回每个请求的 {latency, result}。
+    timed 时按录制时刻的间隔（除以 speed）开环发出；否则以 concurrency 个并发尽快发出。
+    """
+    results: List[Optional[Dict]] = [None] * len(records)
+    sem = asyncio.Semaphore(concurrency)
+    t0_rec = records[0].get("ts", 0.0) if records else 0.0
+
+    async def one(i: int, t_plan: float):
+        params = request_params(records[i]["params"])
+        try:
+            resp = await client.get("/path-planning", params=params)
+            if resp.status_code == 200:
+                result = route_summary(resp.json())
+            else:
+                result = {"status": "overloaded" if resp.status_code == 503 else f"http_{resp.status_code}"}
+        except httpx.HTTPError as e:
+            result = {"status": type(e).__name__}
+        results[i] = {"latency": time.perf_counter() - t_plan, "result": result}
+
+    async def bounded(i: int):
+        async with sem:
+            await one(i, time.perf_counter())
+
+    if timed:
+        tasks = []
+        t0 = time.perf_counter()
+        for i, rec in enumerate(records):
+            offset = (rec.get("ts", t0_rec) - t0_rec) / speed
+            delay = t0 + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(one(i, t0 + offset)))
+        await asyncio.gather(*tasks)
+    else:
+        await asyncio.gather(*(bounded(i) for i in range(len(records))))
+    return results
+
+
+def compare(records: List[Dict], results: List[Dict], examples: int) -> Dict:
+    diffs: Counter = Counter()
+    samples = []
+    for rec, res in zip(records, results):
+        recorded = rec.get("result") or {}
+        kind = diff_result(recorded, res["result"])
+        diffs[kind or "same"] += 1
+        if kind and len(samples) < examples:
+            samples.append({"kind": kind, "params": rec["params"],
+                            "recorded": {k: recorded.get(k) for k in ("status", "error", "points", "digest")},
+                            "replayed": {k: res["result"].get(k) for k in ("status", "error", "points", "digest")}})
+    return {"counts": dict(diffs), "examples": samples}
+
+
+async def run(args, records: List[Dict]) -> Dict:
+    from src.services import http_service as hs
+    from src.services.route_cache import RouteCache
+    from src.core.executor import ComputeExecutor
+
+    tiles, precision = load_tiles(args.tiles)
+    helper = RecordedQueryHelper(tiles, args.tile_latency, cache_max_bytes=hs.CACHE_MAX_BYTES, cache_ttl=hs.CACHE_TTL,
+                                 cache_negative_ttl=hs.CACHE_NEGATIVE_TTL, cache_precision=precision or 0.005)
+    hs._global_query_helper = helper
+    hs.traffic_recorder = None
+    hs.compute_executor = ComputeExecutor(args.backend, args.workers, 16)
+    if args.no_route_cache:
+        hs.route_cache = RouteCache(hs.ROUTE_CACHE_PRECISION, 0, hs.ROUTE_CACHE_TTL)
+    # 进程内服务每个请求都打 INFO 日志，回放期间只保留警告
+    logging.getLogger().setLevel(logging.WARNING)
+
+    transport = httpx.ASGITransport(app=hs.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://planner", timeout=args.client_timeout) as client:
+            t0 = time.perf_counter()
+            results = await replay(records, client, args.concurrency, args.timed, args.speed)
+            elapsed = time.perf_counter() - t0
+    finally:
+        hs.compute_executor.shutdown()
+
+    recorded_status = Counter((r.get("result") or {}).get("status") for r in records)
+    replayed_status = Counter(r["result"].get("status") for r in results)
+    return {
+        "requests": len(records),
+        "mode": "timed" if args.timed else f"concurrency={args.concurrency}",
+        "elapsed_s": round(elapsed, 3),
+        "latency": {
+            "recorded": latency_summary([r.get("duration_ms", 0.0) / 1000 for r in records]),
+            "replayed": latency_summary([r["latency"] for r in results]),
+        },
+        "status": {"recorded": dict(recorded_status), "replayed": dict(replayed_status)},
+        "diff": compare(records, results, args.examples),
+        "tiles": {"loaded": len(tiles), "missing": helper.missing_tiles},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", required=True, help="录制文件（RECORD_PATH），自动包含轮转备份")
+    parser.add_argument("--tiles", required=True, help="瓦片快照（RECORD_TILES_PATH）")
+    parser.add_argument("--limit", type=int, default=None, help="只回放前 N 个请求")
+    parser.add_argument("--include-trace", action="store_true", help="包含 debug=trace 的请求（默认跳过）")
+    parser.add_argument("--timed", action="store_true", help="按录制时的请求间隔开环回放（默认尽快回放）")
+    parser.add_argument("--speed", type=float, default=1.0, help="--timed 时的加速倍数")
+    parser.add_argument("--concurrency", type=int, default=1, help="非 --timed 时的并发数")
+    parser.add_argument("--tile-latency", type=float, default=0.0, help="模拟的上游单次查询延迟（秒），默认不等待")
+    parser.add_argument("--no-route-cache", action="store_true", help="关闭路线缓存，每个请求都重新规划")
+    parser.add_argument("--backend", default="thread", help="计算后端")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--client-timeout", type=float, default=300.0)
+    parser.add_argument("--examples", type=int, default=10, help="输出的差异样例数")
+    parser.add_argument("--output", default=None, help="结果另存为 JSON 文件")
+    args = parser.parse_args()
+
+    records = [r for r in read_records(args.log) if r.get("endpoint") == "/path-planning"
+               and (args.include_trace or r["params"].get("debug") is None)]
+    if args.limit is not None:
+        records = records[:args.limit]
+    if not records:
+        raise SystemExit("录制文件中没有 /path-planning 请求")
+    # 进程内规划服务的请求日志输出到 stdout，回放期间屏蔽
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = asyncio.run(run(args, records))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
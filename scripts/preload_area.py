@@ -0,0 +1,55 @@
+import argparse
+import json
+import os
+import sys
+import time
+import requests
+
+
+def default_server(cfg_path="config/config.json"):
+    port = 8025
+    if os.path.exists(cfg_path):
+        with open(cfg_path, "r", encoding="utf-8") as f:
+            port = int(json.load(f).get("server_port", port))
+    return f"http://127.0.0.1:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预加载指定区域的高程瓦片到路径规划服务缓存")
+    parser.add_argument("--bbox", nargs=4, type=float, required=True,
+                        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"), help="区域范围")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发查询数")
+    parser.add_argument("--rate", type=float, default=None, help="上游限速（次/秒）")
+    parser.add_argument("--server", default=default_server(), help="路径规划服务地址")
+    parser.add_argument("--interval", type=float, default=1.0, help="进度轮询间隔（秒）")
+    args = parser.parse_args()
+
+    min_lon, min_lat, max_lon, max_lat = args.bbox
+    params = {
+        "min_lon": min_lon, "min_lat": min_lat, "max_lon": max_lon, "max_lat": max_lat,
+        "concurrency": args.concurrency,
+    }
+    if args.rate:
+        params["rate"] = args.rate
+    resp = requests.post(f"{args.server}/admin/preload", params=params, timeout=10)
+    resp.raise_for_status()
+    job = resp.json()
+    if job.get("status") != "success":
+        print(f"预加载启动失败: {job}")
+        sys.exit(1)
+
+    job_id = job["job_id"]
+    print(f"预加载任务 {job_id}: 共 {job['total']} 个瓦片")
+    while True:
+        job = requests.get(f"{args.server}/admin/preload/{job_id}", timeout=10).json()
+        print(f"\r进度 {job['done']}/{job['total']}  新加载 {job['loaded']}  已缓存 {job['already_cached']}"
+              f"  无数据 {job['empty']}  失败 {job.get('failed', 0)}  用时 {job['elapsed_s']}s", end="", flush=True)
+        if job["state"] not in ("pending", "running"):
+            print()
+            print(f"任务结束: {job['state']}" + (f"（{job['error']}）" if job.get("error") else ""))
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 import heapq
-from typing import Dict, Tuple, List
+import time
+from array import array
+from typing import Callable, Dict, Tuple, List, Optional, Sequence, Iterable
 from .grid import *
+from .landmarks import LandmarkTable, snapshot_layers, tables_from_snapshot
 MAXMAX = 10**9
 
 
+class DeadlineExceeded(Exception):
+    """规划超过请求截止时间，结果已无意义，提前终止"""
+
+
 @dataclass
 class Point2D:
     x: float = 0.0
@@ -25,8 +32,90 @@ def lla_to_ned(ori: 'LLA', ter: 'LLA') -> Point2D:
     return Point2D(x, y)
 
 
+class SearchWorkspace:
+    """
+    A* 搜索的可复用缓冲区，按格子下标（x * num_lat + y）平铺：代价 g、父节点、closed 标记与可通行掩码。
+    容量不足时扩容；每次搜索结束只重置本次触及的格子，因此同一工作区反复搜索几乎不再分配内存。
+    可通行掩码按（高程栅格对象, thred）缓存，同一跳内多个候选终点的搜索共用；原地修改 altitude 后需调用 clear_mask。
+    """
+
+    def __init__(self, capacity: int = 0):
+        self.capacity = 0
+        self.g = array('d')
+        self.parent = array('l')
+        self.closed = bytearray()
+        self.free = bytearray()
+        self.touched: List[int] = []
+        self._mask_key = None
+        self.reserve(capacity)
+
+    def reserve(self, cells: int):
+        if cells <= self.capacity:
+            return
+        self.g = array('d', [math.inf]) * cells
+        self.parent = array('l', [0]) * cells
+        self.closed = bytearray(cells)
+        self.free = bytearray(cells)
+        self.capacity = cells
+        self._mask_key = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.capacity * (self.g.itemsize + self.parent.itemsize + 2)
+
+    def load_mask(self, grid: 'Grid'):
+        """按 Grid.is_obstacle 的定义（altitude > thred 为障碍）生成可通行掩码"""
+        cells = grid.num_lon * grid.num_lat
+        key = (grid.num_lon, grid.num_lat, grid.thred)
+        if self._mask_key is not None and self._mask_key[0] is grid.altitude and self._mask_key[1] == key:
+            return
+        self.reserve(cells)
+        alt = np.asarray(grid.altitude, dtype=np.float64).reshape(cells)
+        self.free[:cells] = (~(alt > grid.thred)).tobytes()
+        self._mask_key = (grid.altitude, key)
+
+    def clear_mask(self):
+        self._mask_key = None
+
+    def reset(self):
+        """恢复本次搜索触及的格子（g 为 inf、未 closed）"""
+        g, closed = self.g, self.closed
+        for i in self.touched:
+            g[i] = math.inf
+            closed[i] = 0
+        self.touched.clear()
+
+
 class AStar(Grid):
     """A* 搜索（8 邻域），继承 Grid。"""
+    # 搜索截止时间（time.time() 时间戳），None 表示不限；每扩展 DEADLINE_CHECK_EVERY 个节点检查一次
+    deadline: Optional[float] = None
+    DEADLINE_CHECK_EVERY = 512
+    # 最近一次 path_plan 扩展 / 入堆的节点数（供指标与追踪，搜索循环内不额外计数）
+    expansions = 0
+    pushed = 0
+    # path_plan 使用的搜索缓冲区，首次搜索时按网格大小创建（WorkspacePool 复用整个 AStar 时一并复用）
+    workspace: Optional[SearchWorkspace] = None
+    # 按 thred 索引的地标代价表（ALT 启发式），绑定到 use_landmarks 时的高程栅格对象；重新建网格后自动失效
+    landmarks: Optional[Dict[float, LandmarkTable]] = None
+    _landmark_altitude = None
+
+    def reset(self):
+        """
+        清空本次请求的全部状态（网格、起终点、截止时间、统计、地标表等），只保留搜索缓冲区，供 WorkspacePool 复用实例。
+        实例属性整体丢弃后重新初始化，回到类属性默认值，之后新增的请求级属性也不会在请求间残留。
+        """
+        ws = self.workspace
+        self.__dict__.clear()
+        self.__init__()
+        if ws is not None:
+            ws.clear_mask()
+            self.workspace = ws
+
+    def check_deadline(self):
+        if self.deadline is not None and time.time() > self.deadline:
+            raise DeadlineExceeded("规划超时")
+
     def heuristic8d_idx(self, a: Tuple[int, int], b: Tuple[int, int]) -> float:
         """基于网格索引的 8-连通 启发式（使用 gap_lon/gap_lat 作为尺度）"""
         len_lon = abs(a[0] - b[0]) * self.gap_lon
@@ -44,6 +133,35 @@ class AStar(Grid):
         len_lat = distance(a.lon, a.lat, a.lon, b.lat)
         return len_lon + len_lat
 
+    # --- 地标（ALT）启发式 ---
+    def use_landmarks(self, tables: Iterable[LandmarkTable]):
+        """为当前网格启用地标代价表（按各表的 thred 选用）；表的格子数须与当前网格一致"""
+        tables = {t.thred: t for t in tables}
+        for t in tables.values():
+            if not t.matches(self):
+                raise ValueError(f"地标代价表与网格大小不一致: {t.dist.shape} vs {self.num_lon}x{self.num_lat}")
+        self.landmarks = tables or None
+        self._landmark_altitude = self.altitude if tables else None
+
+    def landmark_heuristic(self, end: Tuple[int, int]) -> Optional[Callable[[int, int], float]]:
+        """当前网格与 thred 有地标代价表时，返回到 end 的启发式函数 h(x, y)（见 LandmarkTable.heuristic_to），否则 None"""
+        if not self.landmarks or self._landmark_altitude is not self.altitude:
+            return None
+        table = self.landmarks.get(self.thred)
+        return table.heuristic_to(self, end) if table is not None else None
+
+    def save_snapshot(self, path: str, obstacle: bool = False, labels: bool = False,
+                      landmarks: Sequence[LandmarkTable] = ()):
+        """同 Grid.save_snapshot，可附带各阈值的地标代价表（层 landmarks_<i>，元信息 landmarks 记录阈值与地标格子）"""
+        layers, entries = snapshot_layers(landmarks)
+        super().save_snapshot(path, obstacle, labels, layers, {"landmarks": entries} if entries else None)
+
+    def load_snapshot(self, path: str, mmap: bool = True) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """同 Grid.load_snapshot；快照带地标代价表时自动启用（目录格式下代价表保持内存映射）"""
+        meta, layers = super().load_snapshot(path, mmap)
+        self.use_landmarks(tables_from_snapshot(meta, layers).values())
+        return meta, layers
+
     # --- 设置起终点（支持索引或 LLA） ---
     def set_start_idx(self, idx: Tuple[int, int]):
         x = clamp(idx[0], 0, max(0, self.num_lon - 1))
@@ -256,93 +374,268 @@ class AStar(Grid):
         若失败返回 ([], False)。
         """
         if not self.altitude:
+            self.expansions = self.pushed = 0
             return [], False
 
         start = self.start
         end = self.end
+        num_lon, num_lat = self.num_lon, self.num_lat
+
+        ws = self.workspace
+        if ws is None:
+            ws = self.workspace = SearchWorkspace()
+        ws.load_mask(self)
+        # g / parent / closed 按格子下标平铺（见 SearchWorkspace），touched 记录需要在结束时恢复的格子
+        g_costs, parent, closed, free, touched = ws.g, ws.parent, ws.closed, ws.free, ws.touched
 
         # 优先队列项： (f, counter, x, y)
         open_heap: List[Tuple[float, int, int, int]] = []
         counter = 0
 
-        start_idx = start[0] * self.num_lat + start[1]
-        # g_costs: idx -> g
-        g_costs: Dict[int, float] = {start_idx: 0.0}
-        # parent: idx -> parent_idx
-        parent: Dict[int, int] = {start_idx: start_idx}
+        start_idx = start[0] * num_lat + start[1]
+        g_costs[start_idx] = 0.0
+        parent[start_idx] = start_idx
+        touched.append(start_idx)
 
-        start_f = self.heuristic8d_idx(start, end)
+        # 有地标代价表时启发式为 max(八向距离, ALT 下界)（入堆时逐格计算），否则为八向距离
+        h_fn = self.landmark_heuristic(end)
+        start_f = h_fn(*start) if h_fn is not None else self.heuristic8d_idx(start, end)
         heapq.heappush(open_heap, (start_f, counter, start[0], start[1]))
         counter += 1
-        closed: set = set()
+        expanded = 0
+        check_every = self.DEADLINE_CHECK_EVERY if self.deadline is not None else 0
 
-        while open_heap:
-            f, _, cx, cy = heapq.heappop(open_heap)
-            cur_idx = cx * self.num_lat + cy
+        try:
+            while open_heap:
+                f, _, cx, cy = heapq.heappop(open_heap)
+                cur_idx = cx * num_lat + cy
 
-            # 已经扩展过则跳过
-            if cur_idx in closed:
-                continue
+                # 已经扩展过则跳过
+                if closed[cur_idx]:
+                    continue
 
-            # 目标到达
-            if (cx, cy) == end:
-                break
+                if check_every and expanded % check_every == 0:
+                    self.check_deadline()
+
+                # 目标到达
+                if (cx, cy) == end:
+                    break
+
+                closed[cur_idx] = 1
+                expanded += 1
+                cur_g = g_costs[cur_idx]
+
+                # 遍历 8 邻域
+                for dx, dy in self.dir_8D:
+                    nx, ny = cx + dx, cy + dy
+                    if not (0 <= nx < num_lon and 0 <= ny < num_lat):
+                        continue
+                    n_idx = nx * num_lat + ny
+                    if closed[n_idx] or not free[n_idx]:
+                        continue
+
+                    # 代价：当前 g + cost(cur->next)
+                    tentative_g = cur_g + self.heuristic8d_idx((cx, cy), (nx, ny))
+
+                    # 如果不是 open 或者找到更优 g
+                    if tentative_g < g_costs[n_idx]:
+                        h = h_fn(nx, ny) if h_fn is not None else self.heuristic8d_idx((nx, ny), end)
+                        if h == math.inf:
+                            # 地标表明该格与终点不连通
+                            continue
+                        if g_costs[n_idx] == math.inf:
+                            touched.append(n_idx)
+                        g_costs[n_idx] = tentative_g
+                        parent[n_idx] = cur_idx
+                        heapq.heappush(open_heap, (tentative_g + h, counter, nx, ny))
+                        counter += 1
+            self.expansions = expanded
+            self.pushed = counter
+
+            # 回溯路径
+            end_idx = end[0] * num_lat + end[1]
+            if g_costs[end_idx] == math.inf:
+                return [], False
 
-            closed.add(cur_idx)
+            path_idx_list: List[Tuple[int, int]] = []
+            cur = end_idx
+            while True:
+                path_idx_list.append(divmod(cur, num_lat))
+                if cur == parent[cur]:
+                    break
+                cur = parent[cur]
+                if len(path_idx_list) > num_lon * num_lat + 5:
+                    # 保护性中断（防止死循环）
+                    return [], False
+        finally:
+            ws.reset()
 
-            # 遍历 8 邻域
-            for dx, dy in self.dir_8D:
-                nx, ny = cx + dx, cy + dy
-                if not (0 <= nx < self.num_lon and 0 <= ny < self.num_lat):
+        path_idx_list.reverse()
+        return path_idx_list, len(path_idx_list) > 1
+
+    # --- 一对多：从起点生长一棵 Dijkstra 最短路树，所有目标格确定后统一回溯 ---
+    def path_plan_many(self, targets: List[Tuple[int, int]]) -> Dict[Tuple[int, int], List[Tuple[int, int]]]:
+        """
+        从 start 出发做 Dijkstra（8 邻域，代价同 path_plan），直到 targets 中所有可达目标都已确定，
+        再从同一 parent 表回溯每条路径。返回 {目标索引: 路径索引列表}，不可达目标不在结果中。
+        与 path_plan 共用 SearchWorkspace 的平铺缓冲区与可通行掩码。
+        """
+        if not self.altitude:
+            self.expansions = self.pushed = 0
+            return {}
+        num_lon, num_lat = self.num_lon, self.num_lat
+
+        ws = self.workspace
+        if ws is None:
+            ws = self.workspace = SearchWorkspace()
+        ws.load_mask(self)
+        g_costs, parent, closed, free, touched = ws.g, ws.parent, ws.closed, ws.free, ws.touched
+
+        pending = {
+            t[0] * num_lat + t[1] for t in targets
+            if 0 <= t[0] < num_lon and 0 <= t[1] < num_lat and free[t[0] * num_lat + t[1]]
+        }
+        start_idx = self.start[0] * num_lat + self.start[1]
+        g_costs[start_idx] = 0.0
+        parent[start_idx] = start_idx
+        touched.append(start_idx)
+        open_heap: List[Tuple[float, int]] = [(0.0, start_idx)]
+        pushed = 1
+        expanded = 0
+        check_every = self.DEADLINE_CHECK_EVERY if self.deadline is not None else 0
+
+        res: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+        try:
+            while open_heap and pending:
+                g, cur_idx = heapq.heappop(open_heap)
+                if closed[cur_idx]:
                     continue
-                n_idx = nx * self.num_lat + ny
-                if n_idx in closed:
+                if check_every and expanded % check_every == 0:
+                    self.check_deadline()
+                closed[cur_idx] = 1
+                expanded += 1
+                pending.discard(cur_idx)
+                cx, cy = divmod(cur_idx, num_lat)
+                for dx, dy in self.dir_8D:
+                    nx, ny = cx + dx, cy + dy
+                    if not (0 <= nx < num_lon and 0 <= ny < num_lat):
+                        continue
+                    n_idx = nx * num_lat + ny
+                    if closed[n_idx] or not free[n_idx]:
+                        continue
+                    tentative_g = g + self.heuristic8d_idx((cx, cy), (nx, ny))
+                    if tentative_g < g_costs[n_idx]:
+                        if g_costs[n_idx] == math.inf:
+                            touched.append(n_idx)
+                        g_costs[n_idx] = tentative_g
+                        parent[n_idx] = cur_idx
+                        heapq.heappush(open_heap, (tentative_g, n_idx))
+                        pushed += 1
+            self.expansions = expanded
+            self.pushed = pushed
+
+            # 回溯须在 reset 之前完成（closed / parent 随后被恢复）
+            for t in targets:
+                if not (0 <= t[0] < num_lon and 0 <= t[1] < num_lat) or t in res:
                     continue
-                if not self.moveable((nx, ny)):
+                t_idx = t[0] * num_lat + t[1]
+                if not closed[t_idx]:
                     continue
+                path_idx_list: List[Tuple[int, int]] = []
+                cur = t_idx
+                while True:
+                    path_idx_list.append(divmod(cur, num_lat))
+                    if cur == parent[cur]:
+                        break
+                    cur = parent[cur]
+                path_idx_list.reverse()
+                res[t] = path_idx_list
+        finally:
+            ws.reset()
+        return res
+
+    def search_many(self, targets: List[Tuple[int, int]]) -> Dict[Tuple[int, int], LLABuffer]:
+        """执行 path_plan_many 并将路径转换为 LLABuffer"""
+        return {
+            t: self.indices_to_buffer(path_idx)
+            for t, path_idx in self.path_plan_many(targets).items()
+        }
+
+    # --- 反向代价场：从终点做完整 Dijkstra，得到每个格子到终点的最短代价 ---
+    def cost_field(self, goal: Tuple[int, int]) -> array:
+        """
+        返回长度 num_lon * num_lat 的代价数组（索引 x * num_lat + y），不可达/障碍格为 inf。
+        8 邻域、代价同 path_plan；代价对称，因此即为任意起点到 goal 的最短代价（cost-to-go）。
+        """
+        num_lat = self.num_lat
+        costs = array('d', [math.inf]) * (self.num_lon * num_lat)
+        if not self.altitude or not self.moveable(goal):
+            return costs
+        goal_idx = goal[0] * num_lat + goal[1]
+        costs[goal_idx] = 0.0
+        open_heap: List[Tuple[float, int]] = [(0.0, goal_idx)]
+        closed = bytearray(len(costs))
+        settled = 0
+        check_every = self.DEADLINE_CHECK_EVERY if self.deadline is not None else 0
 
-                # 代价：当前 g + cost(cur->next)
-                step_cost = self.heuristic8d_idx((cx, cy), (nx, ny))
-                tentative_g = g_costs.get(cur_idx, math.inf) + step_cost
-
-                # 如果不是 open 或者找到更优 g
-                if tentative_g < g_costs.get(n_idx, math.inf):
-                    g_costs[n_idx] = tentative_g
-                    parent[n_idx] = cur_idx
-                    h = self.heuristic8d_idx((nx, ny), end)
-                    heapq.heappush(open_heap, (tentative_g + h, counter, nx, ny))
-                    counter += 1
-
-        # 回溯路径
-        end_idx = end[0] * self.num_lat + end[1]
-        if end_idx not in parent:
-            return [], False
-
-        path_idx_list: List[Tuple[int, int]] = []
-        cur = end_idx
-        while True:
-            x = cur // self.num_lat
-            y = cur % self.num_lat
-            path_idx_list.append((x, y))
-            if cur == parent[cur]:
-                break
-            cur = parent[cur]
-            if len(path_idx_list) > self.num_lon * self.num_lat + 5:
-                # 保护性中断（防止死循环）
-                return [], False
-
-        path_idx_list.reverse()
-        return path_idx_list, len(path_idx_list) > 1
+        while open_heap:
+            g, cur_idx = heapq.heappop(open_heap)
+            if closed[cur_idx]:
+                continue
+            if check_every and settled % check_every == 0:
+                self.check_deadline()
+            closed[cur_idx] = 1
+            settled += 1
+            cx, cy = divmod(cur_idx, num_lat)
+            for dx, dy in self.dir_8D:
+                nx, ny = cx + dx, cy + dy
+                if not (0 <= nx < self.num_lon and 0 <= ny < num_lat):
+                    continue
+                n_idx = nx * num_lat + ny
+                if closed[n_idx] or not self.moveable((nx, ny)):
+                    continue
+                tentative_g = g + self.heuristic8d_idx((cx, cy), (nx, ny))
+                if tentative_g < costs[n_idx]:
+                    costs[n_idx] = tentative_g
+                    heapq.heappush(open_heap, (tentative_g, n_idx))
+        return costs
 
-    def search(self) -> Tuple[List['LLA'], bool]:
+    def follow_field(self, costs: array, start: Tuple[int, int]) -> List[Tuple[int, int]]:
         """
-        执行 PathPlan 并返回 LLA 路径与是否成功。
+        沿 cost_field 的梯度下降从 start 走到终点（代价为 0 的格子），O(路径长度)。
+        每步选择 步长 + 邻格代价 最小的邻格；start 不可达时返回 []。
+        """
+        num_lat = self.num_lat
+        cur = start[0] * num_lat + start[1]
+        if not 0 <= cur < len(costs) or costs[cur] == math.inf:
+            return []
+        path_idx_list: List[Tuple[int, int]] = [start]
+        while costs[cur] > 0.0:
+            cx, cy = divmod(cur, num_lat)
+            best, best_f = -1, math.inf
+            for dx, dy in self.dir_8D:
+                nx, ny = cx + dx, cy + dy
+                if not (0 <= nx < self.num_lon and 0 <= ny < num_lat):
+                    continue
+                n_idx = nx * num_lat + ny
+                f = costs[n_idx] + self.heuristic8d_idx((cx, cy), (nx, ny))
+                if f < best_f:
+                    best, best_f = n_idx, f
+            # 代价严格下降才能保证终止
+            if best < 0 or costs[best] >= costs[cur]:
+                return []
+            cur = best
+            path_idx_list.append(divmod(cur, num_lat))
+        return path_idx_list
+
+    def search(self) -> Tuple[LLABuffer, bool]:
+        """
+        执行 PathPlan 并返回路径（LLABuffer）与是否成功。
         """
         path_idx, ok = self.path_plan()
         if not ok:
-            return [], False
-        res: List[LLA] = [self.index_to_lla(p) for p in path_idx]
-        return res, True
+            return LLABuffer.empty(), False
+        return self.indices_to_buffer(path_idx), True
 
 
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Executor, Future
+from contextvars import ContextVar
+from typing import Optional, Callable, Any, Tuple
+
+
+class ComputeHook:
+    """
+    包装提交到计算后端的任务（如按请求开启的 profiler）。
+    wrap 返回实际执行的 (函数, args, kwargs)，进程池下该函数需为模块级函数（可 pickle）；
+    unwrap 处理其返回值并还原为原任务的结果。
+    """
+
+    def wrap(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Tuple[Callable[..., Any], tuple, dict]:
+        return fn, args, kwargs
+
+    def unwrap(self, result: Any) -> Any:
+        return result
+
+
+# 当前请求的计算任务钩子，在提交任务的协程上下文中设置；None 表示不包装
+compute_hook: ContextVar[Optional[ComputeHook]] = ContextVar("compute_hook", default=None)
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, fn: Callable[[], Any]):
+    """从池线程回到事件循环执行 fn；循环已关闭时忽略"""
+    try:
+        loop.call_soon_threadsafe(fn)
+    except RuntimeError:
+        pass
+
+
+class ComputeExecutor:
+    """
+    规划计算阶段（网格构建、A* 搜索、轨迹合并）的执行后端：
+    - inline: 直接在事件循环内同步执行（原有行为）
+    - thread: 线程池执行，事件循环在计算期间仍可处理其他请求
+    - process: 进程池执行，任务参数使用紧凑的瓦片数组（见 grid.pack_llas）而非 LLA 列表
+    I/O（高程查询）始终留在事件循环内。
+    max_workers: 线程/进程数；max_queue: 除正在执行的任务外，允许提交到池中排队的任务数，
+    超出部分在事件循环内等待，避免池内积压无界增长。
+    """
+
+    MODES = ("inline", "thread", "process")
+
+    def __init__(self, mode: str = "inline", max_workers: Optional[int] = None, max_queue: int = 16):
+        if mode not in self.MODES:
+            raise ValueError(f"未知的计算后端: {mode}，可选 {self.MODES}")
+        self.mode = mode
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max(0, max_queue)
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.submitted = 0
+
+    @property
+    def is_process(self) -> bool:
+        return self.mode == "process"
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "thread":
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="plan")
+            else:
+                self._pool = ProcessPoolExecutor(self.max_workers)
+            logging.info(f"[Compute] 启动 {self.mode} 计算后端: workers={self.max_workers}, queue={self.max_queue}")
+        return self._pool
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+        return self._slots
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """执行一个计算阶段；inline 模式直接调用，其余模式提交到池中并等待结果"""
+        return await self.run_job(fn, args, kwargs)
+
+    async def run_job(self, fn: Callable[..., Any], args: tuple, kwargs: dict,
+                      on_submit: Optional[Callable[[Future], None]] = None) -> Any:
+        """
+        同 run。on_submit 在任务提交到池后以其 concurrent.futures.Future 回调：等待方被取消时，
+        池中已开始执行的任务不会停止，调用方据此在任务真正结束后再回收任务用到的对象（如 AStar 工作区）。
+        排队名额同样在任务结束时（而非等待方返回时）归还，被取消的请求不会让池内积压超过上限。
+        """
+        hook = compute_hook.get()
+        if hook is not None:
+            fn, args, kwargs = hook.wrap(fn, args, kwargs)
+        if self.mode == "inline":
+            result = fn(*args, **kwargs)
+        else:
+            slots = self._get_slots()
+            await slots.acquire()
+            loop = asyncio.get_running_loop()
+            try:
+                job = self._get_pool().submit(functools.partial(fn, *args, **kwargs))
+            except BaseException:
+                slots.release()
+                raise
+            self.submitted += 1
+            job.add_done_callback(lambda _: _call_soon(loop, slots.release))
+            if on_submit is not None:
+                on_submit(job)
+            result = await asyncio.wrap_future(job)
+        return result if hook is None else hook.unwrap(result)
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
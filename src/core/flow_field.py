@@ -0,0 +1,40 @@
+import math
+from array import array
+from typing import Tuple, Optional
+from .grid import LLA, LLABuffer
+from .astar import AStar
+
+
+class FlowField:
+    """
+    以某个终点为目标的反向代价场（cost-to-go），覆盖终点所在瓦片的网格。
+    构建一次完整 Dijkstra 后，网格内任意起点沿梯度下降即可得到最短路径，无需再次搜索。
+    astar 只读持有网格栅格（可与 GridCache 共享），costs 为扁平的 double 数组。
+    """
+
+    def __init__(self, astar: AStar, goal: Tuple[int, int], costs: array):
+        self.astar = astar
+        self.goal = goal
+        self.costs = costs
+        self.reachable = sum(1 for c in costs if c != math.inf)
+
+    @property
+    def thred(self) -> float:
+        return self.astar.thred
+
+    @property
+    def nbytes(self) -> int:
+        """估算内存占用：代价数组 + 高程栅格（每格一个 float 对象及其列表指针）"""
+        return self.costs.itemsize * len(self.costs) + 32 * len(self.costs)
+
+    def contains(self, lla: LLA) -> bool:
+        return self.astar.is_in_grid(lla)
+
+    def path_from(self, lla: LLA) -> Optional[LLABuffer]:
+        """从 lla 所在格子沿梯度走到终点，返回路径；不在网格内或不可达时返回 None"""
+        if not self.contains(lla):
+            return None
+        path_idx = self.astar.follow_field(self.costs, self.astar.get_index(lla))
+        if not path_idx:
+            return None
+        return self.astar.indices_to_buffer(path_idx)
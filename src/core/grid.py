@@ -1,11 +1,22 @@
+import json
 import math
+import os
+from array import array
 from dataclasses import dataclass
-from typing import List, Tuple
-from collections import  defaultdict
+from typing import List, Tuple, Dict, Iterable, Optional, Union, Any
+from collections import  defaultdict, deque
+import numpy as np
+
+try:
+    from scipy import ndimage
+except ImportError:  # 可选依赖，未安装时连通区域标号使用纯 Python 的 BFS
+    ndimage = None
 
 
 @dataclass
 class LLA:
+    # __slots__ 去掉每个实例的 __dict__，单点内存约减半、创建更快
+    __slots__ = ("lon", "lat", "alt")
     lon: float
     lat: float
     alt: float
@@ -32,10 +43,168 @@ def distance(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
     return 2 * R * math.asin(math.sqrt(a))
 
 
+def distance_np(lon1, lat1, lon2, lat2) -> np.ndarray:
+    """distance() 的向量化版本（逐元素，单位：km）"""
+    R = 6371.0
+    lon1, lat1, lon2, lat2 = np.radians(lon1), np.radians(lat1), np.radians(lon2), np.radians(lat2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * R * np.arcsin(np.sqrt(a))
+
+
 def clamp(x: int, low: int, high: int) -> int:
     return max(low, min(x, high))
 
 
+class LLABuffer:
+    """
+    列式（struct-of-arrays）的经纬高点集：lon / lat / alt 各为一个 float64 数组，不为每个点创建对象。
+    用于高程瓦片等批量数据；按下标访问或迭代时才临时生成 LLA，兼容按 LLA 列表处理的旧代码。
+    """
+    __slots__ = ("lon", "lat", "alt")
+
+    def __init__(self, lon, lat, alt):
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.alt = np.asarray(alt, dtype=np.float64)
+
+    @classmethod
+    def from_llas(cls, data: Iterable[LLA]) -> 'LLABuffer':
+        data = list(data)
+        return cls([p.lon for p in data], [p.lat for p in data], [p.alt for p in data])
+
+    @classmethod
+    def empty(cls) -> 'LLABuffer':
+        return cls(np.empty(0), np.empty(0), np.empty(0))
+
+    @classmethod
+    def concat(cls, parts: Iterable[Union[List[LLA], 'LLABuffer']]) -> 'LLABuffer':
+        bufs = [p if isinstance(p, LLABuffer) else cls.from_llas(p) for p in parts]
+        if not bufs:
+            return cls.empty()
+        return cls(np.concatenate([b.lon for b in bufs]), np.concatenate([b.lat for b in bufs]),
+                   np.concatenate([b.alt for b in bufs]))
+
+    @classmethod
+    def from_records(cls, items: list) -> 'LLABuffer':
+        """由上游返回的 data 数组（{"lon", "lat", "alt"} 字典）直接填充列数组"""
+        n = len(items)
+        return cls(
+            np.fromiter((it["lon"] for it in items), np.float64, n),
+            np.fromiter((it["lat"] for it in items), np.float64, n),
+            np.fromiter((it.get("alt", 0) for it in items), np.float64, n),
+        )
+
+    def __len__(self) -> int:
+        return len(self.lon)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[LLA, 'LLABuffer']:
+        if isinstance(i, slice):
+            return LLABuffer(self.lon[i], self.lat[i], self.alt[i])
+        return LLA(float(self.lon[i]), float(self.lat[i]), float(self.alt[i]))
+
+    def take(self, idx) -> 'LLABuffer':
+        """按下标数组或布尔掩码取子集"""
+        return LLABuffer(self.lon[idx], self.lat[idx], self.alt[idx])
+
+    def __iter__(self):
+        for lon, lat, alt in zip(self.lon.tolist(), self.lat.tolist(), self.alt.tolist()):
+            yield LLA(lon, lat, alt)
+
+    def __repr__(self):
+        return f"LLABuffer(n={len(self)})"
+
+    def tolist(self) -> List[LLA]:
+        return list(self)
+
+    def to_records(self) -> List[Dict[str, float]]:
+        """序列化为 [{"lon", "lat", "alt"}] 列表（不经过 LLA 对象）"""
+        return [{"lon": lon, "lat": lat, "alt": alt}
+                for lon, lat, alt in zip(self.lon.tolist(), self.lat.tolist(), self.alt.tolist())]
+
+    @property
+    def nbytes(self) -> int:
+        return self.lon.nbytes + self.lat.nbytes + self.alt.nbytes
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """(min_lon, min_lat, max_lon, max_lat)"""
+        return float(self.lon.min()), float(self.lat.min()), float(self.lon.max()), float(self.lat.max())
+
+    def nearest_index(self, lon: float, lat: float) -> int:
+        """与 distance() 相同的球面距离下最近点的下标"""
+        lon1, lat1 = math.radians(lon), math.radians(lat)
+        lon2, lat2 = np.radians(self.lon), np.radians(self.lat)
+        a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return int(np.argmin(a))
+
+
+def nearest_lla(data: Union[List[LLA], LLABuffer], lon: float, lat: float) -> Optional[LLA]:
+    """点集中距 (lon, lat) 最近的点，空点集返回 None"""
+    if data is None or len(data) == 0:
+        return None
+    if isinstance(data, LLABuffer):
+        return data[data.nearest_index(lon, lat)]
+    return min(data, key=lambda p: distance(lon, lat, p.lon, p.lat))
+
+
+def pack_llas(data: Union[List[LLA], LLABuffer]) -> Union[array, LLABuffer]:
+    """
+    将 LLA 列表打包为紧凑的 double 数组（lon, lat, alt 交错），用于跨进程传输；
+    LLABuffer 本身已是紧凑数组，原样返回。
+    """
+    if isinstance(data, LLABuffer):
+        return data
+    buf = array('d')
+    for p in data:
+        buf.extend((p.lon, p.lat, p.alt))
+    return buf
+
+
+def unpack_llas(buf: Union[array, LLABuffer]) -> Union[List[LLA], LLABuffer]:
+    """pack_llas 的逆操作"""
+    if isinstance(buf, LLABuffer):
+        return buf
+    return [LLA(buf[i], buf[i + 1], buf[i + 2]) for i in range(0, len(buf) - 2, 3)]
+
+
+# 网格快照格式版本（字段或布局变化时递增，加载时校验）
+SNAPSHOT_VERSION = 1
+
+
+def component_labels(free: np.ndarray) -> np.ndarray:
+    """
+    可通行掩码的 8 连通区域标号（与 A* 的 8 邻域一致）：int32，障碍为 0，区域从 1 开始编号。
+    安装了 scipy 时用 ndimage.label，否则逐格 BFS（大栅格较慢，适合离线生成快照）。
+    """
+    if ndimage is not None:
+        labels, _ = ndimage.label(free, structure=np.ones((3, 3), dtype=bool))
+        return labels.astype(np.int32, copy=False)
+    num_x, num_y = free.shape
+    flat_free = free.ravel()
+    labels = np.zeros(free.size, dtype=np.int32)
+    current = 0
+    for seed in np.flatnonzero(flat_free).tolist():
+        if labels[seed]:
+            continue
+        current += 1
+        labels[seed] = current
+        queue = deque([seed])
+        while queue:
+            idx = queue.popleft()
+            x, y = divmod(idx, num_y)
+            for dx in (-1, 0, 1):
+                nx = x + dx
+                if not 0 <= nx < num_x:
+                    continue
+                for dy in (-1, 0, 1):
+                    ny = y + dy
+                    if 0 <= ny < num_y:
+                        n = nx * num_y + ny
+                        if flat_free[n] and not labels[n]:
+                            labels[n] = current
+                            queue.append(n)
+    return labels.reshape(free.shape)
+
+
 class Grid:
     def __init__(self, thred = -10):
         self.dir_8D = [
@@ -78,6 +247,77 @@ class Grid:
     def is_in_grid(self, lla:LLA):
         return self.min_lon <= lla.lon <=self.max_lon and self.min_lat <= lla.lat <= self.max_lat
 
+    # 网格元信息（范围、间距、尺寸），用于在其他进程中构建网格后同步回本进程
+    def header(self) -> Dict[str, float]:
+        return {
+            "min_lon": self.min_lon, "max_lon": self.max_lon,
+            "min_lat": self.min_lat, "max_lat": self.max_lat,
+            "gap_lon": self.gap_lon, "gap_lat": self.gap_lat,
+            "num_lon": self.num_lon, "num_lat": self.num_lat,
+        }
+
+    def apply_header(self, header: Dict[str, float]):
+        for k, v in header.items():
+            setattr(self, k, v)
+
+    # 已构建的栅格（元信息 + 高程），可在多个网格之间共享（只读）以跳过重复的 init
+    def export_raster(self) -> Tuple[Dict[str, float], List[List[float]]]:
+        return self.header(), self.altitude
+
+    def load_raster(self, raster: Tuple[Dict[str, float], List[List[float]]]):
+        header, altitude = raster
+        self.apply_header(header)
+        self.altitude = altitude
+
+    # 网格快照：高程栅格 (num_lon, num_lat) + 元信息，可选障碍掩码与连通区域标号层
+    def save_snapshot(self, path: str, obstacle: bool = False, labels: bool = False,
+                      extra_layers: Optional[Dict[str, np.ndarray]] = None, extra_meta: Optional[Dict[str, Any]] = None):
+        """
+        path 以 .npz 结尾时保存为单个 npz（不压缩），否则保存为目录（header.json + 每层一个 .npy，可内存映射）。
+        obstacle / labels 层按当前 thred 计算，thred 记录在元信息中。
+        extra_layers / extra_meta: 附加的数组层与元信息字段（如 AStar 的地标代价表），加载时原样返回。
+        """
+        altitude = np.asarray(self.altitude, dtype=np.float64).reshape(self.num_lon, self.num_lat)
+        layers = {"altitude": altitude}
+        if obstacle or labels:
+            blocked = altitude > self.thred
+            if obstacle:
+                layers["obstacle"] = blocked
+            if labels:
+                layers["labels"] = component_labels(~blocked)
+        layers.update(extra_layers or {})
+        meta = {**(extra_meta or {}), "version": SNAPSHOT_VERSION, "thred": self.thred, **self.header(),
+                "layers": sorted(layers)}
+        if path.endswith(".npz"):
+            np.savez(path, meta=np.array(json.dumps(meta)), **layers)
+            return
+        os.makedirs(path, exist_ok=True)
+        for name, arr in layers.items():
+            np.save(os.path.join(path, f"{name}.npy"), arr)
+        with open(os.path.join(path, "header.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def load_snapshot(self, path: str, mmap: bool = True) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """
+        加载 save_snapshot 保存的快照：同步元信息与高程栅格，返回 (元信息, 各层数组)。
+        目录格式的各层默认以只读内存映射打开（不复制）；npz 整体读入内存。
+        altitude 会转为 A* 使用的嵌套列表，其余层（obstacle 对应元信息中的 thred）按需直接使用返回的数组。
+        """
+        if path.endswith(".npz"):
+            with np.load(path, allow_pickle=False) as npz:
+                meta = json.loads(str(npz["meta"]))
+                layers = {name: npz[name] for name in meta["layers"]}
+        else:
+            with open(os.path.join(path, "header.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            layers = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                      for name in meta["layers"]}
+        if meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"网格快照版本不兼容: {meta.get('version')}（当前 {SNAPSHOT_VERSION}）")
+        self.apply_header({k: meta[k] for k in self.header()})
+        self.altitude = layers["altitude"].tolist()
+        return meta, layers
+
     def data_init(self, data: List[LLA], init_data: List[LLA]):
         self.min_lon = math.inf
         self.min_lat = math.inf
@@ -146,7 +386,20 @@ class Grid:
             self.altitude[lon_idx][lat_idx]
         )
 
-    def init(self, data: List[LLA]):
+    def indices_to_buffer(self, idxs: List[Tuple[int, int]]) -> LLABuffer:
+        """网格索引序列批量转为 LLABuffer（等价于逐个 index_to_lla，但不创建 LLA 对象）"""
+        if not idxs:
+            return LLABuffer.empty()
+        xy = np.asarray(idxs, dtype=np.int64)
+        xs = np.clip(xy[:, 0], 0, self.num_lon - 1)
+        ys = np.clip(xy[:, 1], 0, self.num_lat - 1)
+        altitude = self.altitude
+        alts = [altitude[x][y] for x, y in zip(xs.tolist(), ys.tolist())]
+        return LLABuffer(xs * self.gap_lon + self.min_lon, ys * self.gap_lat + self.min_lat, alts)
+
+    def init(self, data: Union[List[LLA], LLABuffer]):
+        if isinstance(data, LLABuffer):
+            return self.init_arrays(data)
         if not data:
             return False
         init_data: List[LLA] = []
@@ -197,6 +450,55 @@ class Grid:
                 self.altitude[i][j] = init_data[idx].alt
         return True
 
+    def init_arrays(self, data: LLABuffer) -> bool:
+        """
+        列式数据的向量化建网格：网格尺寸、范围、间距与 init 相同；每个采样点归入最近的格子，
+        同一格子取离格心最近的采样点，没有采样点的格子取最近采样点的高程。
+        对上游返回的规则方阵（按经度、纬度排序）结果与 init 一致。
+        """
+        n = len(data)
+        if n == 0:
+            return False
+        lon, lat, alt = data.lon, data.lat, data.alt
+        valid = (np.abs(lon) <= 180) & (np.abs(lat) <= 90) & (alt > -32767)
+        if not valid.any():
+            return False
+        lon, lat, alt = lon[valid], lat[valid], alt[valid]
+
+        self.min_lon, self.max_lon = float(lon.min()), float(lon.max())
+        self.min_lat, self.max_lat = float(lat.min()), float(lat.max())
+        self.num_lon = self.num_lat = math.ceil(math.sqrt(n))
+        self.gap_lon = 0
+        self.gap_lat = 0
+        if self.num_lat > 1:
+            self.gap_lat = (self.max_lat - self.min_lat) / (self.num_lat - 1)
+        if self.num_lon > 1:
+            self.gap_lon = (self.max_lon - self.min_lon) / (self.num_lon - 1)
+
+        # 以格子为单位的采样点坐标
+        fx = (lon - self.min_lon) / self.gap_lon if self.gap_lon else np.zeros_like(lon)
+        fy = (lat - self.min_lat) / self.gap_lat if self.gap_lat else np.zeros_like(lat)
+        xi = np.clip(np.rint(fx), 0, self.num_lon - 1).astype(np.int64)
+        yi = np.clip(np.rint(fy), 0, self.num_lat - 1).astype(np.int64)
+        cell = xi * self.num_lat + yi
+        d2 = (fx - xi) ** 2 + (fy - yi) ** 2
+
+        raster = np.full(self.num_lon * self.num_lat, np.nan)
+        order = np.lexsort((d2, cell))
+        cells, first = np.unique(cell[order], return_index=True)
+        raster[cells] = alt[order][first]
+
+        missing = np.flatnonzero(np.isnan(raster))
+        for chunk in np.array_split(missing, max(1, len(missing) // 256)):
+            if len(chunk) == 0:
+                continue
+            mx = (chunk // self.num_lat)[:, None]
+            my = (chunk % self.num_lat)[:, None]
+            raster[chunk] = alt[np.argmin((fx - mx) ** 2 + (fy - my) ** 2, axis=1)]
+
+        self.altitude = raster.reshape(self.num_lon, self.num_lat).tolist()
+        return True
+
     # 将数据按块划分
     def _build_blocks(self, data: List['LLA'], block_size: int = 5):
         block_dict = defaultdict(list)
@@ -264,7 +566,9 @@ class Grid:
                     self.altitude[i][j] = 9.999999  # 没找到点时默认0
         return True
 
-    def print_grid(self):
+    def grid_text(self) -> str:
+        """网格的字符画（S/E 为起终点，_ 可通行，X 障碍），北在上"""
+        lines = []
         for i in range(self.num_lat - 1, -1, -1):
             row = []
             for j in range(self.num_lon):
@@ -276,8 +580,11 @@ class Grid:
                     row.append("_")
                 else:
                     row.append("X")
-            print(" ".join(row))
-        print()
+            lines.append(" ".join(row))
+        return "\n".join(lines) + "\n"
+
+    def print_grid(self):
+        print(self.grid_text())
 
 
 # 示例使用
@@ -0,0 +1,153 @@
+"""
+ALT（A*, Landmarks, Triangle inequality）启发式：在长期保留的瓦片/拼接网格上预先选取少量地标，
+保存每个地标到全部格子的最短代价（float32，一个地标一行）。由三角不等式，任意格 n 到终点 t 的代价
+不小于 |d(L, t) - d(L, n)|；与八向距离取较大值作为 A* 启发式。迷宫、海岸线等障碍密集地形上
+八向距离严重低估，ALT 能大幅减少扩展节点数；开阔地形上两者相当。代价表与障碍阈值 thred 一一对应。
+"""
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .grid import Grid, component_labels
+
+# float32 存储的舍入误差（每个值相对误差 ≤ 2^-24）：按两项之和扣除，保证下界仍可采纳
+ALT_SLACK = 4e-7
+
+
+def component_boundary(labels: np.ndarray, label: int) -> List[Tuple[int, int]]:
+    """连通区域 label 中位于其外接矩形四条边上的格子（网格边界为障碍时即区域最外圈的格子）"""
+    xs, ys = np.nonzero(labels == label)
+    edge = (xs == xs.min()) | (xs == xs.max()) | (ys == ys.min()) | (ys == ys.max())
+    return list(zip(xs[edge].tolist(), ys[edge].tolist()))
+
+
+class LandmarkTable:
+    """
+    一个障碍阈值下的地标代价表：cells 为地标格子索引，dist 形状 (地标数, num_lon * num_lat)，
+    下标同 A* 的扁平格子下标（x * num_lat + y），不可达格为 inf。dist 可以是快照中的只读内存映射。
+    """
+
+    def __init__(self, thred: float, cells: List[Tuple[int, int]], dist: np.ndarray):
+        self.thred = thred
+        self.cells = cells
+        self.dist = dist
+        self._rows: Optional[List[memoryview]] = None
+
+    @classmethod
+    def build(cls, astar: Any, count: int = 8) -> 'LandmarkTable':
+        """
+        在 astar 当前网格与 thred 下选取至多 count 个地标并计算代价表（每个地标一次完整 Dijkstra，适合离线/预热）。
+        地标取在最大连通区域（8 邻域）的外圈（区域外接矩形四条边上的格子）：第一个离网格中心最远，
+        之后每次取到已选地标最短代价最大的外圈格子，使地标分散在区域四周。
+        其他连通区域内的搜索没有有效地标，退回八向距离。
+        """
+        num_lon, num_lat = astar.num_lon, astar.num_lat
+        cells = num_lon * num_lat
+        if not astar.altitude or count <= 0:
+            return cls(astar.thred, [], np.empty((0, cells), dtype=np.float32))
+        free = np.asarray(astar.altitude, dtype=np.float64).reshape(num_lon, num_lat) <= astar.thred
+        labels = component_labels(free)
+        sizes = np.bincount(labels.ravel())
+        sizes[0] = 0
+        if not sizes.any():
+            return cls(astar.thred, [], np.empty((0, cells), dtype=np.float32))
+        ring = component_boundary(labels, int(np.argmax(sizes)))
+        ring_idx = np.array([x * num_lat + y for x, y in ring])
+
+        cx, cy = (num_lon - 1) / 2, (num_lat - 1) / 2
+        nxt = max(range(len(ring)), key=lambda i: abs(ring[i][0] - cx) + abs(ring[i][1] - cy))
+        chosen: List[Tuple[int, int]] = []
+        rows: List[np.ndarray] = []
+        nearest = np.full(len(ring), np.inf)
+        deadline, astar.deadline = astar.deadline, None
+        try:
+            while len(chosen) < count:
+                chosen.append(ring[nxt])
+                row = np.frombuffer(astar.cost_field(ring[nxt]), dtype=np.float64)
+                rows.append(row.astype(np.float32))
+                nearest = np.minimum(nearest, row[ring_idx])
+                nxt = int(np.argmax(nearest))
+                if nearest[nxt] <= 0.0:
+                    break
+        finally:
+            astar.deadline = deadline
+        return cls(astar.thred, chosen, np.stack(rows))
+
+    @property
+    def count(self) -> int:
+        return len(self.cells)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.dist.nbytes)
+
+    def matches(self, grid: Grid) -> bool:
+        return self.dist.ndim == 2 and self.dist.shape[1] == grid.num_lon * grid.num_lat
+
+    def rows(self) -> List[memoryview]:
+        """各地标一行的 float32 视图（逐格取值为 Python float），首次使用时创建，不复制代价表"""
+        if self._rows is None:
+            self._rows = [memoryview(np.ascontiguousarray(row)) for row in self.dist]
+        return self._rows
+
+    def heuristic_to(self, grid: Grid, end: Tuple[int, int]) -> Optional[Callable[[int, int], float]]:
+        """
+        到终点 end 的启发式 h(x, y) = max(八向距离, ALT 下界)；与终点不连通的格子为 inf。
+        每次搜索只取一次终点所在列 d(L, 终点)，各格的下界在入堆时按需计算（O(地标数)）。
+        没有地标与终点连通时返回 None（调用方退回八向距离）。
+        """
+        num_lat = grid.num_lat
+        end_idx = end[0] * num_lat + end[1]
+        pairs = [(row, row[end_idx]) for row in self.rows()]
+        pairs = [(row, d_t) for row, d_t in pairs if d_t != math.inf]
+        if not pairs:
+            return None
+        ex, ey = end
+        gap_lon, gap_lat = grid.gap_lon, grid.gap_lat
+        diag = math.sqrt(2) - 2
+        inf = math.inf
+
+        def h(x: int, y: int) -> float:
+            dx = abs(x - ex) * gap_lon
+            dy = abs(y - ey) * gap_lat
+            best = diag * min(dx, dy) + dx + dy
+            idx = x * num_lat + y
+            for row, d_t in pairs:
+                d = row[idx]
+                if d == inf:
+                    # 地标可达终点而不可达该格：两格不连通
+                    return inf
+                lower = abs(d - d_t) - ALT_SLACK * (d + d_t)
+                if lower > best:
+                    best = lower
+            return best
+
+        return h
+
+def build_tables(astar: Any, thresholds: Sequence[float], count: int = 8) -> Dict[float, LandmarkTable]:
+    """为同一网格的多个障碍阈值分别构建代价表（构建期间临时切换 astar.thred）"""
+    thred = astar.thred
+    tables = {}
+    try:
+        for t in thresholds:
+            astar.thred = t
+            tables[t] = LandmarkTable.build(astar, count)
+    finally:
+        astar.thred = thred
+    return tables
+
+
+def snapshot_layers(tables: Sequence[LandmarkTable]) -> Tuple[Dict[str, np.ndarray], List[Dict]]:
+    """代价表转为快照附加层（landmarks_<i>）与元信息条目"""
+    layers, entries = {}, []
+    for i, table in enumerate(tables):
+        name = f"landmarks_{i}"
+        layers[name] = np.asarray(table.dist, dtype=np.float32)
+        entries.append({"layer": name, "thred": table.thred, "cells": [list(c) for c in table.cells]})
+    return layers, entries
+
+
+def tables_from_snapshot(meta: Dict[str, Any], layers: Dict[str, np.ndarray]) -> Dict[float, LandmarkTable]:
+    return {
+        entry["thred"]: LandmarkTable(entry["thred"], [tuple(c) for c in entry["cells"]], layers[entry["layer"]])
+        for entry in meta.get("landmarks", [])
+    }
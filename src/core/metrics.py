@@ -0,0 +1,186 @@
+"""
+轻量的进程内指标（Prometheus 文本格式），不依赖 prometheus_client。
+- Counter / Histogram：在规划各阶段打点，线程安全（计算线程池中同样可用）
+- 采集回调（collector）：抓取 /metrics 时才读取各缓存、准入控制已有的计数，平时零开销
+REGISTRY.enabled 为 False 时 stage_timer 返回空上下文、observe/inc 直接返回，打点开销可忽略。
+进程池后端下，工作进程内的阶段（建网格、A* 搜索等）不会回传到主进程的指标。
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+Sample = Tuple[Dict[str, str], float]
+# 采集回调返回 [(指标名, 类型, 说明, [(标签, 值), ...]), ...]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _format_value(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    items = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        items.append(f'{k}="{v}"')
+    return "{" + ",".join(items) + "}"
+
+
+class Counter:
+    def __init__(self, registry: 'Registry', name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(v)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, registry: 'Registry', name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = SECONDS_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # 标签 -> [各桶计数..., 总和, 总数]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(tuple(str(labels[n]) for n in self.labelnames))
+        return state[-1] if state else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, state in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets, state):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {state[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {state[-1]}")
+        return lines
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Registry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: List = []
+        self._collectors: List[Collector] = []
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(self, name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = SECONDS_BUCKETS) -> Histogram:
+        metric = Histogram(self, name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, v in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(v)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "pathplan_stage_seconds", "各规划阶段耗时（秒）", ("stage",))
+ROUTE_HOPS = REGISTRY.histogram(
+    "pathplan_route_hops", "每条路线的局部搜索跳数", buckets=COUNT_BUCKETS)
+ASTAR_EXPANSIONS = REGISTRY.counter(
+    "pathplan_astar_expansions_total", "A* 扩展的节点总数")
+TERMINAL_CANDIDATES = REGISTRY.counter(
+    "pathplan_terminal_candidates_total", "局部搜索尝试的边界候选终点总数")
+PREFETCH_TILES = REGISTRY.counter(
+    "pathplan_prefetch_tiles_total", "走廊预取：发出 / 被逐跳查询命中 / 规划结束时放弃的瓦片数", ("result",))
+
+
+@contextmanager
+def _timer(stage: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage=stage)
+
+
+def stage_timer(stage: str):
+    """统计 with 块耗时到 pathplan_stage_seconds{stage=...}；指标关闭时为空操作"""
+    if not REGISTRY.enabled:
+        return _NULL_TIMER
+    return _timer(stage)
@@ -1,9 +1,26 @@
 import time
-from typing import Optional, List, Callable, Awaitable, Union
-from .astar import AStar
-from .grid import LLA, distance
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional, List, Callable, Awaitable, Union, Tuple, Dict, Set, Any, AsyncContextManager
+import logging
+from array import array
+import numpy as np
+from .astar import AStar, DeadlineExceeded
+from .grid import LLA, LLABuffer, distance, pack_llas, unpack_llas
+from .prefetch import CorridorPrefetcher
+from .flow_field import FlowField
+from .postprocess import join_segments, default_stages, run_stages
+from .thresholds import scan_grid
+from .executor import ComputeExecutor
+from .workspace import WorkspacePool
+from . import metrics
+from .metrics import stage_timer
+from .trace import PlanTrace, activate as activate_trace
 import asyncio
 
+logger = logging.getLogger(__name__)
+
 
 def is_colinear(p1, p2, p3, tol=1e-6):
     """判断三点是否共线"""
@@ -14,173 +31,27 @@ def is_colinear(p1, p2, p3, tol=1e-6):
 
 
 def merge_trajectories_smart(
-    trajectory_segments,
+    trajectory_segments: List[Union[List[LLA], LLABuffer]],
     tol=0.0001,
     origin: Optional[LLA] = None,
     target: Optional[LLA] = None,
     gap_lon: Optional[float] = None,
-    gap_lat: Optional[float] = None
-):
+    gap_lat: Optional[float] = None,
+    simplify_km: float = 0.0
+) -> LLABuffer:
     """
-    合并多段轨迹：
+    合并多段轨迹（各段为 LLA 列表或 LLABuffer），返回 LLABuffer：
     1. 去掉重复点与过近点；
     2. 合并成一条连续轨迹；
-    3. 共线点只保留首尾两点。
+    3. 共线点只保留首尾两点；
+    4. 消除回退、反向重叠与近点回环，修正首尾方向；
+    5. simplify_km > 0 时再做 Douglas–Peucker 抽稀。
+    各步骤见 postprocess.default_stages。
     """
-    if not trajectory_segments:
-        return []
-
-    merged = []
-    for seg in trajectory_segments:
-        if not seg:
-            continue
-        if not merged:
-            merged.extend(seg)
-        else:
-            if merged[-1] == seg[0]:
-                merged.extend(seg[1:])
-            else:
-                merged.extend(seg)
-
-    filtered = [merged[0]]
-    for p in merged[1:]:
-        if distance(filtered[-1].lon, filtered[-1].lat, p.lon, p.lat) < tol:
-            continue
-        filtered.append(p)
-
-    result = [filtered[0]]
-    for i in range(1, len(filtered) - 1):
-        if is_colinear(filtered[i - 1], filtered[i], filtered[i + 1]):
-            continue
-        result.append(filtered[i])
-    result.append(filtered[-1])
-
-    # 反向回退消除：若出现 A->B->C->B->A（或局部 C->B）等回退段，消去重复路段
-    def lla_close(p: LLA, q: LLA, eps: float) -> bool:
-        return distance(p.lon, p.lat, q.lon, q.lat) < eps
-
-    stack: List[LLA] = []
-    for pt in result:
-        if stack and lla_close(stack[-1], pt, tol):
-            # 相邻重复点，跳过
-            continue
-        if len(stack) >= 2 and lla_close(stack[-2], pt, tol):
-            # 发现回退（... X, Y, X），消去 Y，并不压入 pt（等价回到 X）
-            stack.pop()
-            continue
-        stack.append(pt)
-    result = stack
-
-    # 相邻反向重叠消除：仅针对相邻两段（避免影响正常同向轨迹）
-    #    若出现 ... A->B->C 且新段 B->C 与上段 A->B 近似共线且方向明显相反，则弹出 B（合并反向段）
-    def colinear(a: LLA, b: LLA, c: LLA, ang_eps: float = 1e-3) -> bool:
-        v1x, v1y = b.lon - a.lon, b.lat - a.lat
-        v2x, v2y = c.lon - a.lon, c.lat - a.lat
-        # 归一化夹角余弦接近 ±1 视为共线
-        da = (v1x*v1x + v1y*v1y) ** 0.5
-        db = (v2x*v2x + v2y*v2y) ** 0.5
-        if da == 0 or db == 0:
-            return True
-        cosv = (v1x*v2x + v1y*v2y) / (da*db)
-        return abs(1.0 - abs(cosv)) < ang_eps
-
-    simp: List[LLA] = []
-    for p in result:
-        if not simp:
-            simp.append(p)
-            continue
-        # 相邻反向重叠，仅移除“回退”点，不改动正常同向行进
-        if len(simp) >= 2:
-            a2 = simp[-1]
-            a1 = simp[-2]
-            # 共线且方向明显相反且与上段有足够重叠（通过中点距离近似判断）
-            v1x, v1y = a2.lon - a1.lon, a2.lat - a1.lat
-            v2x, v2y = p.lon - a2.lon, p.lat - a2.lat
-            da = (v1x*v1x + v1y*v1y) ** 0.5
-            db = (v2x*v2x + v2y*v2y) ** 0.5
-            cosv = 1.0 if da == 0 or db == 0 else (v1x*v2x + v1y*v2y) / (da*db)
-            if colinear(a1, a2, p) and cosv < -0.99:
-                # 检查重叠长度（近似：a1-a2 与 a2-p 的较短长度是否>阈值）
-                min_km = 0.03
-                if min(da, db) > min_km:
-                    simp.pop()  # 移除回退点 a2
-                    # 可能仍有回退，继续用新的末尾再判一次
-                    if len(simp) >= 1:
-                        a2 = simp[-1]
-        # 追加当前点
-        if not simp or distance(simp[-1].lon, simp[-1].lat, p.lon, p.lat) >= tol:
-            simp.append(p)
-    result = simp
-
-    # 近点回环合并：若出现 ... A -> X -> ... -> A'（A' 接近 A）则收缩为 ... A（或 A -> A'）
-    def loop_prune(points: List[LLA]) -> List[LLA]:
-        if not points:
-            return points
-        kept: List[LLA] = []
-        for p in points:
-            # 基于格网间距估计“近点”阈值（单位：km）
-            if gap_lon is not None and gap_lat is not None:
-                # 使用当前纬度估算经、纬方向的 1 格物理长度
-                km_lon = distance(p.lon, p.lat, p.lon + gap_lon, p.lat)
-                km_lat = distance(p.lon, p.lat, p.lon, p.lat + gap_lat)
-                near_km = max(km_lon, km_lat) * 1.2  # 略放宽
-            else:
-                near_km = 0.03  # ~30m 作为保守近点阈值
-
-            def is_adjacent_grid(a: LLA, b: LLA) -> bool:
-                if gap_lon and gap_lat and gap_lon > 0 and gap_lat > 0:
-                    dx = round((b.lon - a.lon) / gap_lon)
-                    dy = round((b.lat - a.lat) / gap_lat)
-                    return max(abs(dx), abs(dy)) <= 1
-                # 回退：没有格距时用物理近邻
-                return distance(a.lon, a.lat, b.lon, b.lat) < near_km
-
-            # 查找是否接近某个历史点 A
-            merged = False
-            for j in range(len(kept)):
-                # 仅当存在中间段（j 严格小于当前末尾）时才认为是“回环”
-                if j < len(kept) - 1 and is_adjacent_grid(kept[j], p):
-                    # 收缩为 ... A（丢弃中间回环段），A 即 kept[j]
-                    kept = kept[:j+1]
-                    merged = True
-                    break
-            if not merged:
-                # 正常追加
-                if not kept or distance(kept[-1].lon, kept[-1].lat, p.lon, p.lat) >= tol:
-                    kept.append(p)
-        return kept
-
-    result = loop_prune(result)
-
-    # 首尾方向一致性修正：避免相邻两点与端点方向发生>90°的反向折返
-    def angle_cos(ax, ay, bx, by):
-        da = (ax**2 + ay**2) ** 0.5
-        db = (bx**2 + by**2) ** 0.5
-        if da == 0 or db == 0:
-            return 1.0
-        return (ax * bx + ay * by) / (da * db)
-
-    # 首端修正：比较 (origin->first) 与 (first->second)
-    if origin is not None and len(result) >= 2:
-        f0, f1 = result[0], result[1]
-        v1x, v1y = f1.lon - f0.lon, f1.lat - f0.lat
-        v0x, v0y = f0.lon - origin.lon, f0.lat - origin.lat
-        # 角度 > 90° 等价于余弦 < 0
-        if angle_cos(v0x, v0y, v1x, v1y) < 0:
-            # 将起点段改为 origin -> second（丢弃第一个点）
-            result = [f1] + result[2:]
-
-    # 末端修正：比较 (second_last->last) 与 (last->target)
-    if target is not None and len(result) >= 2:
-        p_last = result[-1]
-        p_prev = result[-2]
-        v1x, v1y = p_last.lon - p_prev.lon, p_last.lat - p_prev.lat
-        v2x, v2y = target.lon - p_last.lon, target.lat - p_last.lat
-        if angle_cos(v1x, v1y, v2x, v2y) < 0:
-            # 将最后一段改为 second_last -> target（丢弃最后一个点）
-            result = result[:-1]
-
-    return result
+    merged = join_segments(trajectory_segments)
+    if not len(merged):
+        return LLABuffer.empty()
+    return run_stages(merged, default_stages(tol, origin, target, gap_lon, gap_lat, simplify_km))
 
 
 def merge_trajectory(traj_list, dist_thresh=0.00001):
@@ -220,16 +91,357 @@ def merge_trajectory(traj_list, dist_thresh=0.00001):
     return final_traj
 
 
+def tile_half_span(data: Union[List[LLA], LLABuffer]) -> Tuple[float, float]:
+    """瓦片经、纬方向跨度的一半（度）：瓦片以查询点为中心，一跳最多前进这么远，用于预测后续各跳的起点"""
+    if isinstance(data, LLABuffer):
+        min_lon, min_lat, max_lon, max_lat = data.bounds()
+    else:
+        min_lon, max_lon = min(p.lon for p in data), max(p.lon for p in data)
+        min_lat, max_lat = min(p.lat for p in data), max(p.lat for p in data)
+    return (max_lon - min_lon) * 0.5, (max_lat - min_lat) * 0.5
+
+
+# 栅格高程为嵌套 Python 列表：每格约 8 字节指针 + 24 字节 float 对象
+RASTER_CELL_BYTES = 32
+
+
+def raster_nbytes(raster) -> int:
+    """export_raster() 结果的内存估算（字节）"""
+    header = raster[0]
+    return int(header["num_lon"] * header["num_lat"] * RASTER_CELL_BYTES)
+
+
+class GridCache:
+    """
+    已构建栅格的复用缓存：同一份查询结果（同一对象，通常来自查询缓存）只做一次 Grid.init，
+    供批量规划中共享瓦片的多个起终点对复用。按 LRU 保留最多 max_entries 个栅格、总计至多 max_bytes 字节
+    （栅格按 raster_nbytes 估算，另计所引用查询结果的 nbytes；单个超过 max_bytes 的不缓存），线程安全。
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._rasters = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, data: List[LLA]):
+        with self._lock:
+            entry = self._rasters.get(id(data))
+            # 同时保存数据对象本身，避免对象回收后 id 被复用导致误命中
+            if entry is None or entry[0] is not data:
+                self.misses += 1
+                return None
+            self._rasters.move_to_end(id(data))
+            self.hits += 1
+            return entry[1]
+
+    def put(self, data: List[LLA], raster):
+        size = raster_nbytes(raster) + (data.nbytes if isinstance(data, LLABuffer) else 0)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._rasters.pop(id(data), None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._rasters[id(data)] = (data, raster, size)
+            self.bytes += size
+            while len(self._rasters) > self.max_entries or self.bytes > self.max_bytes:
+                _, evicted = self._rasters.popitem(last=False)
+                self.bytes -= evicted[2]
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._rasters), "bytes": self.bytes,
+                "evictions": self.evictions}
+
+
+def init_grid(astar: AStar, data: List[LLA], grid_cache: Optional[GridCache] = None) -> bool:
+    """构建网格；提供 grid_cache 时优先复用同一查询结果已构建的栅格"""
+    with stage_timer("grid_init"):
+        if grid_cache is None or not data:
+            return astar.init(data)
+        raster = grid_cache.get(data)
+        if raster is not None:
+            astar.load_raster(raster)
+            return True
+        ok = astar.init(data)
+        if ok:
+            grid_cache.put(data, astar.export_raster())
+        return ok
+
+
+# ---------------- 计算阶段（可在线程/进程池中执行） ----------------
+# 进程池版本（*_packed）在工作进程内复用的工作区；线程/内联模式下由 PathPlan 的 workspace_pool 提供
+_packed_workspaces = WorkspacePool(max_idle=2)
+
+
+def search_hop(
+    astar: AStar, start: LLA, end: LLA, candidates: Optional[List[Dict]] = None
+) -> Tuple[LLABuffer, bool]:
+    """
+    在已构建好的网格上，按启发式顺序尝试边界候选终点，返回第一条可行路径。
+    candidates: 若提供，逐个追加候选终点的搜索统计（追踪模式）
+    """
+    astar.set_start(start)
+    astar.set_end(end)
+    with stage_timer("terminal_search"):
+        for i, new_ter_idx in enumerate(astar.get_terminal_bound(start, end)):
+            astar.check_deadline()
+            astar.set_end_idx(new_ter_idx)
+            metrics.TERMINAL_CANDIDATES.inc()
+            t0 = time.perf_counter()
+            with stage_timer("astar_search"):
+                path, ok = astar.search()
+            metrics.ASTAR_EXPANSIONS.inc(astar.expansions)
+            if candidates is not None:
+                ter = astar.index_to_lla(new_ter_idx)
+                candidates.append({
+                    "target": {"lon": ter.lon, "lat": ter.lat},
+                    "expanded": astar.expansions,
+                    "pushed": astar.pushed,
+                    "found": bool(ok and len(path)),
+                    "search_s": round(time.perf_counter() - t0, 6),
+                })
+            logger.debug("[LocalSearch] Try %d: cur_ori=%s, expanded=%d, found=%s", i + 1, start, astar.expansions, ok)
+            if ok and len(path):
+                return path, True
+    return LLABuffer.empty(), False
+
+
+def plan_hop(
+    astar: AStar, data: List[LLA], start: LLA, end: LLA, deadline: Optional[float] = None,
+    grid_cache: Optional[GridCache] = None, stats: Optional[Dict] = None
+) -> Tuple[bool, LLABuffer, bool]:
+    """
+    单跳计算：构建网格 + 局部搜索。返回 (网格是否构建成功, 路径, 是否成功)
+    deadline: 截止时间（time.time() 时间戳），超时抛出 DeadlineExceeded
+    grid_cache: 可选的栅格复用缓存
+    stats: 若提供，写入网格元信息、建网格耗时与各候选终点的搜索统计（追踪模式）
+    """
+    astar.deadline = deadline
+    t0 = time.perf_counter()
+    init_ok = init_grid(astar, data, grid_cache)
+    if stats is not None:
+        stats["grid_init_s"] = round(time.perf_counter() - t0, 6)
+        stats["grid"] = astar.header() if init_ok else None
+    if not init_ok:
+        return False, LLABuffer.empty(), False
+    path, ok = search_hop(astar, start, end, None if stats is None else stats.setdefault("candidates", []))
+    return True, path, ok
+
+
+def plan_hop_packed(
+    tile: array, thred: float, start: Tuple[float, float, float], end: Tuple[float, float, float],
+    deadline: Optional[float] = None, collect_stats: bool = False
+):
+    """
+    plan_hop 的进程池版本：输入为紧凑瓦片数组，输出路径（LLABuffer）并附带网格元信息；
+    collect_stats 为 True 时额外返回追踪统计（否则为 None）
+    """
+    stats = {} if collect_stats else None
+    with _packed_workspaces.checkout(thred) as astar:
+        init_ok, path, ok = plan_hop(astar, unpack_llas(tile), LLA(*start), LLA(*end), deadline, stats=stats)
+        return init_ok, path, ok, astar.header(), stats
+
+
+def plan_tree(
+    astar: AStar, data: List[LLA], start: LLA, targets: List[LLA], deadline: Optional[float] = None,
+    grid_cache: Optional[GridCache] = None
+) -> Tuple[bool, List[Tuple[bool, Optional[LLABuffer]]]]:
+    """
+    一对多计算：构建网格 + 从 start 生长一棵最短路树。
+    返回 (网格是否构建成功, [(目标是否在网格内, 路径或 None)])，与 targets 一一对应。
+    """
+    astar.deadline = deadline
+    if not init_grid(astar, data, grid_cache):
+        return False, [(False, None)] * len(targets)
+    astar.set_start(start)
+    idxs = [astar.get_index(t) if astar.is_in_grid(t) else None for t in targets]
+    found = astar.search_many([i for i in idxs if i is not None])
+    return True, [(i is not None, found.get(i) if i is not None else None) for i in idxs]
+
+
+def plan_tree_packed(
+    tile: array, thred: float, start: Tuple[float, float, float], targets: List[Tuple[float, float, float]],
+    deadline: Optional[float] = None
+):
+    """plan_tree 的进程池版本"""
+    with _packed_workspaces.checkout(thred) as astar:
+        init_ok, items = plan_tree(astar, unpack_llas(tile), LLA(*start), [LLA(*t) for t in targets], deadline)
+        return init_ok, items, astar.header()
+
+
+def build_flow_field(
+    astar: AStar, data: List[LLA], goal: LLA, deadline: Optional[float] = None,
+    grid_cache: Optional[GridCache] = None
+) -> Optional[FlowField]:
+    """构建网格并从 goal 计算反向代价场；goal 不在网格内或为障碍时返回 None"""
+    astar.deadline = deadline
+    if not init_grid(astar, data, grid_cache) or not astar.is_in_grid(goal):
+        return None
+    goal_idx = astar.get_index(goal)
+    if not astar.moveable(goal_idx):
+        return None
+    costs = astar.cost_field(goal_idx)
+    astar.deadline = None
+    return FlowField(astar, goal_idx, costs)
+
+
+def build_flow_field_packed(
+    tile: array, thred: float, goal: Tuple[float, float, float], deadline: Optional[float] = None
+) -> Optional[FlowField]:
+    """build_flow_field 的进程池版本（FlowField 可直接 pickle 回传）"""
+    return build_flow_field(AStar(thred), unpack_llas(tile), LLA(*goal), deadline)
+
+
+def scan_thresholds(
+    astar: AStar, data: List[LLA], start: LLA, end: LLA, thresholds: List[float], search_lowest: bool = False,
+    grid_cache: Optional[GridCache] = None
+) -> Optional[dict]:
+    """
+    多阈值可行性判断：网格只构建一次，各阈值的障碍掩码由向量化比较得到。
+    返回 {"in_grid", "feasible", "lowest"}；终点不在网格内时 feasible 全为 None（无法在本瓦片内判断）。
+    网格构建失败返回 None。
+    """
+    if not init_grid(astar, data, grid_cache):
+        return None
+    if not astar.is_in_grid(end):
+        return {"in_grid": False, "feasible": [None] * len(thresholds), "lowest": None}
+    feasible, lowest = scan_grid(astar, astar.get_index(start), astar.get_index(end), thresholds, search_lowest)
+    return {"in_grid": True, "feasible": feasible, "lowest": lowest}
+
+
+def scan_thresholds_packed(
+    tile: array, start: Tuple[float, float, float], end: Tuple[float, float, float],
+    thresholds: List[float], search_lowest: bool = False
+) -> Optional[dict]:
+    """scan_thresholds 的进程池版本"""
+    return scan_thresholds(AStar(), unpack_llas(tile), LLA(*start), LLA(*end), thresholds, search_lowest)
+
+
+def build_grid_packed(tile: array, thred: float):
+    """Grid.init 的进程池版本：返回 (是否成功, 网格元信息, 高程栅格)"""
+    astar = AStar(thred)
+    ok = astar.init(unpack_llas(tile))
+    return ok, astar.header(), astar.altitude
+
+
 class PathPlan:
-    def __init__(self, query_func: Union[Callable[[LLA], Optional[List[LLA]]], Callable[[LLA], Awaitable[Optional[List[LLA]]]]]):
+    def __init__(
+        self,
+        query_func: Union[Callable[[LLA], Optional[List[LLA]]], Callable[[LLA], Awaitable[Optional[List[LLA]]]]],
+        prefetch: int = 0,
+        prefetch_max_tiles: int = 1,
+        executor: Optional[ComputeExecutor] = None,
+        grid_cache: Optional[GridCache] = None,
+        simplify_km: float = 0.0,
+        trace: Optional[PlanTrace] = None,
+        workspace_pool: Optional[WorkspacePool] = None,
+        prefetch_snap: Optional[Callable[[float, float], Tuple[float, float]]] = None
+    ):
         """
         支持同步或异步查询函数。
         query_func: 可以是同步函数 (LLA) -> List[LLA] 或异步函数 (LLA) -> Awaitable[List[LLA]]
+        prefetch: 走廊预取的最大在途查询数（仅异步查询函数有效，0 表示关闭）；
+            预取依赖查询函数自身带缓存，否则预取结果无法被后续逐跳查询复用
+        prefetch_max_tiles: 每跳沿走廊向前预取的最多瓦片（跳）数
+        executor: 计算阶段（网格构建、A* 搜索、轨迹合并）的执行后端，默认在事件循环内直接执行
+        grid_cache: 栅格复用缓存，多个 PathPlan 共享时相同瓦片只构建一次网格（进程池后端下不生效）
+        simplify_km: 合并后 Douglas–Peucker 抽稀的容差（km），0 表示不抽稀
+        trace: 可选的规划追踪（PlanTrace），PathPlanPair 逐跳写入统计，用于调参与排查
+        workspace_pool: 若提供，从池中借出 AStar 工作区（复用搜索缓冲区），用完需 release()（或 with 语句）归还
+        prefetch_snap: 预取点对齐到查询缓存格子的函数（如 AsyncQueryHelper.cache_cell），使预取与逐跳查询落在同一缓存条目
         """
         self._query_func = query_func
         self._is_async = asyncio.iscoroutinefunction(query_func)
-        self._AStar = AStar()
-        self.visited_ori=set()
+        self._pool = workspace_pool
+        self._AStar = workspace_pool.acquire() if workspace_pool is not None else AStar()
+        # 提交到线程/进程池、尚未结束的计算任务；release 时若仍有任务在跑，推迟到最后一个结束后再归还工作区
+        self._jobs: Set[Future] = set()
+        self._jobs_lock = threading.Lock()
+        self._pending_pool: Optional[WorkspacePool] = None
+        self.prefetch = prefetch if self._is_async else 0
+        self.prefetch_max_tiles = prefetch_max_tiles
+        self.prefetch_snap = prefetch_snap
+        self._executor = executor or ComputeExecutor("inline")
+        self._grid_cache = grid_cache
+        self.simplify_km = simplify_km
+        self.trace = trace
+
+    def release(self):
+        """
+        把借出的工作区还回池中（可重复调用）；之后不能再用本实例规划。
+        请求被取消时池中的计算任务不会随之停止，仍可能在使用 self._AStar，此时推迟到任务结束再归还。
+        """
+        with self._jobs_lock:
+            pool, self._pool = self._pool, None
+            if pool is None:
+                return
+            if self._jobs:
+                self._pending_pool = pool
+                return
+        pool.release(self._AStar)
+
+    def _track_job(self, job: Future):
+        with self._jobs_lock:
+            self._jobs.add(job)
+        job.add_done_callback(self._job_done)
+
+    def _job_done(self, job: Future):
+        # 在池线程（或已结束时在提交方）中回调
+        with self._jobs_lock:
+            self._jobs.discard(job)
+            pool = self._pending_pool if not self._jobs else None
+            if pool is not None:
+                self._pending_pool = None
+        if pool is not None:
+            pool.release(self._AStar)
+
+    async def _run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """经计算后端执行，并登记在途任务（见 release）"""
+        return await self._executor.run_job(fn, args, kwargs, self._track_job)
+
+    def __enter__(self) -> 'PathPlan':
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def _query(self, lla: LLA) -> Optional[List[LLA]]:
+        if self._is_async:
+            return await self._query_func(lla)
+        return self._query_func(lla)
+
+    async def init_grid(self, data: List[LLA]) -> bool:
+        """通过计算后端构建网格（进程池模式下在子进程构建后同步回本进程）"""
+        if not self._executor.is_process:
+            return await self._run(init_grid, self._AStar, data, self._grid_cache)
+        if not data:
+            return False
+        ok, header, altitude = await self._run(build_grid_packed, pack_llas(data), self._AStar.thred)
+        self._AStar.apply_header(header)
+        self._AStar.altitude = altitude
+        return ok
+
+    async def _plan_hop(
+        self, data: List[LLA], start: LLA, end: LLA, deadline: Optional[float] = None,
+        stats: Optional[Dict] = None
+    ) -> Tuple[bool, LLABuffer, bool]:
+        if not self._executor.is_process:
+            return await self._run(plan_hop, self._AStar, data, start, end, deadline, self._grid_cache, stats)
+        init_ok, path, ok, header, hop_stats = await self._run(
+            plan_hop_packed, pack_llas(data), self._AStar.thred,
+            (start.lon, start.lat, start.alt), (end.lon, end.lat, end.alt), deadline, stats is not None
+        )
+        # 进程池模式下本进程只同步网格元信息（后续 get_index / 合并只依赖范围与间距）
+        self._AStar.apply_header(header)
+        if stats is not None:
+            stats.update(hop_stats)
+        return init_ok, path, ok
 
     async def _update_grid(self, lla:LLA):
         """更新网格数据，支持异步查询"""
@@ -248,7 +460,7 @@ class PathPlan:
         self._AStar.set_end(ter)
         new_ter_idx, _ = self._AStar.terminal_reset(cur_ori, ter)
         self._AStar.set_end_idx(new_ter_idx)
-        print(f"cur_ori:{cur_ori}")
+        logger.debug("cur_ori:%s", cur_ori)
         paths = []
         path, ok = self._AStar.search()
         if ok:
@@ -263,8 +475,8 @@ class PathPlan:
             self._AStar.set_end(ter)
             new_ter_idx, _ = self._AStar.terminal_reset(cur_ori, ter)
             self._AStar.set_end_idx(new_ter_idx)
-            self._AStar.print_grid()
-            print(f"cur_ori:{cur_ori}, cur_ter:{ter}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("cur_ori:%s, cur_ter:%s\n%s", cur_ori, ter, self._AStar.grid_text())
 
             path, ok = self._AStar.search()
             if ok:
@@ -274,75 +486,252 @@ class PathPlan:
                 return [], ok
         return merge_trajectory(paths), ok
 
-    async def PathPlanPair(self, ori: LLA, ter: LLA, thred: float):
+    async def PathPlanPair(
+        self, ori: LLA, ter: LLA, thred: float, deadline: Optional[float] = None,
+        on_segment: Optional[Callable[[List[LLA]], None]] = None
+    ):
         """
         分块贪心路径规划（异步版本）。
         thred: 海拔高于 thred 认定为障碍
+        deadline: 截止时间（time.time() 时间戳），超时抛出 DeadlineExceeded，None 表示不限
+        on_segment: 每确认一跳路径（合并前）立即回调，用于流式输出
+        构造时传入 trace 时，逐跳统计与查询缓存结果写入 self.trace
         """
         self._AStar.thred = thred
+        self._AStar.deadline = deadline
+        trace = self.trace
         cur_ori = ori
         paths = []
-        self.visited_ori.add((cur_ori.lon, cur_ori.lat))
+        # 已作为某一跳起点的位置，再次出现说明贪心规划在绕圈（每次规划独立，不跨调用累积）
+        visited_ori = {(cur_ori.lon, cur_ori.lat)}
+        prefetcher = None
+        if self.prefetch > 0:
+            prefetcher = CorridorPrefetcher(self._query_func, self.prefetch, self.prefetch_max_tiles,
+                                            self.prefetch_snap)
+
+        def finish(outcome: str, message: Optional[str] = None):
+            if message is not None:
+                logger.debug(message)
+            if trace is not None:
+                trace.outcome = outcome
 
         async def local_search(start: LLA, end: LLA):
-            st = time.time()
-            res = await self._update_grid(start)
+            self._AStar.check_deadline()
+            hop = None
+            if trace is not None:
+                hop = {"index": len(trace.hops), "start": {"lon": start.lon, "lat": start.lat}}
+                trace.hops.append(hop)
+            t0 = time.perf_counter()
+            if prefetcher is not None:
+                prefetcher.note_query(start)
+            with stage_timer("query"):
+                query_data = await self._query(start)
+            if hop is not None:
+                hop["query_s"] = round(time.perf_counter() - t0, 6)
+                hop["tile_points"] = len(query_data) if query_data else 0
+            if not query_data:
+                logger.debug("高程信息缺失，查询点：%s", start)
+                return [], False, start
+            if prefetcher is not None:
+                # 当前瓦片就绪后立即预取后续几跳起点所在的瓦片，与本跳 A* 搜索重叠
+                prefetcher.schedule_corridor(start, end, *tile_half_span(query_data))
+            t0 = time.perf_counter()
+            with stage_timer("hop"):
+                res, path, ok = await self._plan_hop(query_data, start, end, deadline, hop)
+            if hop is not None:
+                hop["hop_s"] = round(time.perf_counter() - t0, 6)
+                hop["found"] = bool(res and ok)
+                hop["path_points"] = len(path) if res and ok else 0
             if not res:
-                print(f"高程信息缺失，查询点：{start}")
+                logger.debug("高程信息缺失，查询点：%s", start)
                 return [], False, start
-            ed = time.time()
-            self._AStar.set_start(start)
-            self._AStar.set_end(end)
-
-            for i, new_ter_idx in enumerate(self._AStar.get_terminal_bound(start, end)):
-                print(f"[LocalSearch] Try {i+1}: cur_ori={start}, cur_ter=:{self._AStar.index_to_lla(new_ter_idx)}")
-                self._AStar.set_end_idx(new_ter_idx)
-                path, ok = self._AStar.search()
-                if ok and path:
-                    next_point = path[-1]
-                    ed2 = time.time()
-                    return path, True, next_point
-            ed2 = time.time()
+            if ok:
+                return path, True, path[-1]
             return [], False, start
 
-        first_path, ok, cur_ori = await local_search(cur_ori, ter)
-        if not ok:
-            print("初始局部区域内无法规划路径。")
-            return [], False
-        paths.append(first_path)
-
-        while True:
-            if (cur_ori.lon, cur_ori.lat) in self.visited_ori:
-                print("贪心规划出现重复，搜索停止。需要全局搜索。")
-                return [], False
-
-            self.visited_ori.add((cur_ori.lon, cur_ori.lat))
-
-            if self._AStar.get_index(cur_ori, if_clamp=False) == self._AStar.get_index(ter, if_clamp=False):
-                break
-
-            path, ok, new_ori = await local_search(cur_ori, ter)
-            if not ok:
-                print("当前网格内无法继续前进，停止规划。")
-                break
+        try:
+            with activate_trace(trace):
+                first_path, ok, cur_ori = await local_search(cur_ori, ter)
+                if not ok:
+                    no_data = trace is not None and trace.hops and not trace.hops[-1].get("grid")
+                    finish("no_elevation_data" if no_data else "no_initial_path", "初始局部区域内无法规划路径。")
+                    return [], False
+                paths.append(first_path)
+                if on_segment is not None:
+                    on_segment(first_path)
+
+                while True:
+                    if (cur_ori.lon, cur_ori.lat) in visited_ori:
+                        finish("revisited", "贪心规划出现重复，搜索停止。需要全局搜索。")
+                        return [], False
+
+                    visited_ori.add((cur_ori.lon, cur_ori.lat))
+
+                    if self._AStar.get_index(cur_ori, if_clamp=False) == self._AStar.get_index(ter, if_clamp=False):
+                        finish("reached")
+                        break
+
+                    path, ok, new_ori = await local_search(cur_ori, ter)
+                    if not ok:
+                        finish("stuck", "当前网格内无法继续前进，停止规划。")
+                        break
+
+                    paths.append(path)
+                    if on_segment is not None:
+                        on_segment(path)
+                    cur_ori = new_ori
+
+                    if self._AStar.get_index(cur_ori, if_clamp=False) == self._AStar.get_index(ter, if_clamp=False):
+                        finish("reached")
+                        break
+                self._AStar.check_deadline()
+                metrics.ROUTE_HOPS.observe(len(paths))
+                merge_path = await self._merge(paths, ori, ter, thred)
+                return merge_path, ok
+        finally:
+            if prefetcher is not None:
+                prefetcher.close()
+
+    async def _merge(self, paths: List[LLABuffer], ori: LLA, ter: LLA, thred: float) -> LLABuffer:
+        """合并各段轨迹并将高度限制在 [thred, 0]"""
+        t0 = time.perf_counter()
+        with stage_timer("merge"):
+            merge_path = await self._run(
+                merge_trajectories_smart,
+                paths,
+                origin=ori,
+                target=ter,
+                gap_lon=getattr(self._AStar, 'gap_lon', None),
+                gap_lat=getattr(self._AStar, 'gap_lat', None),
+                simplify_km=self.simplify_km
+            )
+        if self.trace is not None:
+            self.trace.merge = {
+                "segments": len(paths),
+                "points_before": sum(len(p) for p in paths),
+                "points_after": len(merge_path),
+                "merge_s": round(time.perf_counter() - t0, 6),
+            }
+
+        # 与逐点 min(0, max(alt, thred)) 等价
+        merge_path.alt = np.minimum(0.0, np.maximum(merge_path.alt, thred))
+        return merge_path
+
+    async def BuildFlowField(self, ter: LLA, thred: float, deadline: Optional[float] = None) -> Optional[FlowField]:
+        """查询终点所在瓦片并在计算后端构建以 ter 为目标的反向代价场"""
+        data = await self._query(ter)
+        if not data:
+            logger.debug("高程信息缺失，查询点：%s", ter)
+            return None
+        if not self._executor.is_process:
+            return await self._run(build_flow_field, AStar(thred), data, ter, deadline, self._grid_cache)
+        return await self._run(
+            build_flow_field_packed, pack_llas(data), thred, (ter.lon, ter.lat, ter.alt), deadline
+        )
 
-            paths.append(path)
-            cur_ori = new_ori
-
-            if self._AStar.get_index(cur_ori, if_clamp=False) == self._AStar.get_index(ter, if_clamp=False):
-                break
-        merge_path = merge_trajectories_smart(
-            paths,
-            origin=ori,
-            target=ter,
-            gap_lon=getattr(self._AStar, 'gap_lon', None),
-            gap_lat=getattr(self._AStar, 'gap_lat', None)
+    async def PathPlanFromField(self, field: FlowField, ori: LLA, ter: LLA, thred: float) -> Tuple[List[LLA], bool]:
+        """沿已缓存的代价场梯度得到 ori -> 终点路径（无搜索），ori 不在场内或不可达时返回 ([], False)"""
+        path = field.path_from(ori)
+        if not path:
+            return [], False
+        self._AStar.apply_header(field.astar.header())
+        return await self._merge([path], ori, ter, thred), True
+
+    async def ScanThresholds(
+        self, ori: LLA, ter: LLA, thresholds: List[float], search_lowest: bool = False
+    ) -> Optional[dict]:
+        """查询起点瓦片，判断各阈值下起终点在瓦片内是否连通（见 scan_thresholds）；缺少高程数据返回 None"""
+        data = await self._query(ori)
+        if not data:
+            logger.debug("高程信息缺失，查询点：%s", ori)
+            return None
+        if not self._executor.is_process:
+            return await self._run(
+                scan_thresholds, AStar(), data, ori, ter, thresholds, search_lowest, self._grid_cache
+            )
+        return await self._run(
+            scan_thresholds_packed, pack_llas(data), (ori.lon, ori.lat, ori.alt), (ter.lon, ter.lat, ter.alt),
+            thresholds, search_lowest
         )
 
-        for x in merge_path:
-            x.alt = min(0.0,max(x.alt, thred))
+    async def _plan_tree(
+        self, data: List[LLA], start: LLA, targets: List[LLA], deadline: Optional[float] = None
+    ) -> Tuple[bool, List[Tuple[bool, Optional[LLABuffer]]]]:
+        if not self._executor.is_process:
+            return await self._run(plan_tree, self._AStar, data, start, targets, deadline, self._grid_cache)
+        init_ok, items, header = await self._run(
+            plan_tree_packed, pack_llas(data), self._AStar.thred,
+            (start.lon, start.lat, start.alt), [(t.lon, t.lat, t.alt) for t in targets], deadline
+        )
+        self._AStar.apply_header(header)
+        return init_ok, items
 
-        return merge_path, ok
+    async def PathPlanOneToMany(
+        self, ori: LLA, ters: List[LLA], thred: float, deadline: Optional[float] = None,
+        max_parallel: int = 4, admit: Optional[Callable[[], AsyncContextManager]] = None
+    ) -> List[Union[Tuple[List[LLA], bool], Exception]]:
+        """
+        一对多路径规划：在起点所在瓦片内从起点生长一棵最短路树，瓦片内的所有终点共用同一棵树回溯路径；
+        瓦片外的终点退回逐个 PathPlanPair（同时至多 max_parallel 个）。返回与 ters 一一对应的 (路径, 是否成功)。
+        admit: 可选的准入名额工厂（返回异步上下文管理器，如 AdmissionController.slot）：共享树阶段与每个瓦片外终点
+            各占一个名额。共享树阶段的异常直接抛出；瓦片外终点超时（DeadlineExceeded）照常抛出，
+            其他异常（如准入被拒绝）不影响其余终点，该位置为对应的异常对象。
+        """
+        async def admitted(fn):
+            if admit is None:
+                return await fn()
+            async with admit():
+                return await fn()
+
+        async def plan_tree():
+            self._AStar.thred = thred
+            self._AStar.deadline = deadline
+            self._AStar.check_deadline()
+            data = await self._query(ori)
+            if not data:
+                logger.debug("高程信息缺失，查询点：%s", ori)
+                return None
+            init_ok, items = await self._plan_tree(data, ori, ters, deadline)
+            if not init_ok:
+                return None
+            merged = {}
+            for i, (in_grid, path) in enumerate(items):
+                if in_grid and path:
+                    merged[i] = await self._merge([path], ori, ters[i], thred)
+            return items, merged
+
+        tree = await admitted(plan_tree)
+        if tree is None:
+            return [([], False) for _ in ters]
+        items, merged = tree
+
+        results: List[Optional[Union[Tuple[List[LLA], bool], Exception]]] = [None] * len(ters)
+        outside = []
+        for i, (in_grid, path) in enumerate(items):
+            if not in_grid:
+                outside.append(i)
+            else:
+                results[i] = (merged[i], True) if i in merged else ([], False)
+
+        sem = asyncio.Semaphore(max(1, max_parallel))
+
+        async def plan_outside(i: int):
+            async def run():
+                with PathPlan(self._query_func, self.prefetch, self.prefetch_max_tiles, self._executor,
+                              self._grid_cache, self.simplify_km, workspace_pool=self._pool,
+                              prefetch_snap=self.prefetch_snap) as planner:
+                    return await planner.PathPlanPair(ori, ters[i], thred, deadline)
+
+            async with sem:
+                return await admitted(run)
+
+        planned = await asyncio.gather(*(plan_outside(i) for i in outside), return_exceptions=True)
+        for i, res in zip(outside, planned):
+            # 超时与取消照常抛出；其余异常（如准入拒绝）按终点返回，由调用方区分
+            if isinstance(res, DeadlineExceeded) or not isinstance(res, (tuple, Exception)):
+                raise res
+            results[i] = res
+        return results
 
 
 
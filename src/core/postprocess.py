@@ -0,0 +1,285 @@
+"""
+轨迹后处理流水线：路径以 LLABuffer（列式数组）表示，依次经过若干阶段（stage），
+每个阶段为 (LLABuffer) -> LLABuffer 的函数，可按需增删、替换或追加自定义阶段。
+阶段内部只在列数组或 Python float 列表上计算，不为每个点创建 LLA 对象。
+
+默认流水线与原 merge_trajectories_smart 的逐点处理结果一致：
+    dedupe -> collinear -> backtrack -> reverse_overlap -> loop_prune -> endpoints
+可选在末尾追加 douglas_peucker 进一步抽稀。
+"""
+import math
+from typing import Callable, Iterable, List, Optional, Union
+import numpy as np
+from .grid import LLA, LLABuffer, distance, distance_np
+
+Stage = Callable[[LLABuffer], LLABuffer]
+
+# 经纬度 1 度对应的地表弧长（km），与 distance() 使用相同的地球半径
+KM_PER_DEG = 6371.0 * math.pi / 180.0
+
+
+def join_segments(trajectory_segments: Iterable[Union[List[LLA], LLABuffer]]) -> LLABuffer:
+    """按列拼接各段轨迹；后一段首点与前一段末点完全相同时去掉该重复点"""
+    bufs = []
+    for seg in trajectory_segments:
+        if not len(seg):
+            continue
+        buf = seg if isinstance(seg, LLABuffer) else LLABuffer.from_llas(seg)
+        if bufs:
+            last = bufs[-1]
+            if last.lon[-1] == buf.lon[0] and last.lat[-1] == buf.lat[0] and last.alt[-1] == buf.alt[0]:
+                buf = buf[1:]
+                if not len(buf):
+                    continue
+        bufs.append(buf)
+    return LLABuffer.concat(bufs)
+
+
+def dedupe(tol: float) -> Stage:
+    """去掉与上一保留点距离小于 tol（km）的点"""
+    def stage(path: LLABuffer) -> LLABuffer:
+        n = len(path)
+        if n <= 1:
+            return path
+        d = distance_np(path.lon[:-1], path.lat[:-1], path.lon[1:], path.lat[1:])
+        if (d >= tol).all():
+            return path
+        # 存在近点时按顺序与“上一保留点”比较
+        lon, lat = path.lon.tolist(), path.lat.tolist()
+        keep = [0]
+        for i in range(1, n):
+            j = keep[-1]
+            if distance(lon[j], lat[j], lon[i], lat[i]) < tol:
+                continue
+            keep.append(i)
+        return path.take(np.array(keep))
+    return stage
+
+
+def collinear(tol: float = 1e-6) -> Stage:
+    """去掉与前后两点共线的中间点（与 is_colinear 判定一致，前后点取原序列中的邻点）"""
+    def stage(path: LLABuffer) -> LLABuffer:
+        n = len(path)
+        if n <= 2:
+            return path
+        dx = np.diff(path.lon)
+        dy = np.diff(path.lat)
+        cross = dx[:-1] * dy[1:] - dy[:-1] * dx[1:]
+        keep = np.ones(n, dtype=bool)
+        keep[1:-1] = ~(np.abs(cross) < tol)
+        return path.take(keep)
+    return stage
+
+
+def backtrack(tol: float) -> Stage:
+    """回退消除：出现 ... X, Y, X 时消去 Y 且不再压入第二个 X；相邻重复点跳过"""
+    def stage(path: LLABuffer) -> LLABuffer:
+        lon, lat = path.lon.tolist(), path.lat.tolist()
+        stack: List[int] = []
+        for i in range(len(lon)):
+            if stack and distance(lon[stack[-1]], lat[stack[-1]], lon[i], lat[i]) < tol:
+                continue
+            if len(stack) >= 2 and distance(lon[stack[-2]], lat[stack[-2]], lon[i], lat[i]) < tol:
+                stack.pop()
+                continue
+            stack.append(i)
+        return path.take(np.array(stack, dtype=np.int64))
+    return stage
+
+
+def _colinear_cos(ax, ay, bx, by, cx, cy, ang_eps: float = 1e-3) -> bool:
+    v1x, v1y = bx - ax, by - ay
+    v2x, v2y = cx - ax, cy - ay
+    da = (v1x * v1x + v1y * v1y) ** 0.5
+    db = (v2x * v2x + v2y * v2y) ** 0.5
+    if da == 0 or db == 0:
+        return True
+    cosv = (v1x * v2x + v1y * v2y) / (da * db)
+    return abs(1.0 - abs(cosv)) < ang_eps
+
+
+def reverse_overlap(tol: float, min_len: float = 0.03) -> Stage:
+    """
+    相邻反向重叠消除：A->B->C 中 B->C 与 A->B 近似共线、方向相反且两段都长于 min_len
+    （经纬度单位，与原实现相同）时移除回退点 B；同向行进不受影响。
+    """
+    def stage(path: LLABuffer) -> LLABuffer:
+        lon, lat = path.lon.tolist(), path.lat.tolist()
+        simp: List[int] = []
+        for i in range(len(lon)):
+            if not simp:
+                simp.append(i)
+                continue
+            if len(simp) >= 2:
+                a1, a2 = simp[-2], simp[-1]
+                v1x, v1y = lon[a2] - lon[a1], lat[a2] - lat[a1]
+                v2x, v2y = lon[i] - lon[a2], lat[i] - lat[a2]
+                da = (v1x * v1x + v1y * v1y) ** 0.5
+                db = (v2x * v2x + v2y * v2y) ** 0.5
+                cosv = 1.0 if da == 0 or db == 0 else (v1x * v2x + v1y * v2y) / (da * db)
+                if (cosv < -0.99 and min(da, db) > min_len
+                        and _colinear_cos(lon[a1], lat[a1], lon[a2], lat[a2], lon[i], lat[i])):
+                    simp.pop()
+            if not simp or distance(lon[simp[-1]], lat[simp[-1]], lon[i], lat[i]) >= tol:
+                simp.append(i)
+        return path.take(np.array(simp, dtype=np.int64))
+    return stage
+
+
+def loop_prune(tol: float, gap_lon: Optional[float] = None, gap_lat: Optional[float] = None,
+               near_km: float = 0.03) -> Stage:
+    """
+    近点回环合并：若当前点与某个更早的保留点 A 相邻（有格距时为格网 8 邻域，否则为 near_km 内），
+    丢弃 A 之后的回环段（当前点不追加）；A 取最早的一个。
+    已保留的点按空间哈希分桶，每个点只需检查周围常数个桶，整体 O(n)（原实现逐点回扫为 O(n²)）。
+    """
+    use_grid = bool(gap_lon and gap_lat and gap_lon > 0 and gap_lat > 0)
+
+    def stage(path: LLABuffer) -> LLABuffer:
+        n = len(path)
+        if n == 0:
+            return path
+        lon, lat = path.lon.tolist(), path.lat.tolist()
+        if use_grid:
+            # 相邻判定为 round(差值/格距) 不超过 1，即差值小于 1.5 格，桶下标相差至多 2
+            cell_lon, cell_lat, reach = gap_lon, gap_lat, 2
+
+            def adjacent(a: int, b: int) -> bool:
+                dx = round((lon[b] - lon[a]) / gap_lon)
+                dy = round((lat[b] - lat[a]) / gap_lat)
+                return max(abs(dx), abs(dy)) <= 1
+        else:
+            # 纬度方向 near_km 对应的度数；经度方向按路径上最大纬度处的缩放放宽
+            cell_lat = near_km / KM_PER_DEG
+            c = math.cos(math.radians(float(np.abs(path.lat).max())))
+            cell_lon = cell_lat / c if c > 1e-3 else 360.0
+            reach = 2
+
+            def adjacent(a: int, b: int) -> bool:
+                return distance(lon[a], lat[a], lon[b], lat[b]) < near_km
+
+        def cell_of(i: int):
+            return math.floor(lon[i] / cell_lon), math.floor(lat[i] / cell_lat)
+
+        kept: List[int] = []
+        # 桶内按在 kept 中的位置升序保存；截断 kept 时从尾部弹出，桶尾即被弹出的位置
+        buckets = {}
+        kept_cells = []
+        for i in range(n):
+            cx, cy = cell_of(i)
+            limit = len(kept) - 1
+            best = -1
+            for bx in range(cx - reach, cx + reach + 1):
+                for by in range(cy - reach, cy + reach + 1):
+                    bucket = buckets.get((bx, by))
+                    if not bucket:
+                        continue
+                    for pos in bucket:
+                        if pos >= limit or (best >= 0 and pos >= best):
+                            break
+                        if adjacent(kept[pos], i):
+                            best = pos
+                            break
+            if best >= 0:
+                while len(kept) > best + 1:
+                    kept.pop()
+                    buckets[kept_cells.pop()].pop()
+                continue
+            if not kept or distance(lon[kept[-1]], lat[kept[-1]], lon[i], lat[i]) >= tol:
+                buckets.setdefault((cx, cy), []).append(len(kept))
+                kept_cells.append((cx, cy))
+                kept.append(i)
+        return path.take(np.array(kept, dtype=np.int64))
+    return stage
+
+
+def _angle_cos(ax, ay, bx, by) -> float:
+    da = (ax ** 2 + ay ** 2) ** 0.5
+    db = (bx ** 2 + by ** 2) ** 0.5
+    if da == 0 or db == 0:
+        return 1.0
+    return (ax * bx + ay * by) / (da * db)
+
+
+def endpoints(origin: Optional[LLA] = None, target: Optional[LLA] = None) -> Stage:
+    """首尾方向修正：起点 -> 首点与首段方向、末段与末点 -> 终点方向夹角大于 90° 时丢弃该端点"""
+    def stage(path: LLABuffer) -> LLABuffer:
+        if origin is not None and len(path) >= 2:
+            v1x, v1y = float(path.lon[1] - path.lon[0]), float(path.lat[1] - path.lat[0])
+            v0x, v0y = float(path.lon[0]) - origin.lon, float(path.lat[0]) - origin.lat
+            if _angle_cos(v0x, v0y, v1x, v1y) < 0:
+                path = path[1:]
+        if target is not None and len(path) >= 2:
+            v1x, v1y = float(path.lon[-1] - path.lon[-2]), float(path.lat[-1] - path.lat[-2])
+            v2x, v2y = target.lon - float(path.lon[-1]), target.lat - float(path.lat[-1])
+            if _angle_cos(v1x, v1y, v2x, v2y) < 0:
+                path = path[:-1]
+        return path
+    return stage
+
+
+def douglas_peucker(epsilon_km: float) -> Stage:
+    """
+    Douglas–Peucker 抽稀：保留偏离首尾连线超过 epsilon_km 的点。
+    距离在局部等距投影（km）下计算，每次划分对区间内全部点向量化求距离。
+    epsilon 不宜超过半个格距，否则抽稀后的折线可能切过障碍格。
+    """
+    def stage(path: LLABuffer) -> LLABuffer:
+        n = len(path)
+        if n <= 2 or epsilon_km <= 0:
+            return path
+        scale = math.cos(math.radians(float(path.lat.mean())))
+        x = path.lon * (KM_PER_DEG * scale)
+        y = path.lat * KM_PER_DEG
+        keep = np.zeros(n, dtype=bool)
+        keep[0] = keep[-1] = True
+        stack = [(0, n - 1)]
+        while stack:
+            s, e = stack.pop()
+            if e - s < 2:
+                continue
+            dx, dy = x[e] - x[s], y[e] - y[s]
+            seg = math.hypot(dx, dy)
+            px, py = x[s + 1:e] - x[s], y[s + 1:e] - y[s]
+            if seg == 0:
+                d = np.hypot(px, py)
+            else:
+                d = np.abs(px * dy - py * dx) / seg
+            k = int(np.argmax(d))
+            if d[k] > epsilon_km:
+                m = s + 1 + k
+                keep[m] = True
+                stack.append((s, m))
+                stack.append((m, e))
+        return path.take(keep)
+    return stage
+
+
+def default_stages(
+    tol: float = 0.0001,
+    origin: Optional[LLA] = None,
+    target: Optional[LLA] = None,
+    gap_lon: Optional[float] = None,
+    gap_lat: Optional[float] = None,
+    simplify_km: float = 0.0
+) -> List[Stage]:
+    """merge_trajectories_smart 使用的默认流水线；simplify_km > 0 时末尾追加 Douglas–Peucker"""
+    stages = [
+        dedupe(tol),
+        collinear(),
+        backtrack(tol),
+        reverse_overlap(tol),
+        loop_prune(tol, gap_lon, gap_lat),
+        endpoints(origin, target),
+    ]
+    if simplify_km > 0:
+        stages.append(douglas_peucker(simplify_km))
+    return stages
+
+
+def run_stages(path: LLABuffer, stages: Iterable[Stage]) -> LLABuffer:
+    for stage in stages:
+        if not len(path):
+            break
+        path = stage(path)
+    return path
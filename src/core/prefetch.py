@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import math
+from typing import Callable, Awaitable, Optional, List, Set, Tuple, Hashable
+from .grid import LLA
+from . import metrics
+
+
+class CorridorPrefetcher:
+    """
+    沿 起点→终点 走廊并发预取后续几跳的高程瓦片。
+    预取结果不直接使用，而是由查询函数自身的缓存（如 AsyncQueryHelper）保存，
+    PathPlanPair 后续逐跳查询时即可命中缓存；在途数量受 max_in_flight 限制。
+    snap 把点对齐到查询缓存的格子（如 AsyncQueryHelper.cache_cell），预取与逐跳查询按同一格子去重/命中；
+    不提供时按原坐标，几乎不会命中，只适合测试。
+    issued / hits / skipped：已发出的预取数、其中被后续逐跳查询用到的格子数、规划结束时放弃的预取数。
+    """
+
+    def __init__(
+        self,
+        query_func: Callable[[LLA], Awaitable[Optional[List[LLA]]]],
+        max_in_flight: int = 4,
+        max_tiles: int = 1,
+        snap: Optional[Callable[[float, float], Tuple[float, float]]] = None
+    ):
+        self._query_func = query_func
+        self._sem = asyncio.Semaphore(max(1, max_in_flight))
+        self.max_tiles = max_tiles
+        self._snap = snap
+        self._scheduled: Set[Hashable] = set()
+        self._issued_keys: Set[Hashable] = set()
+        self._hit_keys: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._closed = False
+        self.issued = 0
+        self.hits = 0
+        self.skipped = 0
+
+    @staticmethod
+    def corridor_points(start: LLA, end: LLA, half_lon: float, half_lat: float, max_tiles: int) -> List[LLA]:
+        """
+        预测后续各跳的起点（不含 start）：每跳的瓦片以该跳起点为中心、半跨度 half_lon × half_lat（度），
+        下一跳从 当前点→end 直线与瓦片边界的交点出发；end 已落在当前瓦片内时不再需要后续瓦片。最多 max_tiles 个。
+        """
+        d_lon = end.lon - start.lon
+        d_lat = end.lat - start.lat
+        if half_lon <= 0 or half_lat <= 0 or (d_lon == 0 and d_lat == 0):
+            return []
+        # 沿直线走出一个瓦片的参数步长
+        step = min(half_lon / abs(d_lon) if d_lon else math.inf, half_lat / abs(d_lat) if d_lat else math.inf)
+        points = []
+        t = 0.0
+        while len(points) < max_tiles:
+            if abs(end.lon - start.lon - d_lon * t) <= half_lon and abs(end.lat - start.lat - d_lat * t) <= half_lat:
+                break
+            t += step
+            points.append(LLA(start.lon + d_lon * t, start.lat + d_lat * t, 0.0))
+        return points
+
+    def _key(self, lon: float, lat: float) -> Tuple[float, float]:
+        return self._snap(lon, lat) if self._snap is not None else (lon, lat)
+
+    def schedule_corridor(self, start: LLA, end: LLA, half_lon: float, half_lat: float):
+        """
+        排队预取后续各跳起点所在的缓存格（按格子中心查询）；与 start 同格（本跳正在查询）或已排队过的格子不会重复提交。
+        """
+        if self._closed:
+            return
+        current = self._key(start.lon, start.lat)
+        for p in self.corridor_points(start, end, half_lon, half_lat, self.max_tiles):
+            key = self._key(p.lon, p.lat)
+            if key == current or key in self._scheduled:
+                continue
+            self._scheduled.add(key)
+            task = asyncio.ensure_future(self._prefetch(key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def note_query(self, lla: LLA):
+        """逐跳查询时调用：查询点所在格子已发出过预取则计为一次命中（每个格子只计一次）"""
+        key = self._key(lla.lon, lla.lat)
+        if key in self._issued_keys and key not in self._hit_keys:
+            self._hit_keys.add(key)
+            self.hits += 1
+            metrics.PREFETCH_TILES.inc(result="hit")
+
+    async def _prefetch(self, key: Tuple[float, float]):
+        async with self._sem:
+            # 规划已结束时，尚未开始的预取直接放弃
+            if self._closed:
+                self.skipped += 1
+                metrics.PREFETCH_TILES.inc(result="skipped")
+                return
+            self.issued += 1
+            self._issued_keys.add(key)
+            metrics.PREFETCH_TILES.inc(result="issued")
+            try:
+                await self._query_func(LLA(key[0], key[1], 0.0))
+            except Exception as e:
+                logging.debug(f"[Prefetch] 预取失败: {key}, {e}")
+
+    def close(self):
+        """停止调度新的预取；已在途的请求继续完成（结果仍可写入缓存供后续请求使用）"""
+        self._closed = True
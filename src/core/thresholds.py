@@ -0,0 +1,71 @@
+from typing import List, Tuple, Optional
+import numpy as np
+from .astar import AStar
+from .grid import component_labels
+
+
+def altitude_array(astar: AStar) -> np.ndarray:
+    """网格高程栅格转为 (num_lon, num_lat) 数组，供多个阈值共享"""
+    return np.asarray(astar.altitude, dtype=np.float64)
+
+
+def free_mask(alt: np.ndarray, thred: float) -> np.ndarray:
+    """可通行掩码，与 Grid.is_obstacle（altitude > thred 为障碍）一致"""
+    return alt <= thred
+
+
+def connected(free: np.ndarray, a: Tuple[int, int], b: Tuple[int, int]) -> bool:
+    """a、b 是否处于同一个 8 连通可通行区域（整幅掩码做一次连通区域标号后比较标号）"""
+    if not free[a] or not free[b]:
+        return False
+    labels = component_labels(free)
+    return bool(labels[a] == labels[b])
+
+
+def lowest_feasible(alt: np.ndarray, a: Tuple[int, int], b: Tuple[int, int]) -> Optional[float]:
+    """
+    使 a、b 连通的最小阈值，即 a→b 所有路径中最大高程的最小值（瓶颈）；不连通返回 None。
+    按高程从低到高逐格加入并查集、与已加入的 8 邻格合并，a、b 首次同属一个集合时当前格的高程即为所求；
+    整幅栅格只排序一次，O(格子数 · α)。
+    """
+    num_x, num_y = alt.shape
+    flat = alt.ravel()
+    ia, ib = a[0] * num_y + a[1], b[0] * num_y + b[1]
+    parent = list(range(flat.size))
+    added = bytearray(flat.size)
+
+    def find(i: int) -> int:
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    for idx in np.argsort(flat, kind="stable").tolist():
+        added[idx] = 1
+        x, y = divmod(idx, num_y)
+        root = find(idx)
+        for nx in (x - 1, x, x + 1):
+            if not 0 <= nx < num_x:
+                continue
+            for ny in (y - 1, y, y + 1):
+                if 0 <= ny < num_y:
+                    n = nx * num_y + ny
+                    if added[n]:
+                        other = find(n)
+                        if other != root:
+                            parent[other] = root
+        if added[ia] and added[ib] and find(ia) == find(ib):
+            return float(flat[idx])
+    return None
+
+
+def scan_grid(
+    astar: AStar, start: Tuple[int, int], end: Tuple[int, int], thresholds: List[float], search_lowest: bool = False
+) -> Tuple[List[bool], Optional[float]]:
+    """在已构建的网格上判断各阈值下起终点是否连通（每个阈值一次连通区域标号），可选求最小可行阈值"""
+    alt = altitude_array(astar)
+    feasible = [connected(free_mask(alt, t), start, end) for t in thresholds]
+    lowest = lowest_feasible(alt, start, end) if search_lowest else None
+    return feasible, lowest
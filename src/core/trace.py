@@ -0,0 +1,71 @@
+"""
+单次规划的结构化追踪（opt-in），用于调参与排查慢请求：
+每跳的瓦片范围、网格尺寸、建网格耗时、尝试的边界候选终点及每次 A* 的扩展/入堆节点数，
+合并前后的点数，以及每次高程查询的缓存结果。
+未开启追踪时各处只做一次 None 判断；查询层通过 current() 取得当前请求的追踪对象。
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+_current: ContextVar[Optional['PlanTrace']] = ContextVar("plan_trace", default=None)
+
+
+class PlanTrace:
+    def __init__(self):
+        self._t0 = time.perf_counter()
+        self.hops: List[Dict] = []
+        self.queries: List[Dict] = []
+        self.merge: Optional[Dict] = None
+        # 规划结束原因：reached / no_elevation_data / no_initial_path / revisited / stuck
+        self.outcome: Optional[str] = None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def add_query(self, lon: float, lat: float, cache: str, seconds: Optional[float] = None,
+                  points: Optional[int] = None):
+        """记录一次高程查询：cache 为 hit / miss / coalesced / error（走廊预取的查询同样记录）"""
+        record = {"lon": lon, "lat": lat, "cache": cache, "at_s": round(self.elapsed(), 6)}
+        if seconds is not None:
+            record["seconds"] = round(seconds, 6)
+        if points is not None:
+            record["points"] = points
+        self.queries.append(record)
+
+    def to_dict(self) -> Dict:
+        candidates = [c for hop in self.hops for c in hop.get("candidates", [])]
+        return {
+            "elapsed_s": round(self.elapsed(), 6),
+            "outcome": self.outcome,
+            "summary": {
+                "hops": len(self.hops),
+                "candidates_tried": len(candidates),
+                "nodes_expanded": sum(c["expanded"] for c in candidates),
+                "nodes_pushed": sum(c["pushed"] for c in candidates),
+                "queries": len(self.queries),
+                "query_cache": {k: sum(1 for q in self.queries if q["cache"] == k)
+                                for k in ("hit", "miss", "coalesced", "error")},
+            },
+            "hops": self.hops,
+            "merge": self.merge,
+            "queries": self.queries,
+        }
+
+
+def current() -> Optional[PlanTrace]:
+    return _current.get()
+
+
+@contextmanager
+def activate(trace: Optional[PlanTrace]):
+    """在当前上下文（及其创建的任务）中启用追踪；trace 为 None 时不做任何事"""
+    if trace is None:
+        yield None
+        return
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
@@ -0,0 +1,75 @@
+"""
+规划工作区池：复用 AStar 实例（连同其 SearchWorkspace 搜索缓冲区），请求开始时借出、结束时归还，
+稳态下逐跳搜索不再为 g / parent / closed / 掩码重新分配内存。
+高程栅格（altitude 嵌套列表）尚未池化：每跳建网格仍新建一整幅栅格。栅格对象被 GridCache、export_raster
+共享，地标表也按栅格对象身份判断是否失效，原地填充须先解决这些共享，暂未实现。
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+from .astar import AStar, SearchWorkspace
+
+
+class WorkspacePool:
+    """
+    线程安全的 AStar 工作区池。max_idle 为最多保留的空闲工作区数（超出的归还后丢弃），
+    capacity 为新建工作区预分配的格子数（应覆盖最大瓦片，0 表示首次搜索时按需分配）。
+    """
+
+    def __init__(self, max_idle: int = 8, capacity: int = 0):
+        self.max_idle = max_idle
+        self.capacity = capacity
+        self._idle: List[AStar] = []
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.high_water = 0
+        self.created = 0
+        self.checkouts = 0
+        self.discarded = 0
+
+    def acquire(self, thred: float = -10) -> AStar:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.high_water = max(self.high_water, self.in_use)
+            astar = self._idle.pop() if self._idle else None
+            if astar is None:
+                self.created += 1
+        if astar is None:
+            astar = AStar(thred)
+            astar.workspace = SearchWorkspace(self.capacity)
+        astar.thred = thred
+        return astar
+
+    def release(self, astar: AStar):
+        """归还工作区：清空请求状态（见 AStar.reset），只保留搜索缓冲区"""
+        astar.reset()
+        with self._lock:
+            self.in_use -= 1
+            if len(self._idle) < self.max_idle:
+                self._idle.append(astar)
+            else:
+                self.discarded += 1
+
+    @contextmanager
+    def checkout(self, thred: float = -10):
+        astar = self.acquire(thred)
+        try:
+            yield astar
+        finally:
+            self.release(astar)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            idle = list(self._idle)
+            return {
+                "idle": len(idle),
+                "in_use": self.in_use,
+                "high_water": self.high_water,
+                "created": self.created,
+                "checkouts": self.checkouts,
+                "discarded": self.discarded,
+                "max_idle": self.max_idle,
+                "idle_bytes": sum(a.workspace.nbytes for a in idle if a.workspace is not None),
+                "max_capacity": max((a.workspace.capacity for a in idle if a.workspace is not None), default=0),
+            }
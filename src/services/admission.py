@@ -0,0 +1,113 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional, Dict
+
+
+class Overloaded(Exception):
+    """超出规划容量（等待队列已满或排队超时），请求被拒绝"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _percentiles(values) -> Dict[str, float]:
+    if not values:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    data = sorted(values)
+    pick = lambda q: round(data[min(len(data) - 1, int(q * len(data)))] * 1000, 3)
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+class AdmissionController:
+    """
+    规划请求准入控制：最多 max_concurrent 个请求同时规划，最多 max_queue 个请求排队等待；
+    队列已满立即拒绝，排队超过 queue_timeout（或请求自身的截止时间）也拒绝。
+    拒绝时抛出 Overloaded，由调用方返回 503 + Retry-After。
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_queue: int = 32,
+        queue_timeout: float = 10.0,
+        retry_after: float = 1.0,
+        window: int = 1000
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._sem: Optional[asyncio.Semaphore] = None
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.queue_time_total = 0.0
+        self.run_time_total = 0.0
+        # 最近 window 个请求的排队/运行耗时，用于分位数统计
+        self._queue_times = deque(maxlen=window)
+        self._run_times = deque(maxlen=window)
+
+    def _get_sem(self) -> asyncio.Semaphore:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrent)
+        return self._sem
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[float] = None):
+        """获取一个规划名额；deadline 为请求截止时间（time.time() 时间戳）"""
+        sem = self._get_sem()
+        if sem.locked() and self.waiting >= self.max_queue:
+            self.shed_queue_full += 1
+            raise Overloaded("queue_full", self.retry_after)
+
+        timeout = self.queue_timeout
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, deadline - time.time()))
+        t0 = time.perf_counter()
+        self.waiting += 1
+        try:
+            if not sem.locked():
+                await sem.acquire()
+            else:
+                await asyncio.wait_for(sem.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.shed_timeout += 1
+            raise Overloaded("queue_timeout", self.retry_after)
+        finally:
+            self.waiting -= 1
+
+        queued = time.perf_counter() - t0
+        self.admitted += 1
+        self.queue_time_total += queued
+        self._queue_times.append(queued)
+        self.running += 1
+        t1 = time.perf_counter()
+        try:
+            yield queued
+        finally:
+            elapsed = time.perf_counter() - t1
+            self.running -= 1
+            self.run_time_total += elapsed
+            self._run_times.append(elapsed)
+            sem.release()
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "queue_time_total_s": round(self.queue_time_total, 6),
+            "run_time_total_s": round(self.run_time_total, 6),
+            "queue_time": _percentiles(self._queue_times),
+            "run_time": _percentiles(self._run_times),
+        }
@@ -0,0 +1,124 @@
+import asyncio
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple, Callable, Awaitable, Any
+from src.core.flow_field import FlowField
+
+
+class FlowFieldCache:
+    """
+    终点反向代价场缓存：键为终点按 precision（度）对齐后的格子 + 障碍阈值 alt。
+    按 LRU 同时限制条目数（max_entries）与估算内存（max_bytes）；
+    每个代价场记录其依赖的高程瓦片（缓存键 -> 版本号），瓦片过期或被重新查询时失效。
+    相同键的并发构建合并为一次计算。
+    """
+
+    def __init__(self, precision: float = 0.0005, max_entries: int = 16, max_bytes: int = 64 * 1024 * 1024):
+        self.precision = precision
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._fields: "OrderedDict[Tuple, Tuple[FlowField, Dict[Any, int]]]" = OrderedDict()
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidated = 0
+        self.oversize_skipped = 0
+
+    def make_key(self, lon: float, lat: float, alt: float) -> Tuple:
+        p = self.precision
+        return (round(lon / p), round(lat / p), float(alt))
+
+    def _pop(self, key: Tuple):
+        entry = self._fields.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[0].nbytes
+
+    def get(self, key: Tuple, tile_version: Callable[[Any], Optional[int]]) -> Optional[FlowField]:
+        """命中且依赖瓦片均未变化时返回代价场，否则返回 None（失效条目同时删除）"""
+        entry = self._fields.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        field, deps = entry
+        for tile_key, version in deps.items():
+            if tile_version(tile_key) != version:
+                self._pop(key)
+                self.invalidated += 1
+                self.misses += 1
+                return None
+        self._fields.move_to_end(key)
+        self.hits += 1
+        return field
+
+    def put(self, key: Tuple, field: FlowField, deps: Dict[Any, int]):
+        if self.max_entries <= 0 or field.nbytes > self.max_bytes:
+            self.oversize_skipped += 1
+            return
+        self._pop(key)
+        self._fields[key] = (field, deps)
+        self.bytes += field.nbytes
+        while len(self._fields) > self.max_entries or self.bytes > self.max_bytes:
+            _, (old, _) = self._fields.popitem(last=False)
+            self.bytes -= old.nbytes
+            self.evictions += 1
+
+    async def get_or_build(
+        self,
+        key: Tuple,
+        tile_version: Callable[[Any], Optional[int]],
+        build: Callable[[], Awaitable[Tuple[Optional[FlowField], Dict[Any, int]]]]
+    ) -> Optional[FlowField]:
+        """
+        返回缓存的代价场，未命中时调用 build 构建并缓存。
+        build 返回 (代价场或 None, 依赖瓦片版本)；None 表示终点不可用，不缓存。
+        """
+        field = self.get(key, tile_version)
+        if field is not None:
+            return field
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._inflight[key] = pending
+        try:
+            self.builds += 1
+            field, deps = await build()
+            if field is not None:
+                self.put(key, field, deps)
+            pending.set_result(field)
+            return field
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            # 无人等待时避免 “Future exception was never retrieved” 警告
+            pending.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._fields),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "precision": self.precision,
+            "hits": self.hits,
+            "misses": self.misses,
+            "builds": self.builds,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidated": self.invalidated,
+            "oversize_skipped": self.oversize_skipped,
+            "inflight": len(self._inflight),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
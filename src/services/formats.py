@@ -0,0 +1,142 @@
+import json
+import sys
+from array import array
+from typing import List, Tuple, Optional, Iterable
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库 json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖，未安装时 msgpack 格式不可用
+    msgpack = None
+
+
+FORMATS = ("json", "polyline", "binary", "msgpack")
+DTYPES = {"f8": "d", "f4": "f"}
+
+# Accept 头到响应格式的映射（未指定 format 参数时使用）
+ACCEPT_FORMATS = {
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/octet-stream": "binary",
+    "application/vnd.polyline+json": "polyline",
+}
+
+
+def dumps_json(obj) -> bytes:
+    """JSON 序列化：安装了 orjson 时走快速路径，否则与 FastAPI 默认输出一致"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _encode_value(v: int, out: List[str]):
+    v = ~(v << 1) if v < 0 else v << 1
+    while v >= 0x20:
+        out.append(chr((0x20 | (v & 0x1f)) + 63))
+        v >>= 5
+    out.append(chr(v + 63))
+
+
+def encode_polyline(coords: Iterable[Tuple[float, float]], precision: int = 5) -> str:
+    """Google Encoded Polyline 编码，coords 为 (lat, lon) 序列"""
+    factor = 10 ** precision
+    out: List[str] = []
+    prev_lat = prev_lon = 0
+    for lat, lon in coords:
+        lat_i = int(round(lat * factor))
+        lon_i = int(round(lon * factor))
+        _encode_value(lat_i - prev_lat, out)
+        _encode_value(lon_i - prev_lon, out)
+        prev_lat, prev_lon = lat_i, lon_i
+    return "".join(out)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """encode_polyline 的逆操作，返回 (lat, lon) 列表"""
+    factor = 10 ** precision
+    coords = []
+    idx = lat = lon = 0
+    while idx < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[idx]) - 63
+                idx += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        coords.append((lat / factor, lon / factor))
+    return coords
+
+
+def pack_path(path: List[dict], dtype: str = "f8") -> bytes:
+    """路径点打包为小端 float64/float32 数组（lon, lat, alt 交错）"""
+    buf = array(DTYPES[dtype])
+    for p in path:
+        buf.extend((p["lon"], p["lat"], p["alt"]))
+    if sys.byteorder != "little":
+        buf.byteswap()
+    return buf.tobytes()
+
+
+def unpack_path(data: bytes, dtype: str = "f8") -> List[Tuple[float, float, float]]:
+    """pack_path 的逆操作"""
+    buf = array(DTYPES[dtype])
+    buf.frombytes(data)
+    if sys.byteorder != "little":
+        buf.byteswap()
+    return [(buf[i], buf[i + 1], buf[i + 2]) for i in range(0, len(buf) - 2, 3)]
+
+
+def negotiate_format(fmt: Optional[str], accept: Optional[str]) -> str:
+    """format 参数优先，其次按 Accept 头选择，默认 json"""
+    if fmt:
+        return fmt
+    for item in (accept or "").split(","):
+        media = item.split(";")[0].strip().lower()
+        if media in ACCEPT_FORMATS:
+            return ACCEPT_FORMATS[media]
+    return "json"
+
+
+def render_route(response: dict, fmt: str = "json", dtype: str = "f8", precision: int = 5) -> Response:
+    """
+    按协商的格式输出规划响应；失败响应（无 path）始终为 JSON。
+    - json: 原结构，orjson 可用时使用 orjson 序列化
+    - polyline: path 替换为 path_polyline（编码后的 lat/lon）与 path_alt（高度数组）
+    - binary: 响应体为打包的 lon/lat/alt 数组，其余字段以 JSON 放在 X-Route-Meta 头
+    - msgpack: 整个响应以 msgpack 编码，path 为打包的二进制数组
+    """
+    path = response.get("path")
+    if fmt == "json" or path is None:
+        return Response(dumps_json(response), media_type="application/json")
+    meta = {k: v for k, v in response.items() if k != "path"}
+    if fmt == "polyline":
+        body = {
+            **meta,
+            "path_encoding": f"polyline{precision}",
+            "path_polyline": encode_polyline(((p["lat"], p["lon"]) for p in path), precision),
+            "path_alt": [p["alt"] for p in path],
+        }
+        return Response(dumps_json(body), media_type="application/json")
+    if fmt == "binary":
+        headers = {
+            "X-Route-Meta": json.dumps(meta, ensure_ascii=True, separators=(",", ":")),
+            "X-Path-Dtype": dtype,
+            "X-Path-Points": str(len(path)),
+        }
+        return Response(pack_path(path, dtype), media_type="application/octet-stream", headers=headers)
+    if fmt == "msgpack":
+        body = {**meta, "path_dtype": dtype, "path": pack_path(path, dtype)}
+        return Response(msgpack.packb(body, use_bin_type=True), media_type="application/msgpack")
+    raise ValueError(f"未知的响应格式: {fmt}")
@@ -1,16 +1,32 @@
-from fastapi import FastAPI, Query, HTTPException
-from src.core.grid import LLA, distance, lon_is_valid, lat_is_valid
-from src.core.path_planner import PathPlan
+from fastapi import FastAPI, Query, HTTPException, Header
+from src.core.grid import LLA, LLABuffer, distance, nearest_lla, lon_is_valid, lat_is_valid
+from src.core.path_planner import PathPlan, GridCache
+from src.core.executor import ComputeExecutor
+from src.core.astar import DeadlineExceeded
+from src.core.workspace import WorkspacePool
+from src.core import metrics
+from src.core.metrics import stage_timer
+from src.core.trace import PlanTrace, activate as activate_trace
 from src.services.query import AsyncQueryHelper
+from src.services.preload import PreloadJob
+from src.services.admission import AdmissionController, Overloaded
+from src.services.route_cache import RouteCache, respond_for_request
+from src.services.flow_field_cache import FlowFieldCache
+from src.services import formats
+from src.services.profiling import ProfileStore, RequestProfiler, pstats_text
+from src.services.recording import TrafficRecorder
 import uvicorn
 import json
 import logging
 import os
 import asyncio
-from typing import Optional
+import math
+import time
+from typing import Optional, Dict, List, Callable, Union
+from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse, PlainTextResponse, FileResponse
 
 
 logging.basicConfig(
@@ -37,6 +53,79 @@ QUERY_HOST = os.getenv("QUERY_HOST", config.get("query_host", "192.168.3.12"))
 QUERY_PORT = int(os.getenv("QUERY_PORT", config.get("query_port", 5555)))
 QUERY_REQUEST = os.getenv("QUERY_REQUEST", config.get("query_request", "free/tinder/v3/box2/query"))
 TILE_URL = os.getenv("TILE_URL", config.get("tile_url", "https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"))
+# 高程查询缓存：按字节预算淘汰，空结果使用更短 TTL
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", config.get("cache_max_bytes", 64 * 1024 * 1024)))
+CACHE_TTL = float(os.getenv("CACHE_TTL", config.get("cache_ttl", 300)))
+CACHE_NEGATIVE_TTL = float(os.getenv("CACHE_NEGATIVE_TTL", config.get("cache_negative_ttl", 30)))
+# 走廊预取：每个规划请求沿 起点→终点 并发预取后续瓦片的最大在途查询数（0 关闭）
+PREFETCH_IN_FLIGHT = int(os.getenv("PREFETCH_IN_FLIGHT", config.get("prefetch_in_flight", 0)))
+# 计算后端：inline（事件循环内）/ thread（线程池）/ process（进程池）
+COMPUTE_BACKEND = os.getenv("COMPUTE_BACKEND", config.get("compute_backend", "thread"))
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", config.get("compute_workers", 4)))
+COMPUTE_QUEUE = int(os.getenv("COMPUTE_QUEUE", config.get("compute_queue", 16)))
+# 规划准入控制：并发上限、等待队列上限、排队超时（秒）、拒绝时建议的重试间隔（秒）
+PLAN_MAX_CONCURRENT = int(os.getenv("PLAN_MAX_CONCURRENT", config.get("plan_max_concurrent", 8)))
+PLAN_MAX_QUEUE = int(os.getenv("PLAN_MAX_QUEUE", config.get("plan_max_queue", 32)))
+PLAN_QUEUE_TIMEOUT = float(os.getenv("PLAN_QUEUE_TIMEOUT", config.get("plan_queue_timeout", 10)))
+PLAN_RETRY_AFTER = float(os.getenv("PLAN_RETRY_AFTER", config.get("plan_retry_after", 1)))
+# 单次规划默认截止时间与上限（秒），请求可通过 timeout 参数缩短
+PLAN_TIMEOUT = float(os.getenv("PLAN_TIMEOUT", config.get("plan_timeout", 30)))
+PLAN_TIMEOUT_MAX = float(os.getenv("PLAN_TIMEOUT_MAX", config.get("plan_timeout_max", 120)))
+# 路线缓存：起终点按 route_cache_precision（度）对齐，默认 0.0005 度（约50米）；条目数为 0 时关闭
+ROUTE_CACHE_PRECISION = float(os.getenv("ROUTE_CACHE_PRECISION", config.get("route_cache_precision", 0.0005)))
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", config.get("route_cache_size", 10000)))
+ROUTE_CACHE_TTL = float(os.getenv("ROUTE_CACHE_TTL", config.get("route_cache_ttl", CACHE_TTL)))
+# 批量规划：单批最大起终点对数、最大并行数、整批默认截止时间（秒）、单次请求内栅格复用缓存的字节上限
+BATCH_MAX_PAIRS = int(os.getenv("BATCH_MAX_PAIRS", config.get("batch_max_pairs", 1000)))
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", config.get("batch_max_workers", 8)))
+BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", config.get("batch_timeout", 300)))
+BATCH_GRID_CACHE_BYTES = int(os.getenv("BATCH_GRID_CACHE_BYTES", config.get("batch_grid_cache_bytes", 64 * 1024 * 1024)))
+# 多阈值规划单次最多阈值数
+MAX_THRESHOLDS = int(os.getenv("MAX_THRESHOLDS", config.get("max_thresholds", 32)))
+
+# 终点反向代价场缓存：最大个数、内存上限（字节，均按 LRU 淘汰）、终点对齐精度（度），以及启动时预建的常用终点
+FLOW_FIELD_SIZE = int(os.getenv("FLOW_FIELD_SIZE", config.get("flow_field_size", 16)))
+FLOW_FIELD_MAX_BYTES = int(os.getenv("FLOW_FIELD_MAX_BYTES", config.get("flow_field_max_bytes", 64 * 1024 * 1024)))
+FLOW_FIELD_PRECISION = float(os.getenv("FLOW_FIELD_PRECISION", config.get("flow_field_precision", ROUTE_CACHE_PRECISION)))
+FLOW_FIELD_DESTINATIONS = config.get("flow_field_destinations", [])
+
+# 合并后的 Douglas–Peucker 抽稀容差（km），0 关闭；建议不超过半个格距
+PATH_SIMPLIFY_KM = float(os.getenv("PATH_SIMPLIFY_KM", config.get("path_simplify_km", 0.0)))
+
+# 启动时预加载的区域：[{"bbox": [min_lon, min_lat, max_lon, max_lat], "concurrency": 8, "rate": 20}, ...]
+PRELOAD_REGIONS = config.get("preload_regions", [])
+# 保留可查询进度的已结束预加载任务数
+PRELOAD_KEEP_JOBS = int(os.getenv("PRELOAD_KEEP_JOBS", config.get("preload_keep_jobs", 32)))
+
+# 指标（/metrics）；关闭后各阶段打点为空操作
+METRICS_ENABLED = str(os.getenv("METRICS_ENABLED", config.get("metrics_enabled", True))).lower() not in ("0", "false", "no")
+metrics.REGISTRY.enabled = METRICS_ENABLED
+
+# 慢请求 profile：落盘目录与保留份数；耗时阈值（秒）> 0 时自动采样，超过阈值才保存
+PROFILE_DIR = os.getenv("PROFILE_DIR", config.get("profile_dir", "profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", config.get("profile_max_files", 50)))
+PROFILE_THRESHOLD = float(os.getenv("PROFILE_THRESHOLD", config.get("profile_threshold", 0)))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", config.get("profile_interval", 0.005)))
+# 是否允许客户端通过 X-Profile 请求头强制 profile 单个请求；默认关闭（会拖慢同期请求并落盘，且 /admin/profiles 无鉴权）
+PROFILE_ALLOW_HEADER = str(os.getenv("PROFILE_ALLOW_HEADER", config.get("profile_allow_header", False))).lower() not in ("0", "false", "no")
+
+# 流量录制：/path-planning 请求写入按大小轮转的 JSONL（路径为空时关闭），可选记录用到的高程瓦片快照
+RECORD_PATH = os.getenv("RECORD_PATH", config.get("record_path", ""))
+RECORD_MAX_BYTES = int(os.getenv("RECORD_MAX_BYTES", config.get("record_max_bytes", 64 * 1024 * 1024)))
+RECORD_BACKUPS = int(os.getenv("RECORD_BACKUPS", config.get("record_backups", 5)))
+RECORD_TILES_PATH = os.getenv("RECORD_TILES_PATH", config.get("record_tiles_path", ""))
+RECORD_TILES_MAX_BYTES = int(os.getenv("RECORD_TILES_MAX_BYTES", config.get("record_tiles_max_bytes", 256 * 1024 * 1024)))
+
+traffic_recorder: Optional[TrafficRecorder] = (
+    TrafficRecorder(RECORD_PATH, RECORD_MAX_BYTES, RECORD_BACKUPS, RECORD_TILES_PATH or None,
+                    tiles_max_bytes=RECORD_TILES_MAX_BYTES) if RECORD_PATH else None
+)
+
+# A* 工作区池：请求间复用搜索缓冲区（g / parent / closed / 可通行掩码）；
+# 空闲上限一般取计算并发数，预分配格子数应覆盖最大瓦片（0 为首次搜索时按需增长）
+WORKSPACE_POOL_SIZE = int(os.getenv("WORKSPACE_POOL_SIZE", config.get("workspace_pool_size", 8)))
+WORKSPACE_CELLS = int(os.getenv("WORKSPACE_CELLS", config.get("workspace_cells", 0)))
+workspace_pool = WorkspacePool(WORKSPACE_POOL_SIZE, WORKSPACE_CELLS)
 
 # 全局共享的查询助手实例（带缓存）
 _global_query_helper: Optional[AsyncQueryHelper] = None
@@ -52,14 +141,48 @@ def get_query_helper() -> AsyncQueryHelper:
             QUERY_HOST, 
             QUERY_PORT, 
             QUERY_REQUEST,
-            cache_size=1000,      # 缓存1000条查询结果
-            cache_ttl=300,        # TTL 5分钟
+            cache_max_bytes=CACHE_MAX_BYTES,        # 缓存字节预算
+            cache_ttl=CACHE_TTL,                    # TTL 默认5分钟
+            cache_negative_ttl=CACHE_NEGATIVE_TTL,  # 空结果 TTL 默认30秒
             cache_precision=cache_precision  # 缓存精度：0.005度
         )
-        logging.info(f"[Cache] 初始化全局查询助手，缓存配置: size=1000, ttl=300s, precision={cache_precision}度(≈{cache_precision*111:.0f}米)")
+        logging.info(f"[Cache] 初始化全局查询助手，缓存配置: max_bytes={CACHE_MAX_BYTES}, ttl={CACHE_TTL}s, "
+                     f"negative_ttl={CACHE_NEGATIVE_TTL}s, precision={cache_precision}度(≈{cache_precision*111:.0f}米)")
+        if traffic_recorder is not None and traffic_recorder.tiles_path:
+            recorder = traffic_recorder
+            _global_query_helper.on_fetch = lambda key, result: recorder.record_tile(key, result, cache_precision)
     return _global_query_helper
 
 
+# 全局共享的计算后端（网格构建、A* 搜索、轨迹合并在此执行，I/O 留在事件循环）
+compute_executor = ComputeExecutor(COMPUTE_BACKEND, COMPUTE_WORKERS, COMPUTE_QUEUE)
+
+route_cache = RouteCache(ROUTE_CACHE_PRECISION, ROUTE_CACHE_SIZE, ROUTE_CACHE_TTL)
+flow_field_cache = FlowFieldCache(FLOW_FIELD_PRECISION, FLOW_FIELD_SIZE, FLOW_FIELD_MAX_BYTES)
+planning_admission = AdmissionController(PLAN_MAX_CONCURRENT, PLAN_MAX_QUEUE, PLAN_QUEUE_TIMEOUT, PLAN_RETRY_AFTER)
+request_profiler = RequestProfiler(ProfileStore(PROFILE_DIR, PROFILE_MAX_FILES), PROFILE_THRESHOLD, PROFILE_INTERVAL)
+
+
+def overloaded_body(e: Overloaded) -> dict:
+    logging.warning(f"[SHED] 规划请求被拒绝: {e.reason}")
+    return {
+        "status": "failed",
+        "error": "overloaded",
+        "reason": e.reason,
+        "message": "服务繁忙，请稍后重试",
+        "retry_after": e.retry_after
+    }
+
+
+def overloaded_response(e: Overloaded) -> JSONResponse:
+    """超出规划容量时返回 503 + Retry-After"""
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        content=overloaded_body(e)
+    )
+
+
 app = FastAPI(
     title="Route Planning Service",
     description="基于固定高度的路径规划HTTP服务",
@@ -78,6 +201,50 @@ app.add_middleware(
 # 挂载前端静态页面
 app.mount("/web", StaticFiles(directory="web", html=True), name="web")
 
+# 区域预加载任务（job_id -> PreloadJob）；已结束的任务只保留最近 PRELOAD_KEEP_JOBS 个
+_preload_jobs: Dict[int, PreloadJob] = {}
+
+
+def start_preload(bbox, concurrency: int = 8, rate: Optional[float] = None) -> PreloadJob:
+    job = PreloadJob(get_query_helper(), bbox, concurrency=concurrency, rate=rate)
+    finished = [job_id for job_id, j in _preload_jobs.items() if j.finished]
+    for job_id in finished[:max(0, len(finished) - PRELOAD_KEEP_JOBS + 1)]:
+        del _preload_jobs[job_id]
+    _preload_jobs[job.id] = job
+    job.start()
+    logging.info(f"[Preload] 启动任务 {job.id}: bbox={list(job.bbox)}, tiles={job.total}, "
+                 f"concurrency={job.concurrency}, rate={rate}")
+    return job
+
+
+@app.on_event("startup")
+async def preload_on_startup():
+    for region in PRELOAD_REGIONS:
+        try:
+            start_preload(region["bbox"], region.get("concurrency", 8), region.get("rate"))
+        except Exception as e:
+            logging.error(f"[Preload] 启动预加载失败: {region}, {e}")
+
+
+@app.on_event("startup")
+async def flow_fields_on_startup():
+    async def build_all():
+        for dest in FLOW_FIELD_DESTINATIONS:
+            try:
+                await get_flow_field(dest["lon"], dest["lat"], dest.get("alt", 0))
+            except Exception as e:
+                logging.error(f"[FlowField] 构建代价场失败: {dest}, {e}")
+    if FLOW_FIELD_DESTINATIONS:
+        asyncio.create_task(build_all())
+
+
+@app.on_event("shutdown")
+async def shutdown_compute():
+    compute_executor.shutdown(wait=False)
+    if traffic_recorder is not None:
+        traffic_recorder.close()
+
+
 @app.get("/", include_in_schema=False)
 async def index():
     return RedirectResponse(url="/web/")
@@ -100,7 +267,7 @@ async def query_alt(
             return {"status": "failed", "message": "该点附近无高程数据", "lon": lon, "lat": lat}
 
         def nearest_alt():
-            best = min(llas, key=lambda p: distance(lon, lat, p.lon, p.lat))
+            best = nearest_lla(llas, lon, lat)
             return {"lon": lon, "lat": lat, "query_alt": best.alt}
 
         res = nearest_alt()
@@ -110,16 +277,183 @@ async def query_alt(
         return {"status": "failed", "message": str(e), "lon": lon, "lat": lat}
 
 
-@app.get("/path-planning", summary="执行路径规划", tags=["Route"])
-async def get_path(
-        lon1: float = Query(..., description="起点经度"),
-        lat1: float = Query(..., description="起点纬度"),
-        lon2: float = Query(..., description="终点经度"),
-        lat2: float = Query(..., description="终点纬度"),
-        alt: float = Query(0, description="高度（米）")
+@app.post("/admin/preload", summary="预加载区域高程瓦片", tags=["Admin"])
+async def admin_preload(
+        min_lon: float = Query(..., description="最小经度"),
+        min_lat: float = Query(..., description="最小纬度"),
+        max_lon: float = Query(..., description="最大经度"),
+        max_lat: float = Query(..., description="最大纬度"),
+        concurrency: int = Query(8, ge=1, le=64, description="并发查询数"),
+        rate: Optional[float] = Query(None, gt=0, description="上游限速（次/秒），不填不限速"),
 ):
-    logging.info(f"Request: origin=({lon1}, {lat1}), target=({lon2}, {lat2}), alt={alt}")
+    """后台并发查询 bbox 内所有瓦片写入缓存，返回任务 id，可通过 GET /admin/preload/{job_id} 查询进度。"""
+    if not all(lon_is_valid(x) for x in (min_lon, max_lon)) or not all(lat_is_valid(x) for x in (min_lat, max_lat)):
+        return {"status": "failed", "error": "invalid_parameters", "message": "经纬度参数不合法"}
+    try:
+        job = start_preload((min_lon, min_lat, max_lon, max_lat), concurrency, rate)
+    except ValueError as e:
+        return {"status": "failed", "error": "invalid_parameters", "message": str(e)}
+    return {"status": "success", **job.to_dict()}
+
+
+@app.get("/admin/preload/{job_id}", summary="查询预加载进度", tags=["Admin"])
+async def admin_preload_status(job_id: int):
+    job = _preload_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="预加载任务不存在")
+    return {"status": "success", **job.to_dict()}
+
+
+@app.get("/admin/cache-stats", summary="高程查询缓存统计", tags=["Admin"])
+async def admin_cache_stats():
+    return {"status": "success", **(await get_query_helper().get_cache_stats())}
+
+
+@app.get("/admin/planning-stats", summary="规划准入统计", tags=["Admin"])
+async def admin_planning_stats():
+    """并发/排队数、拒绝次数、排队与运行耗时分布，以及路线缓存统计"""
+    return {"status": "success", **planning_admission.stats(), "route_cache": route_cache.stats(),
+            "flow_field_cache": flow_field_cache.stats(),
+            "recording": traffic_recorder.stats() if traffic_recorder is not None else None,
+            "workspace_pool": workspace_pool.stats()}
 
+
+def collect_service_metrics():
+    """抓取时读取查询缓存、路线缓存、代价场缓存与准入控制的已有计数"""
+    cache_samples = []
+    if _global_query_helper is not None:
+        counters = _global_query_helper.counters()
+        for result in ("hit", "miss", "coalesced"):
+            cache_samples.append(({"cache": "query", "result": result}, counters[result]))
+        upstream_errors = counters["error"]
+    else:
+        upstream_errors = 0
+    for name, cache in (("route", route_cache), ("flow_field", flow_field_cache)):
+        cache_samples.append(({"cache": name, "result": "hit"}, cache.hits))
+        cache_samples.append(({"cache": name, "result": "miss"}, cache.misses))
+        cache_samples.append(({"cache": name, "result": "coalesced"}, cache.coalesced))
+    yield "pathplan_cache_requests_total", "counter", "各级缓存的命中/未命中/合并次数", cache_samples
+    yield "pathplan_upstream_errors_total", "counter", "高程上游查询失败次数", [({}, upstream_errors)]
+    yield "pathplan_admission_requests", "gauge", "规划准入：执行中 / 排队中的请求数", [
+        ({"state": "running"}, planning_admission.running),
+        ({"state": "waiting"}, planning_admission.waiting),
+    ]
+    yield "pathplan_admission_rejected_total", "counter", "规划准入拒绝次数", [
+        ({"reason": "queue_full"}, planning_admission.shed_queue_full),
+        ({"reason": "timeout"}, planning_admission.shed_timeout),
+    ]
+    pool = workspace_pool.stats()
+    yield "pathplan_workspace_pool", "gauge", "A* 工作区池：空闲 / 借出 / 借出峰值", [
+        ({"state": state}, pool[state]) for state in ("idle", "in_use", "high_water")
+    ]
+    yield "pathplan_workspace_pool_bytes", "gauge", "空闲工作区占用的搜索缓冲区字节数", [({}, pool["idle_bytes"])]
+    yield "pathplan_workspace_pool_total", "counter", "工作区借出次数与新建次数", [
+        ({"event": "checkout"}, pool["checkouts"]),
+        ({"event": "created"}, pool["created"]),
+    ]
+
+
+metrics.REGISTRY.add_collector(collect_service_metrics)
+
+
+@app.get("/metrics", summary="Prometheus 指标", tags=["Admin"])
+async def metrics_endpoint():
+    """
+    Prometheus 文本格式指标：各阶段耗时直方图（pathplan_stage_seconds，stage 为
+    query / grid_init / terminal_search / astar_search / hop / merge / route）、每路线跳数、
+    A* 扩展节点数、边界候选终点尝试数、缓存命中/未命中/合并与上游错误计数。
+    """
+    if not metrics.REGISTRY.enabled:
+        raise HTTPException(status_code=404, detail="metrics disabled")
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/admin/profiles", summary="已保存的请求 profile", tags=["Admin"])
+async def admin_profiles():
+    """按时间倒序列出已保存的 profile（请求参数、耗时、模式：cprofile 为 .prof，sampling 为 .folded 折叠栈）"""
+    return {"status": "success", **request_profiler.stats(), "profiles": request_profiler.store.list()}
+
+
+@app.get("/admin/profiles/{profile_id}", summary="下载请求 profile", tags=["Admin"])
+async def admin_profile_download(
+        profile_id: str,
+        view: Optional[str] = Query(None, pattern="^(text|meta)$",
+                                    description="text：.prof 的 pstats 文本摘要；meta：元信息；不填下载原文件"),
+        sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls)$", description="text 摘要的排序字段")
+):
+    meta = request_profiler.store.get(profile_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="profile 不存在")
+    if view == "meta":
+        return {"status": "success", **meta}
+    path = request_profiler.store.data_path(meta)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="profile 文件已被清理")
+    if view == "text":
+        if meta["file"].endswith(".prof"):
+            return PlainTextResponse(pstats_text(path, sort))
+        with open(path, encoding="utf-8") as f:
+            return PlainTextResponse(f.read())
+    return FileResponse(path, filename=meta["file"], media_type="application/octet-stream")
+
+
+async def get_flow_field(lon: float, lat: float, alt: float, deadline: Optional[float] = None):
+    """获取（必要时构建并缓存）以 (lon, lat) 为终点、阈值为 alt 的反向代价场"""
+    QH = get_query_helper()
+
+    async def build():
+        used_tiles = set()
+        planning = PathPlan(QH.tracked_query_fn(used_tiles), executor=compute_executor, simplify_km=PATH_SIMPLIFY_KM)
+        field = await planning.BuildFlowField(LLA(lon, lat, alt), alt, deadline)
+        deps = {}
+        for key in used_tiles:
+            version = QH.tile_version(key)
+            if version is not None:
+                deps[key] = version
+        return field, deps
+
+    key = flow_field_cache.make_key(lon, lat, alt)
+    return await flow_field_cache.get_or_build(key, QH.tile_version, build)
+
+
+@app.post("/admin/flow-field", summary="构建终点反向代价场", tags=["Admin"])
+async def admin_flow_field(
+        lon: float = Query(..., description="终点经度"),
+        lat: float = Query(..., description="终点纬度"),
+        alt: float = Query(0, description="高度（米），即障碍阈值"),
+):
+    """
+    为常用终点（如降落区）构建并缓存反向代价场。之后终点落在同一格子、阈值相同、
+    起点位于终点瓦片内的规划请求直接沿梯度得到路径，无需搜索。
+    """
+    if not lon_is_valid(lon) or not lat_is_valid(lat):
+        return {"status": "failed", "error": "invalid_parameters", "message": "经纬度参数不合法"}
+    t0 = time.perf_counter()
+    deadline = time.time() + PLAN_TIMEOUT_MAX
+    try:
+        async with planning_admission.slot(deadline):
+            field = await get_flow_field(lon, lat, alt, deadline)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except DeadlineExceeded:
+        return {"status": "failed", "error": "deadline_exceeded", "message": "代价场构建超时"}
+    if field is None:
+        return {"status": "failed", "error": "target_unavailable",
+                "message": "终点缺少高程数据或为障碍，无法构建代价场", "target": {"lon": lon, "lat": lat}}
+    header = field.astar.header()
+    return {
+        "status": "success",
+        "target": {"lon": lon, "lat": lat, "alt": alt},
+        "bbox": [header["min_lon"], header["min_lat"], header["max_lon"], header["max_lat"]],
+        "cells": len(field.costs),
+        "reachable": field.reachable,
+        "bytes": field.nbytes,
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+    }
+
+
+def validate_route_params(lon1: float, lat1: float, lon2: float, lat2: float) -> Optional[dict]:
+    """校验起终点参数，不合法时返回失败响应，合法返回 None"""
     # 参数合法性详细校验
     invalid_fields = []
     if not lon_is_valid(lon1):
@@ -150,17 +484,85 @@ async def get_path(
             "origin": {"lon": lon1, "lat": lat1},
             "target": {"lon": lon2, "lat": lat2}
         }
+    return None
+
+
+def path_records(path: Union[List[LLA], LLABuffer]) -> List[dict]:
+    """路径点序列化为 [{"lon", "lat", "alt"}]；LLABuffer 按列直接转换，不逐点构造 LLA"""
+    if isinstance(path, LLABuffer):
+        return path.to_records()
+    return [{"lon": p.lon, "lat": p.lat, "alt": p.alt} for p in path]
+
+
+def success_response(
+        lon1: float, lat1: float, lon2: float, lat2: float, alt: float, path: Union[List[LLA], LLABuffer],
+        origin_query_alt: Optional[float], target_query_alt: Optional[float]
+) -> dict:
+    """构造规划成功的响应"""
+    # origin 和 target 字段（包含 query_alt，用于响应信息）
+    origin_dict = {"lon": lon1, "lat": lat1, "alt": alt, "query_alt": origin_query_alt}
+    target_dict = {"lon": lon2, "lat": lat2, "alt": alt, "query_alt": target_query_alt}
+
+    # path 字段中的点（只包含 lon、lat、alt，不包含 query_alt）
+    core_path = path_records(path)
+    origin_path_point = {"lon": lon1, "lat": lat1, "alt": alt}
+    target_path_point = {"lon": lon2, "lat": lat2, "alt": alt}
+    full_path = [origin_path_point] + core_path + [target_path_point]
 
+    return {
+        "status": "success",
+        "origin": origin_dict,
+        "target": target_dict,
+        "path": full_path
+    }
+
+
+async def plan_route_from_field(
+        lon1: float, lat1: float, lon2: float, lat2: float, alt: float
+) -> Optional[dict]:
+    """终点已有缓存的代价场且起点在场内可达时，沿梯度直接得到路径；否则返回 None"""
+    field = flow_field_cache.get(flow_field_cache.make_key(lon2, lat2, alt), get_query_helper().tile_version)
+    if field is None:
+        return None
+    ori = LLA(lon1, lat1, alt)
+    ter = LLA(lon2, lat2, alt)
+    planning = PathPlan(get_query_helper().query_fn, executor=compute_executor, simplify_km=PATH_SIMPLIFY_KM)
+    path, ok = await planning.PathPlanFromField(field, ori, ter, alt)
+    if not ok:
+        return None
+    origin_query_alt = field.astar.index_to_lla(field.astar.get_index(ori)).alt
+    target_query_alt = field.astar.index_to_lla(field.goal).alt
+    return success_response(lon1, lat1, lon2, lat2, alt, path, origin_query_alt, target_query_alt)
+
+
+async def plan_route(
+        lon1: float, lat1: float, lon2: float, lat2: float, alt: float,
+        deadline: Optional[float] = None,
+        used_tiles: Optional[set] = None,
+        grid_cache: Optional[GridCache] = None,
+        on_segment: Optional[Callable[[List[LLA]], None]] = None,
+        trace: Optional[PlanTrace] = None
+) -> dict:
+    """
+    执行一次路径规划并构造响应（参数需已通过 validate_route_params 校验）。
+    used_tiles: 若提供，记录本次规划用到的高程瓦片缓存键（供路线缓存判断失效）
+    grid_cache: 若提供，复用其中已构建的网格栅格（批量规划共享）
+    on_segment: 若提供，每确认一跳路径即回调（流式接口使用）
+    trace: 若提供，逐跳搜索统计写入其中（查询缓存结果需调用方在 activate_trace 内调用）
+    """
+    planning: Optional[PathPlan] = None
     try:
         QH = get_query_helper()  # 使用全局共享实例（带缓存）
-        planning = PathPlan(QH.query_fn)
+        query_fn = QH.query_fn if used_tiles is None else QH.tracked_query_fn(used_tiles)
+        planning = PathPlan(query_fn, prefetch=PREFETCH_IN_FLIGHT, prefetch_snap=QH.cache_cell, executor=compute_executor,
+                            grid_cache=grid_cache, simplify_km=PATH_SIMPLIFY_KM, trace=trace, workspace_pool=workspace_pool)
         ori = LLA(lon1, lat1, alt)
         ter = LLA(lon2, lat2, alt)
         # 将前端 alt 同步为 A* 的障碍阈值 thred，用于后续所有可行性判断
         planning._AStar.thred = alt
 
         # 先查询起点并构建网格
-        local_data = await QH.query_fn(ori)
+        local_data = await query_fn(ori)
         if not local_data:
             return {
                 "status": "failed",
@@ -170,7 +572,7 @@ async def get_path(
             }
         
         # 构建起点网格
-        planning._AStar.init(local_data)
+        await planning.init_grid(local_data)
         
         # 尝试从网格获取终点高程（如果终点在起点网格内）
         ter_data = None
@@ -189,7 +591,7 @@ async def get_path(
         # 如果终点不在网格内或获取失败，调用查询接口
         if ter_data is None:
             try:
-                ter_data = await QH.query(ter.lon, ter.lat)
+                ter_data = await query_fn(ter)
             except Exception as e:
                 logging.error(f"终点查询异常: {e}")
                 ter_data = None
@@ -201,14 +603,12 @@ async def get_path(
 
         # 计算起点/终点查询到的代表性高程（取最近点）
         def nearest_alt(llas, lon, lat):
-            if not llas:
-                return None
-            best = min(llas, key=lambda p: distance(lon, lat, p.lon, p.lat))
-            return best.alt
+            best = nearest_lla(llas, lon, lat)
+            return best.alt if best is not None else None
         def nearest_point(llas, lon, lat):
-            if not llas:
+            best = nearest_lla(llas, lon, lat)
+            if best is None:
                 return None
-            best = min(llas, key=lambda p: distance(lon, lat, p.lon, p.lat))
             return {"lon": best.lon, "lat": best.lat, "alt": best.alt}
         origin_query_alt = nearest_alt(local_data, lon1, lat1)
         target_query_alt = nearest_alt(ter_data or [], lon2, lat2)
@@ -240,8 +640,17 @@ async def get_path(
         else:
             end_hint["end_out_of_local_grid"] = True
 
-        # 直接调用异步方法，不需要 run_in_threadpool（因为已经是异步的）
-        path, ok = await planning.PathPlanPair(ori, ter, alt)
+        # 查询在事件循环内进行，网格构建/搜索/合并交给计算后端
+        path, ok = await planning.PathPlanPair(ori, ter, alt, deadline=deadline, on_segment=on_segment)
+    except DeadlineExceeded:
+        logging.warning(f"[TIMEOUT] 规划超时: origin=({lon1},{lat1}), target=({lon2},{lat2})")
+        return {
+            "status": "failed",
+            "error": "deadline_exceeded",
+            "message": "规划超过请求截止时间，已停止",
+            "origin": {"lon": lon1, "lat": lat1},
+            "target": {"lon": lon2, "lat": lat2}
+        }
     except Exception as e:
         logging.error(f"路径规划异常: {e}")
         return {
@@ -249,29 +658,13 @@ async def get_path(
             "error": "exception",
             "message": str(e)
         }
+    finally:
+        if planning is not None:
+            planning.release()
 
     if ok:
         logging.info(f"[SUCCESS] 规划成功, path length={len(path)}")
-
-        def lla_to_dict(lla: LLA):
-            return {"lon": lla.lon, "lat": lla.lat, "alt": lla.alt}
-        
-        # origin 和 target 字段（包含 query_alt，用于响应信息）
-        origin_dict = {"lon": lon1, "lat": lat1, "alt": alt, "query_alt": origin_query_alt}
-        target_dict = {"lon": lon2, "lat": lat2, "alt": alt, "query_alt": target_query_alt}
-        
-        # path 字段中的点（只包含 lon、lat、alt，不包含 query_alt）
-        core_path = [lla_to_dict(p) for p in path]
-        origin_path_point = {"lon": lon1, "lat": lat1, "alt": alt}
-        target_path_point = {"lon": lon2, "lat": lat2, "alt": alt}
-        full_path = [origin_path_point] + core_path + [target_path_point]
-        
-        return {
-            "status": "success",
-            "origin": origin_dict,
-            "target": target_dict,
-            "path": full_path
-        }
+        return success_response(lon1, lat1, lon2, lat2, alt, path, origin_query_alt, target_query_alt)
     else:
         logging.warning(f"[FAILED] 规划失败: origin=({lon1},{lat1}), target=({lon2},{lat2})")
         return {
@@ -284,6 +677,433 @@ async def get_path(
         }
 
 
+async def plan_route_cached(
+        lon1: float, lat1: float, lon2: float, lat2: float, alt: float,
+        deadline: Optional[float] = None,
+        grid_cache: Optional[GridCache] = None,
+        admit: bool = True
+) -> dict:
+    """
+    经路线缓存的规划：终点已有代价场时直接沿梯度得到路径（响应带 flow_field=true）；
+    否则路线缓存命中直接返回，相同起终点格子的并发请求合并为一次规划。
+    admit=False 时不单独占用准入名额（由调用方统一控制，如批量规划）。超出容量时抛出 Overloaded。
+    """
+    QH = get_query_helper()
+
+    response = await plan_route_from_field(lon1, lat1, lon2, lat2, alt)
+    if response is not None:
+        return {**response, "cached": False, "flow_field": True}
+
+    async def compute():
+        used_tiles = set()
+        if admit:
+            async with planning_admission.slot(deadline):
+                with stage_timer("route"):
+                    response = await plan_route(lon1, lat1, lon2, lat2, alt, deadline, used_tiles, grid_cache)
+        else:
+            with stage_timer("route"):
+                response = await plan_route(lon1, lat1, lon2, lat2, alt, deadline, used_tiles, grid_cache)
+        if response.get("status") != "success":
+            return response, None
+        deps = {}
+        for key in used_tiles:
+            version = QH.tile_version(key)
+            if version is not None:
+                deps[key] = version
+        return response, deps
+
+    route_key = route_cache.make_key(lon1, lat1, lon2, lat2, alt)
+    response, source = await route_cache.get_or_compute(route_key, QH.tile_version, compute)
+    if source != "miss":
+        response = respond_for_request(response, lon1, lat1, lon2, lat2)
+    return {**response, "cached": source == "hit"}
+
+
+async def plan_route_traced(
+        lon1: float, lat1: float, lon2: float, lat2: float, alt: float, deadline: Optional[float] = None
+) -> dict:
+    """不经路线缓存与代价场重新规划一次，响应附带 trace（逐跳统计、合并前后点数、各次查询的缓存结果）"""
+    trace = PlanTrace()
+    async with planning_admission.slot(deadline):
+        with activate_trace(trace):
+            response = await plan_route(lon1, lat1, lon2, lat2, alt, deadline, trace=trace)
+    return {**response, "trace": trace.to_dict()}
+
+
+@app.get("/path-planning", summary="执行路径规划", tags=["Route"])
+async def get_path(
+        lon1: float = Query(..., description="起点经度"),
+        lat1: float = Query(..., description="起点纬度"),
+        lon2: float = Query(..., description="终点经度"),
+        lat2: float = Query(..., description="终点纬度"),
+        alt: float = Query(0, description="高度（米）"),
+        timeout: Optional[float] = Query(None, gt=0, description="规划截止时间（秒），不填使用服务端默认值"),
+        format: Optional[str] = Query(None, pattern="^(json|polyline|binary|msgpack)$",
+                                      description="响应格式：json / polyline / binary / msgpack，不填按 Accept 头协商"),
+        dtype: str = Query("f8", pattern="^(f8|f4)$", description="binary/msgpack 路径数组精度：f8 或 f4"),
+        precision: int = Query(5, ge=5, le=7, description="polyline 编码精度（小数位数）"),
+        debug: Optional[str] = Query(None, pattern="^trace$",
+                                     description="trace：绕过路线缓存与代价场重新规划，并在 JSON 响应中附带逐跳追踪"),
+        accept: Optional[str] = Header(None, include_in_schema=False),
+        x_profile: Optional[str] = Header(None, description="为 1 时 profile 本次请求，响应头 X-Profile-Id 为保存的 id")
+):
+    logging.info(f"Request: origin=({lon1}, {lat1}), target=({lon2}, {lat2}), alt={alt}")
+
+    fmt = formats.negotiate_format(format, accept)
+    if fmt == "msgpack" and formats.msgpack is None:
+        return JSONResponse(status_code=406, content={
+            "status": "failed",
+            "error": "unsupported_format",
+            "message": "服务端未安装 msgpack，无法输出 msgpack 格式",
+            "supported": [f for f in formats.FORMATS if f != "msgpack"]
+        })
+
+    invalid = validate_route_params(lon1, lat1, lon2, lat2)
+    if invalid is not None:
+        return invalid
+
+    t0 = time.perf_counter()
+    deadline = time.time() + min(timeout or PLAN_TIMEOUT, PLAN_TIMEOUT_MAX)
+    force_profile = PROFILE_ALLOW_HEADER and (x_profile or "").lower() in ("1", "true", "yes")
+    params = {"lon1": lon1, "lat1": lat1, "lon2": lon2, "lat2": lat2, "alt": alt, "timeout": timeout,
+              "format": fmt, "debug": debug}
+    response = None
+    async with request_profiler.profile("/path-planning", params, force_profile) as record:
+        try:
+            if debug == "trace":
+                response = await plan_route_traced(lon1, lat1, lon2, lat2, alt, deadline)
+                fmt = "json"
+            else:
+                response = await plan_route_cached(lon1, lat1, lon2, lat2, alt, deadline)
+            record["status"] = response.get("status")
+        except Overloaded as e:
+            record["status"] = "overloaded"
+            result = overloaded_response(e)
+        else:
+            result = formats.render_route(response, fmt, dtype, precision)
+    if traffic_recorder is not None:
+        traffic_recorder.record("/path-planning", params, time.perf_counter() - t0, response, record.get("status"))
+    if "profile_id" in record:
+        result.headers["X-Profile-Id"] = record["profile_id"]
+    return result
+
+
+def encode_stream_record(kind: str, record: dict, fmt: str) -> str:
+    """流式记录编码：ndjson 每行一个 JSON（带 type 字段），sse 为 event/data 事件"""
+    if fmt == "sse":
+        return f"event: {kind}\ndata: {json.dumps(record, ensure_ascii=False)}\n\n"
+    return json.dumps({"type": kind, **record}, ensure_ascii=False) + "\n"
+
+
+async def stream_route(
+        lon1: float, lat1: float, lon2: float, lat2: float, alt: float, deadline: float, fmt: str
+):
+    """
+    规划过程中每确认一跳即输出 segment 记录（该跳 A* 原始路径，未合并），
+    结束时输出 result（与 /path-planning 相同的合并简化后响应）与 summary。
+    客户端断开时取消规划。
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    t0 = time.perf_counter()
+
+    def on_segment(path: List[LLA]):
+        queue.put_nowait(("segment", path))
+
+    async def run():
+        try:
+            async with planning_admission.slot(deadline):
+                response = await plan_route(lon1, lat1, lon2, lat2, alt, deadline, on_segment=on_segment)
+        except Overloaded as e:
+            response = {
+                "status": "failed",
+                "error": "overloaded",
+                "reason": e.reason,
+                "message": "服务繁忙，请稍后重试",
+                "retry_after": e.retry_after
+            }
+        queue.put_nowait(("result", response))
+
+    task = asyncio.create_task(run())
+    segments = 0
+    first_segment_s = None
+    try:
+        while True:
+            kind, payload = await queue.get()
+            if kind == "segment":
+                if first_segment_s is None:
+                    first_segment_s = round(time.perf_counter() - t0, 3)
+                points = path_records(payload)
+                yield encode_stream_record("segment", {"index": segments, "points": points}, fmt)
+                segments += 1
+                continue
+            yield encode_stream_record("result", payload, fmt)
+            summary = {
+                "status": payload.get("status"),
+                "segments": segments,
+                "first_segment_s": first_segment_s,
+                "elapsed_s": round(time.perf_counter() - t0, 3),
+            }
+            yield encode_stream_record("summary", summary, fmt)
+            break
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+@app.get("/path-planning/stream", summary="流式路径规划", tags=["Route"])
+async def get_path_stream(
+        lon1: float = Query(..., description="起点经度"),
+        lat1: float = Query(..., description="起点纬度"),
+        lon2: float = Query(..., description="终点经度"),
+        lat2: float = Query(..., description="终点纬度"),
+        alt: float = Query(0, description="高度（米）"),
+        timeout: Optional[float] = Query(None, gt=0, description="规划截止时间（秒），不填使用服务端默认值"),
+        format: str = Query("ndjson", pattern="^(ndjson|sse)$", description="输出格式：ndjson 或 sse"),
+):
+    """与 /path-planning 相同的规划，但每确认一跳立即输出，最后输出合并后的路线与汇总（不经路线缓存）"""
+    logging.info(f"Stream request: origin=({lon1}, {lat1}), target=({lon2}, {lat2}), alt={alt}, format={format}")
+    invalid = validate_route_params(lon1, lat1, lon2, lat2)
+    if invalid is not None:
+        return invalid
+    deadline = time.time() + min(timeout or PLAN_TIMEOUT, PLAN_TIMEOUT_MAX)
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream_route(lon1, lat1, lon2, lat2, alt, deadline, format), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class RoutePair(BaseModel):
+    lon1: float = Field(..., description="起点经度")
+    lat1: float = Field(..., description="起点纬度")
+    lon2: float = Field(..., description="终点经度")
+    lat2: float = Field(..., description="终点纬度")
+    alt: float = Field(0, description="高度（米）")
+
+
+class BatchRequest(BaseModel):
+    pairs: List[RoutePair] = Field(..., description="起终点对列表")
+    workers: Optional[int] = Field(None, ge=1, description="并行规划数，不填使用服务端 batch_max_workers")
+    timeout: Optional[float] = Field(None, gt=0, description="整批截止时间（秒），不填使用服务端默认值")
+
+
+@app.post("/path-planning/batch", summary="批量路径规划", tags=["Route"])
+async def get_path_batch(req: BatchRequest):
+    """
+    一次规划多个起终点对：共享高程查询缓存与已构建的网格栅格，按 workers 并行，
+    结果按输入顺序返回，每项带独立 status。每个起终点对各占一个规划准入名额（同时至多 workers 个），
+    被拒绝的对以 overloaded 状态返回，不影响其余各对。
+    """
+    if not req.pairs:
+        return {"status": "failed", "error": "invalid_parameters", "message": "pairs 不能为空"}
+    if len(req.pairs) > BATCH_MAX_PAIRS:
+        return {"status": "failed", "error": "invalid_parameters",
+                "message": f"单批最多 {BATCH_MAX_PAIRS} 个起终点对", "count": len(req.pairs)}
+    logging.info(f"Batch request: pairs={len(req.pairs)}")
+
+    workers = min(req.workers or BATCH_MAX_WORKERS, BATCH_MAX_WORKERS)
+    deadline = time.time() + min(req.timeout or BATCH_TIMEOUT, PLAN_TIMEOUT_MAX * len(req.pairs))
+    grid_cache = GridCache(max_bytes=BATCH_GRID_CACHE_BYTES)
+    sem = asyncio.Semaphore(workers)
+    t0 = time.perf_counter()
+
+    async def run_pair(pair: RoutePair) -> dict:
+        invalid = validate_route_params(pair.lon1, pair.lat1, pair.lon2, pair.lat2)
+        if invalid is not None:
+            return invalid
+        async with sem:
+            try:
+                return await plan_route_cached(pair.lon1, pair.lat1, pair.lon2, pair.lat2, pair.alt,
+                                               deadline, grid_cache=grid_cache)
+            except Overloaded as e:
+                return overloaded_body(e)
+
+    results = await asyncio.gather(*(run_pair(p) for p in req.pairs))
+
+    succeeded = sum(1 for r in results if r.get("status") == "success")
+    return {
+        "status": "success",
+        "count": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "grid_reuse": grid_cache.stats(),
+        "results": [{"index": i, **r} for i, r in enumerate(results)],
+    }
+
+
+class TargetPoint(BaseModel):
+    lon: float = Field(..., description="终点经度")
+    lat: float = Field(..., description="终点纬度")
+
+
+class OneToManyRequest(BaseModel):
+    lon: float = Field(..., description="起点经度")
+    lat: float = Field(..., description="起点纬度")
+    alt: float = Field(0, description="高度（米）")
+    targets: List[TargetPoint] = Field(..., description="终点列表")
+    timeout: Optional[float] = Field(None, gt=0, description="截止时间（秒），不填使用服务端默认值")
+
+
+@app.post("/path-planning/one-to-many", summary="一对多路径规划", tags=["Route"])
+async def get_path_one_to_many(req: OneToManyRequest):
+    """
+    同一起点到多个终点：在起点瓦片内生长一棵共享的最短路树，树内终点直接回溯路径，
+    瓦片外的终点逐个规划（同时至多 batch_max_workers 个）。结果按输入顺序返回，每项带独立 status。
+    共享树阶段与每个瓦片外终点各占一个规划准入名额；瓦片外终点被拒绝时该项为 overloaded。
+    """
+    if not req.targets:
+        return {"status": "failed", "error": "invalid_parameters", "message": "targets 不能为空"}
+    if len(req.targets) > BATCH_MAX_PAIRS:
+        return {"status": "failed", "error": "invalid_parameters",
+                "message": f"单次最多 {BATCH_MAX_PAIRS} 个终点", "count": len(req.targets)}
+    logging.info(f"One-to-many request: origin=({req.lon}, {req.lat}), targets={len(req.targets)}")
+
+    results: List[Optional[dict]] = [None] * len(req.targets)
+    valid = []
+    for i, t in enumerate(req.targets):
+        invalid = validate_route_params(req.lon, req.lat, t.lon, t.lat)
+        if invalid is not None:
+            results[i] = invalid
+        else:
+            valid.append(i)
+
+    deadline = time.time() + min(req.timeout or BATCH_TIMEOUT, PLAN_TIMEOUT_MAX * len(req.targets))
+    t0 = time.perf_counter()
+    ori = LLA(req.lon, req.lat, req.alt)
+    origin_dict = {"lon": req.lon, "lat": req.lat, "alt": req.alt}
+    try:
+        if valid:
+            ters = [LLA(req.targets[i].lon, req.targets[i].lat, req.alt) for i in valid]
+            QH = get_query_helper()
+            with PathPlan(QH.query_fn, prefetch=PREFETCH_IN_FLIGHT, prefetch_snap=QH.cache_cell,
+                          executor=compute_executor, grid_cache=GridCache(max_bytes=BATCH_GRID_CACHE_BYTES),
+                          simplify_km=PATH_SIMPLIFY_KM, workspace_pool=workspace_pool) as planning:
+                planned = await planning.PathPlanOneToMany(ori, ters, req.alt, deadline=deadline,
+                                                           max_parallel=BATCH_MAX_WORKERS,
+                                                           admit=lambda: planning_admission.slot(deadline))
+            for i, res in zip(valid, planned):
+                target_dict = {"lon": req.targets[i].lon, "lat": req.targets[i].lat, "alt": req.alt}
+                if isinstance(res, Overloaded):
+                    results[i] = {**overloaded_body(res), "origin": origin_dict, "target": target_dict}
+                    continue
+                if isinstance(res, Exception):
+                    raise res
+                path, ok = res
+                if ok:
+                    core_path = path_records(path)
+                    results[i] = {"status": "success", "origin": origin_dict, "target": target_dict,
+                                  "path": [origin_dict] + core_path + [target_dict]}
+                else:
+                    results[i] = {"status": "failed", "error": "unreachable",
+                                  "message": "终点不可达或当前数据条件下无法规划路径",
+                                  "origin": origin_dict, "target": target_dict}
+    except Overloaded as e:
+        return overloaded_response(e)
+    except DeadlineExceeded:
+        logging.warning(f"[TIMEOUT] 一对多规划超时: origin=({req.lon},{req.lat})")
+        return {
+            "status": "failed",
+            "error": "deadline_exceeded",
+            "message": "规划超过请求截止时间，已停止",
+            "origin": origin_dict
+        }
+    except Exception as e:
+        logging.error(f"一对多路径规划异常: {e}")
+        return {"status": "failed", "error": "exception", "message": str(e)}
+
+    succeeded = sum(1 for r in results if r.get("status") == "success")
+    return {
+        "status": "success",
+        "count": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "results": [{"index": i, **r} for i, r in enumerate(results)],
+    }
+
+
+class ThresholdsRequest(BaseModel):
+    lon1: float = Field(..., description="起点经度")
+    lat1: float = Field(..., description="起点纬度")
+    lon2: float = Field(..., description="终点经度")
+    lat2: float = Field(..., description="终点纬度")
+    alts: List[float] = Field(..., description="待尝试的高度（障碍阈值）列表")
+    search_lowest: bool = Field(False, description="是否求起点瓦片内使起终点连通的最小阈值")
+    plan: bool = Field(True, description="是否对可行阈值执行路径规划；False 时只返回可行性")
+    timeout: Optional[float] = Field(None, gt=0, description="截止时间（秒），不填使用服务端默认值")
+
+
+@app.post("/path-planning/thresholds", summary="多阈值路径规划", tags=["Route"])
+async def get_path_thresholds(req: ThresholdsRequest):
+    """
+    同一起终点对尝试多个高度阈值：高程瓦片与重采样栅格只获取/构建一次，各阈值的障碍掩码向量化生成，
+    先按起点瓦片内的连通性判断可行性（可选求最小可行阈值），只对可行（或无法判断）的阈值执行搜索。
+    可行性判断占用一个规划准入名额；各阈值的规划各占一个名额（同时至多 batch_max_workers 个），
+    被拒绝的阈值以 overloaded 状态返回。
+    """
+    if not req.alts:
+        return {"status": "failed", "error": "invalid_parameters", "message": "alts 不能为空"}
+    if len(req.alts) > MAX_THRESHOLDS:
+        return {"status": "failed", "error": "invalid_parameters",
+                "message": f"单次最多 {MAX_THRESHOLDS} 个阈值", "count": len(req.alts)}
+    invalid = validate_route_params(req.lon1, req.lat1, req.lon2, req.lat2)
+    if invalid is not None:
+        return invalid
+    logging.info(f"Thresholds request: origin=({req.lon1}, {req.lat1}), target=({req.lon2}, {req.lat2}), alts={req.alts}")
+
+    deadline = time.time() + min(req.timeout or PLAN_TIMEOUT, PLAN_TIMEOUT_MAX)
+    grid_cache = GridCache(max_bytes=BATCH_GRID_CACHE_BYTES)
+    sem = asyncio.Semaphore(BATCH_MAX_WORKERS)
+    t0 = time.perf_counter()
+    origin = {"lon": req.lon1, "lat": req.lat1}
+    target = {"lon": req.lon2, "lat": req.lat2}
+    try:
+        async with planning_admission.slot(deadline):
+            planning = PathPlan(get_query_helper().query_fn, executor=compute_executor, grid_cache=grid_cache,
+                                simplify_km=PATH_SIMPLIFY_KM)
+            scan = await planning.ScanThresholds(LLA(req.lon1, req.lat1, 0), LLA(req.lon2, req.lat2, 0),
+                                                 req.alts, req.search_lowest)
+        if scan is None:
+            return {
+                "status": "failed",
+                "error": "no_elevation_data_origin",
+                "message": "起点附近缺少高程/可通行数据",
+                "origin": origin
+            }
+
+        async def run_alt(alt: float, feasible: Optional[bool]) -> dict:
+            item = {"alt": alt, "feasible": feasible}
+            if feasible is False:
+                return {**item, "status": "failed", "error": "infeasible",
+                        "message": "该阈值下起终点在起点瓦片内不连通"}
+            if not req.plan:
+                return {**item, "status": "success"}
+            async with sem:
+                try:
+                    route = await plan_route_cached(req.lon1, req.lat1, req.lon2, req.lat2, alt,
+                                                    deadline, grid_cache=grid_cache)
+                except Overloaded as e:
+                    route = overloaded_body(e)
+            return {**item, **route}
+
+        results = await asyncio.gather(*(run_alt(a, f) for a, f in zip(req.alts, scan["feasible"])))
+    except Overloaded as e:
+        return overloaded_response(e)
+    except DeadlineExceeded:
+        return {"status": "failed", "error": "deadline_exceeded", "message": "规划超过请求截止时间，已停止",
+                "origin": origin, "target": target}
+
+    return {
+        "status": "success",
+        "origin": origin,
+        "target": target,
+        "target_in_origin_grid": scan["in_grid"],
+        "lowest_feasible_alt": scan["lowest"],
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+        "grid_reuse": grid_cache.stats(),
+        "results": results,
+    }
+
+
 if __name__ == "__main__":
     logging.info(f"启动服务: host={SERVER_HOST}, port={SERVER_PORT}")
     logging.info(f"Query host={QUERY_HOST}:{QUERY_PORT}")
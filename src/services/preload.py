@@ -0,0 +1,178 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+from typing import Optional, Callable, List, Tuple, Dict
+from src.services.query import AsyncQueryHelper, estimate_entry_bytes
+
+
+class RateLimiter:
+    """简单的匀速限流器：相邻两次放行间隔不小于 1/rate 秒（rate<=0 表示不限速）"""
+
+    def __init__(self, rate: Optional[float] = None):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_time = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if self.interval <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def area_points(
+    min_lon: float, min_lat: float, max_lon: float, max_lat: float, step: float
+) -> List[Tuple[float, float]]:
+    """
+    生成覆盖 bbox 的查询中心点（按 step 对齐到网格），
+    step 取缓存精度时，每个点恰好对应一个缓存键。
+    """
+    if step <= 0:
+        raise ValueError("step 必须为正数")
+    lon_lo, lon_hi = sorted((min_lon, max_lon))
+    lat_lo, lat_hi = sorted((min_lat, max_lat))
+    i0, i1 = math.floor(lon_lo / step), math.ceil(lon_hi / step)
+    j0, j1 = math.floor(lat_lo / step), math.ceil(lat_hi / step)
+    return [(i * step, j * step) for i, j in itertools.product(range(i0, i1 + 1), range(j0, j1 + 1))]
+
+
+class PreloadJob:
+    """
+    区域预加载任务：并发 + 限速地把 bbox 内所有瓦片查询进缓存，并记录进度。
+    区域的估算字节数（瓦片数 × 单瓦片字节数）超过查询缓存上限时拒绝（预加载的瓦片会相互淘汰）：
+    单瓦片字节数取 tile_bytes，未提供时取当前缓存条目的平均值；缓存为空无法预估时，
+    按已加载瓦片的实际大小推算，超出则提前停止（状态 too_large）。
+    """
+
+    _ids = itertools.count(1)
+    # 运行中推算总字节数前至少加载的瓦片数
+    MIN_SAMPLE_TILES = 8
+
+    def __init__(
+        self,
+        helper: AsyncQueryHelper,
+        bbox: Tuple[float, float, float, float],
+        concurrency: int = 8,
+        rate: Optional[float] = None,
+        step: Optional[float] = None,
+        size: int = 3,
+        max_tiles: int = 100000,
+        progress: Optional[Callable[[Dict], None]] = None,
+        tile_bytes: Optional[float] = None
+    ):
+        self.id = next(PreloadJob._ids)
+        self.helper = helper
+        self.bbox = tuple(bbox)
+        self.concurrency = max(1, int(concurrency))
+        self.rate = rate
+        self.size = size
+        self.step = step or helper.cache_precision
+        self.points = area_points(*self.bbox, self.step)
+        if len(self.points) > max_tiles:
+            raise ValueError(f"预加载区域过大：{len(self.points)} 个瓦片，上限 {max_tiles}")
+        self.total = len(self.points)
+        tile_bytes = tile_bytes or helper.mean_entry_bytes()
+        if tile_bytes is not None and self.total * tile_bytes > helper.cache_max_bytes:
+            raise ValueError(f"预加载区域过大：约 {self.total * tile_bytes / 2**20:.1f}MB，"
+                             f"超过查询缓存上限 {helper.cache_max_bytes / 2**20:.1f}MB")
+        self.progress = progress
+        self.done = 0
+        self.cached = 0
+        self.loaded = 0
+        self.loaded_bytes = 0
+        self.empty = 0
+        self.failed = 0
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.id,
+            "state": self.status,
+            "bbox": list(self.bbox),
+            "concurrency": self.concurrency,
+            "rate": self.rate,
+            "total": self.total,
+            "done": self.done,
+            "already_cached": self.cached,
+            "loaded": self.loaded,
+            "empty": self.empty,
+            "failed": self.failed,
+            "error": self.error,
+            "elapsed_s": None if elapsed is None else round(elapsed, 3)
+        }
+
+    async def _load_one(self, lon: float, lat: float, limiter: RateLimiter):
+        if self.helper.is_cached(lon, lat, self.size):
+            self.cached += 1
+        else:
+            await limiter.wait()
+            res, source = await self.helper.query_with_source(lon, lat, self.size)
+            if source == "error":
+                self.failed += 1
+            elif source == "hit":
+                self.cached += 1
+            elif res:
+                self.loaded += 1
+                self.loaded_bytes += estimate_entry_bytes(res)
+            else:
+                self.empty += 1
+        self.done += 1
+        if self.progress is not None:
+            self.progress(self.to_dict())
+
+    def _projected_bytes(self) -> float:
+        """按已加载瓦片的平均大小推算整个区域的字节数（样本不足时为 0）"""
+        if self.loaded < self.MIN_SAMPLE_TILES:
+            return 0.0
+        return self.loaded_bytes / self.loaded * (self.total - self.empty - self.failed)
+
+    async def run(self) -> Dict:
+        self.status = "running"
+        self.started_at = time.time()
+        limiter = RateLimiter(self.rate)
+        queue = iter(self.points)
+
+        async def worker():
+            for lon, lat in queue:
+                if self.error is not None:
+                    return
+                await self._load_one(lon, lat, limiter)
+                if self.error is None and self._projected_bytes() > self.helper.cache_max_bytes:
+                    self.error = (f"预加载区域过大：按已加载瓦片推算约 {self._projected_bytes() / 2**20:.1f}MB，"
+                                  f"超过查询缓存上限 {self.helper.cache_max_bytes / 2**20:.1f}MB，已停止")
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, max(1, self.total)))))
+            self.status = "finished" if self.error is None else "too_large"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            raise
+        except Exception as e:
+            logging.error(f"[Preload] 任务 {self.id} 异常: {e}")
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+        logging.info(f"[Preload] 任务 {self.id} 结束: {self.to_dict()}")
+        return self.to_dict()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def start(self) -> asyncio.Task:
+        self.task = asyncio.ensure_future(self.run())
+        return self.task
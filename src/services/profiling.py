@@ -0,0 +1,298 @@
+"""
+按需 profile 慢请求：
+- 请求头 X-Profile: 1 强制对单个请求做 cProfile（事件循环线程 + 经 ComputeExecutor 提交的计算阶段）
+- 设置耗时阈值后，请求期间以低开销方式采样调用栈，只有超过阈值的请求才落盘（折叠栈格式）
+profile 文件与请求参数写入本地有界目录，由管理端点列出与下载。
+"""
+import asyncio
+import cProfile
+import collections
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, List, Callable, Any, Tuple
+from src.core.executor import ComputeHook, compute_hook
+
+
+PROFILE_ID_RE = re.compile(r"^\d{8}-\d{6}-\d{4}$")
+
+
+class ProfileStore:
+    """
+    本地有界的 profile 目录：每份 profile 为数据文件（.prof 为 cProfile/pstats 格式，.folded 为折叠栈）
+    加同名 .json 元信息（请求参数、耗时、模式等）；超过 max_profiles 时删除最旧的。
+    """
+
+    def __init__(self, directory: str, max_profiles: int = 50):
+        self.directory = directory
+        self.max_profiles = max(1, max_profiles)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def save(self, meta: Dict, suffix: str, write: Callable[[str], None]) -> str:
+        """write(path) 负责写入数据文件；返回 profile id"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self._seq) % 10000:04d}"
+            data_file = f"{profile_id}{suffix}"
+            write(os.path.join(self.directory, data_file))
+            meta = {"id": profile_id, "file": data_file, "created": time.time(), **meta}
+            with open(os.path.join(self.directory, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            self._prune()
+        return profile_id
+
+    def _prune(self):
+        metas = sorted(n for n in os.listdir(self.directory) if n.endswith(".json"))
+        for name in metas[:max(0, len(metas) - self.max_profiles)]:
+            profile_id = name[:-len(".json")]
+            for n in os.listdir(self.directory):
+                if n.startswith(profile_id + "."):
+                    os.remove(os.path.join(self.directory, n))
+
+    def list(self) -> List[Dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        items = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith(".json"):
+                meta = self.get(name[:-len(".json")])
+                if meta is not None:
+                    items.append(meta)
+        return items
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def data_path(self, meta: Dict) -> str:
+        return os.path.join(self.directory, meta["file"])
+
+
+def _profiled_call(owner: Tuple[int, int], fn: Callable[..., Any], args: tuple, kwargs: dict):
+    """
+    在计算线程/进程内用 cProfile 执行 fn，返回 (结果, pstats 统计字典)。
+    与发起请求的线程相同（inline 后端）时直接执行，由请求级 profiler 统计。
+    """
+    if owner == (os.getpid(), threading.get_ident()):
+        return fn(*args, **kwargs), None
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        prof.disable()
+    return result, pstats.Stats(prof).stats
+
+
+class CProfileSession(ComputeHook):
+    """单个请求的 cProfile 会话：事件循环线程上的请求处理 + 计算线程/进程内的各计算阶段"""
+
+    def __init__(self):
+        self.owner = (os.getpid(), threading.get_ident())
+        self.profile = cProfile.Profile()
+        self._stage_stats: List[Dict] = []
+
+    def wrap(self, fn, args, kwargs):
+        return _profiled_call, (self.owner, fn, args, kwargs), {}
+
+    def unwrap(self, result):
+        result, stats = result
+        if stats:
+            self._stage_stats.append(stats)
+        return result
+
+    def stats(self) -> pstats.Stats:
+        merged = pstats.Stats(self.profile)
+        for stats in self._stage_stats:
+            part = pstats.Stats()
+            part.stats = stats
+            part.get_top_level_stats()
+            merged.add(part)
+        return merged
+
+
+def _tagged_call(tags: Dict[int, str], request_id: str, fn: Callable[..., Any], args: tuple, kwargs: dict):
+    """计算线程执行期间登记所属请求，供采样线程归档调用栈"""
+    ident = threading.get_ident()
+    tags[ident] = request_id
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        tags.pop(ident, None)
+
+
+class _SamplerTag(ComputeHook):
+    def __init__(self, tags: Dict[int, str], request_id: str):
+        self.tags = tags
+        self.request_id = request_id
+
+    def wrap(self, fn, args, kwargs):
+        return _tagged_call, (self.tags, self.request_id, fn, args, kwargs), {}
+
+
+def collapse_stack(frame, max_depth: int = 128) -> str:
+    """折叠栈（根在前，以 ; 分隔），与 flamegraph.pl / speedscope 的 folded 格式一致"""
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """
+    低开销采样 profiler：有请求登记时，后台线程每 interval 秒读取一次 sys._current_frames()，
+    按线程当前所属请求归档折叠栈——事件循环线程按正在运行的 asyncio 任务，计算线程按提交任务时的登记。
+    没有请求登记时线程退出。进程池后端的工作进程不在采样范围内。
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.thread_tags: Dict[int, str] = {}
+        self._tasks: Dict[Any, str] = {}
+        self._samples: Dict[str, collections.Counter] = {}
+        self._loop = None
+        self._loop_thread: Optional[int] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, request_id: str):
+        task = asyncio.current_task()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._tasks[task] = request_id
+            self._samples[request_id] = collections.Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def unregister(self, request_id: str) -> collections.Counter:
+        with self._lock:
+            for task in [t for t, rid in self._tasks.items() if rid == request_id]:
+                del self._tasks[task]
+            return self._samples.pop(request_id, collections.Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._samples:
+                    self._thread = None
+                    return
+                loop, loop_thread = self._loop, self._loop_thread
+                tasks = dict(self._tasks)
+            current = asyncio.current_task(loop) if loop is not None else None
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == loop_thread:
+                    request_id = tasks.get(current)
+                else:
+                    request_id = self.thread_tags.get(ident)
+                if request_id is None:
+                    continue
+                with self._lock:
+                    counter = self._samples.get(request_id)
+                    if counter is not None:
+                        counter[collapse_stack(frame)] += 1
+
+
+class RequestProfiler:
+    """
+    按请求 profile：
+    - force=True（请求头开启）：cProfile 记录事件循环线程上的处理及计算线程/进程内的各计算阶段，
+      结果存为 .prof（pstats 格式）。同一时刻只允许一个 cProfile 会话，其余请求退回采样模式。
+      事件循环线程上的统计会混入同期其他请求的处理。
+    - threshold > 0：请求期间采样调用栈，耗时超过阈值才保存为 .folded（折叠栈）。
+    """
+
+    def __init__(self, store: ProfileStore, threshold: float = 0.0, interval: float = 0.005):
+        self.store = store
+        self.threshold = threshold
+        self.sampler = StackSampler(interval)
+        self._seq = itertools.count(1)
+        self._cprofile_active = False
+        self.saved = 0
+
+    @asynccontextmanager
+    async def profile(self, endpoint: str, params: Dict, force: bool = False):
+        """
+        包装一次请求处理；yield 的字典可由调用方写入 status 等结果信息，
+        保存 profile 后其中的 profile_id 为保存的 id。
+        """
+        record: Dict = {}
+        use_cprofile = force and not self._cprofile_active
+        use_sampler = not use_cprofile and (force or self.threshold > 0)
+        if not (use_cprofile or use_sampler):
+            yield record
+            return
+
+        request_id = str(next(self._seq))
+        session = None
+        if use_cprofile:
+            self._cprofile_active = True
+            session = CProfileSession()
+            token = compute_hook.set(session)
+            session.profile.enable()
+        else:
+            self.sampler.register(request_id)
+            token = compute_hook.set(_SamplerTag(self.sampler.thread_tags, request_id))
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            elapsed = time.perf_counter() - t0
+            compute_hook.reset(token)
+            if session is not None:
+                session.profile.disable()
+                self._cprofile_active = False
+            else:
+                samples = self.sampler.unregister(request_id)
+            meta = {"endpoint": endpoint, "params": params, "elapsed_s": round(elapsed, 6),
+                    "forced": force, **{k: v for k, v in record.items() if k != "profile_id"}}
+            try:
+                if session is not None:
+                    record["profile_id"] = self.store.save(
+                        {**meta, "mode": "cprofile"}, ".prof", session.stats().dump_stats)
+                    self.saved += 1
+                elif force or elapsed >= self.threshold:
+                    record["profile_id"] = self.store.save(
+                        {**meta, "mode": "sampling", "interval_s": self.sampler.interval,
+                         "samples": sum(samples.values())},
+                        ".folded", lambda path: _write_folded(path, samples))
+                    self.saved += 1
+            except OSError as e:
+                logging.warning(f"[Profile] 保存失败: {e}")
+
+    def stats(self) -> Dict:
+        return {"directory": self.store.directory, "max_profiles": self.store.max_profiles,
+                "threshold_s": self.threshold, "interval_s": self.sampler.interval, "saved": self.saved}
+
+
+def _write_folded(path: str, samples: collections.Counter):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, n in samples.most_common():
+            f.write(f"{stack} {n}\n")
+
+
+def pstats_text(path: str, sort: str = "cumulative", limit: int = 60) -> str:
+    """.prof 文件的文本摘要（按 sort 排序的前 limit 项）"""
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
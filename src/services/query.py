@@ -3,9 +3,62 @@ import httpx
 import logging
 import json
 import asyncio
-from typing import Optional, List
-from cachetools import TTLCache
-from src.core.grid import LLA
+import sys
+import time
+from typing import Optional, List, Union, Dict, Tuple
+from cachetools import TLRUCache
+from src.core.grid import LLA, LLABuffer
+from src.core.trace import current as current_trace
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库 json
+    orjson = None
+
+
+def parse_elevation(content: bytes) -> Optional[LLABuffer]:
+    """
+    解析上游高程查询响应，data 数组直接填充为列式 LLABuffer（不创建 LLA 对象）。
+    安装了 orjson 时用其解码。data 为空返回 None；格式错误抛出 ValueError/KeyError。
+    """
+    data_json = orjson.loads(content) if orjson is not None else json.loads(content)
+    data_list = data_json.get("data", [])
+    if not data_list:
+        return None
+    return LLABuffer.from_records(data_list)
+
+
+def estimate_entry_bytes(value) -> int:
+    """
+    估算一条缓存条目（查询结果）实际占用的内存字节数。
+    None（空结果）只计列表/键的固定开销；LLABuffer 按数组字节数计；
+    LLA 列表按首元素估算单点开销后乘以点数。
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, LLABuffer):
+        return size + value.nbytes
+    if not value:
+        return size
+    first = value[0]
+    per_item = sys.getsizeof(first)
+    attrs = getattr(first, "__dict__", None)
+    if attrs is not None:
+        per_item += sys.getsizeof(attrs)
+    per_item += 3 * sys.getsizeof(0.0)  # lon/lat/alt 三个 float 对象
+    return size + per_item * len(value)
+
+
+class SizedTLRUCache(TLRUCache):
+    """按字节预算淘汰的 TLRU 缓存，额外统计淘汰次数。"""
+
+    def __init__(self, maxsize, ttu, getsizeof=None):
+        super().__init__(maxsize, ttu, getsizeof=getsizeof)
+        self.evictions = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
 
 
 class QueryHelper:
@@ -22,28 +75,24 @@ class QueryHelper:
         self.request_path = request_path
         self.timeout = timeout
 
-    def query(self, lon: float, lat: float, size: int = 3) -> Optional[List[LLA]]:
+    def query(self, lon: float, lat: float, size: int = 3) -> Optional[LLABuffer]:
         url = f"{self.server}{self.request_path}?lon={lon}&lat={lat}&size={size}"
         try:
             response = requests.get(url, timeout=self.timeout)
             response.raise_for_status()
-            data_json = response.json()
-            data_list = data_json.get("data", [])
-            if not data_list:
-                return None
-            lla_data = [LLA(item["lon"], item["lat"], item.get("alt", 0)) for item in data_list]
-            return lla_data
+            return parse_elevation(response.content)
         except requests.RequestException as e:
             print(f"[QueryHelper] HTTP 请求错误: {e}")
             return None
-        except json.JSONDecodeError as e:
+        except ValueError as e:
+            # json.JSONDecodeError 与 orjson.JSONDecodeError 均为 ValueError 子类
             print(f"[QueryHelper] JSON 解析错误: {e}")
             return None
         except KeyError as e:
             print(f"[QueryHelper] 返回数据缺少字段: {e}")
             return None
 
-    def query_fn(self, lla: LLA) -> Optional[List[LLA]]:
+    def query_fn(self, lla: LLA) -> Optional[LLABuffer]:
         return self.query(lla.lon, lla.lat)
 
 
@@ -54,8 +103,9 @@ class AsyncQueryHelper:
         port=8025, 
         request="free/tinder/v3/box2/query", 
         timeout=5.0,
-        cache_size=1000,
+        cache_max_bytes=64 * 1024 * 1024,
         cache_ttl=300,
+        cache_negative_ttl=30,
         cache_precision=0.005
     ):
         self.host = host
@@ -64,16 +114,67 @@ class AsyncQueryHelper:
         self.request = request
         self.timeout = timeout
         
-        # 查询结果缓存：使用 TTL + LRU 策略
-        # cache_size: 最多缓存条目数
+        # 查询结果缓存：使用 TTL + LRU 策略，按条目实际字节数计入预算
+        # cache_max_bytes: 缓存总字节预算，默认64MB，超出后按 LRU 淘汰
         # cache_ttl: 缓存过期时间（秒），默认5分钟
+        # cache_negative_ttl: 空结果（无数据）的过期时间（秒），默认30秒
         # cache_precision: 缓存精度（度），默认0.005度（约500米）
         #   0.005度 ≈ 500米，0.01度 ≈ 1公里
         self.cache_precision = cache_precision
-        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_ttl = cache_ttl
+        self.cache_negative_ttl = cache_negative_ttl
+        self._cache = SizedTLRUCache(
+            maxsize=cache_max_bytes,
+            ttu=self._time_to_use,
+            getsizeof=estimate_entry_bytes
+        )
         self._cache_lock = asyncio.Lock()
         self._hit_count = 0
         self._miss_count = 0
+        self._coalesced_count = 0
+        self._oversize_count = 0
+        self._error_count = 0
+        # 在途查询：cache_key -> Future，用于合并并发的相同查询
+        self._inflight = {}
+        # 缓存条目版本号：每次写入递增，供路线缓存等上层缓存判断瓦片是否已变化/过期
+        self._versions = {}
+        self._version_seq = 0
+        # 上游取数回调 on_fetch(cache_key, result)：每次成功取数（未命中缓存）后在事件循环中同步调用，用于录制瓦片快照；
+        # 回调需立即返回（如只入队），耗时的写入放到后台线程
+        self.on_fetch = None
+
+    def _time_to_use(self, key, value, now):
+        """空结果使用更短的 TTL，避免无效点长期占用缓存、也便于数据补齐后尽快恢复"""
+        ttl = self.cache_ttl if value else self.cache_negative_ttl
+        return now + ttl
+
+    def _cache_put(self, key, value):
+        """写入缓存；单条超过总预算时不缓存"""
+        try:
+            self._cache[key] = value
+        except ValueError:
+            self._oversize_count += 1
+            logging.warning(f"[QueryCache] 条目超过缓存预算，未缓存: {key}")
+            return
+        self._version_seq += 1
+        self._versions[key] = self._version_seq
+        # 已淘汰/过期条目的版本号惰性清理
+        if len(self._versions) > 2 * len(self._cache) + 64:
+            self._versions = {k: v for k, v in self._versions.items() if k in self._cache}
+
+    def tile_version(self, key) -> Optional[int]:
+        """缓存条目当前版本号；条目不存在或已过期返回 None"""
+        if key not in self._cache:
+            return None
+        return self._versions.get(key)
+
+    def tracked_query_fn(self, used: set):
+        """返回一个与 query_fn 等价的查询函数，并把用到的缓存键记录到 used 中"""
+        async def _query_fn(lla: LLA):
+            used.add(self._make_cache_key(lla.lon, lla.lat))
+            return await self.query(lla.lon, lla.lat)
+        return _query_fn
 
     def _make_cache_key(self, lon: float, lat: float, size: int = 3):
         """
@@ -86,60 +187,133 @@ class AsyncQueryHelper:
         lat_rounded = round(lat / self.cache_precision) * self.cache_precision
         return (lon_rounded, lat_rounded, size)
 
+    def cache_cell(self, lon: float, lat: float) -> Tuple[float, float]:
+        """点所在缓存格的中心（同一格内的查询共用一个缓存条目），供走廊预取对齐"""
+        return self._make_cache_key(lon, lat)[:2]
+
+    def mean_entry_bytes(self) -> Optional[float]:
+        """当前缓存条目的平均字节数（按 estimate_entry_bytes），缓存为空时返回 None；用于估算预加载区域的内存占用"""
+        self._cache.expire()
+        return self._cache.currsize / len(self._cache) if len(self._cache) else None
+
+    def is_cached(self, lon: float, lat: float, size: int = 3) -> bool:
+        """判断该点对应的缓存条目是否存在且未过期（不影响 LRU 顺序）"""
+        return self._make_cache_key(lon, lat, size) in self._cache
+
+    async def _fetch(self, lon: float, lat: float, size: int = 3) -> Optional[LLABuffer]:
+        """向上游发起一次查询（不经缓存），请求/解析异常直接抛出"""
+        url = f"{self.server}{self.request}?lon={lon}&lat={lat}&size={size}"
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            resp = await client.get(url)
+            resp.raise_for_status()
+            return parse_elevation(resp.content)
+
     async def query(self, lon: float, lat: float, size: int = 3):
         """
         查询高程数据，带缓存支持。
         缓存键按照指定精度（默认0.005度≈500米）进行四舍五入，提高缓存命中率。
+        同一缓存键的并发查询会合并为一次上游请求（其余请求等待同一结果）。
+        """
+        return (await self.query_with_source(lon, lat, size))[0]
+
+    async def query_with_source(self, lon: float, lat: float, size: int = 3) -> Tuple[Optional[LLABuffer], str]:
+        """
+        同 query，另返回结果来源：hit / miss / coalesced，上游查询失败（含合并等待的同一次失败）为 error。
         """
         # 生成缓存键（按精度四舍五入）
         cache_key = self._make_cache_key(lon, lat, size)
         
-        # 尝试从缓存获取
+        trace = current_trace()
+        # 尝试从缓存获取；未命中时若已有相同键的查询在途，则等待其结果
         async with self._cache_lock:
             if cache_key in self._cache:
                 self._hit_count += 1
                 logging.debug(f"[QueryCache] HIT: ({lon:.6f}, {lat:.6f})")
-                return self._cache[cache_key]
-        
+                result = self._cache[cache_key]
+                if trace is not None:
+                    trace.add_query(lon, lat, "hit", points=len(result) if result else 0)
+                return result, "hit"
+            pending = self._inflight.get(cache_key)
+            if pending is None:
+                pending = asyncio.get_running_loop().create_future()
+                self._inflight[cache_key] = pending
+                owner = True
+            else:
+                self._coalesced_count += 1
+                owner = False
+
+        if not owner:
+            logging.debug(f"[QueryCache] COALESCED: ({lon:.6f}, {lat:.6f})")
+            t0 = time.perf_counter()
+            result, source = await asyncio.shield(pending)
+            source = "error" if source == "error" else "coalesced"
+            if trace is not None:
+                trace.add_query(lon, lat, "coalesced", time.perf_counter() - t0, len(result) if result else 0)
+            return result, source
+
         # 缓存未命中，执行查询
         self._miss_count += 1
         logging.debug(f"[QueryCache] MISS: ({lon:.6f}, {lat:.6f})")
-        
-        url = f"{self.server}{self.request}?lon={lon}&lat={lat}&size={size}"
+
+        result = None
+        fetched = False
+        t0 = time.perf_counter()
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                resp = await client.get(url)
-                resp.raise_for_status()
-                data_json = resp.json()
-                data_list = data_json.get("data", [])
-                if not data_list:
-                    # 查询结果为空也缓存（避免重复查询无效点）
-                    result = None
-                else:
-                    result = [LLA(item["lon"], item["lat"], item.get("alt", 0)) for item in data_list]
-                
-                # 存入缓存
-                async with self._cache_lock:
-                    self._cache[cache_key] = result
-                
-                return result
+            # 查询结果为空也缓存（避免重复查询无效点），空结果使用更短 TTL
+            result = await self._fetch(lon, lat, size)
+            fetched = True
+            async with self._cache_lock:
+                self._cache_put(cache_key, result)
+            if trace is not None:
+                trace.add_query(lon, lat, "miss", time.perf_counter() - t0, len(result) if result else 0)
         except Exception as e:
+            self._error_count += 1
             logging.error(f"[QueryHelper] 异步查询失败: {e}")
-            return None
+            result = None
+            if trace is not None:
+                trace.add_query(lon, lat, "error", time.perf_counter() - t0)
+        finally:
+            self._inflight.pop(cache_key, None)
+            if not pending.done():
+                pending.set_result((result, "miss" if fetched else "error"))
+        # 回调（如录制）不影响查询结果，也不拖延等待同一键的其他请求
+        if fetched and self.on_fetch is not None:
+            try:
+                self.on_fetch(cache_key, result)
+            except Exception as e:
+                logging.error(f"[QueryHelper] on_fetch 回调失败: {e}")
+        return result, "miss" if fetched else "error"
 
     async def query_fn(self, lla: LLA):
         return await self.query(lla.lon, lla.lat)
     
+    def counters(self) -> Dict[str, int]:
+        """命中/未命中/合并/上游错误计数（同步读取，供指标采集）"""
+        return {
+            "hit": self._hit_count,
+            "miss": self._miss_count,
+            "coalesced": self._coalesced_count,
+            "error": self._error_count,
+        }
+
     def get_cache_stats(self):
         """获取缓存统计信息（用于监控）"""
         async def _get_stats():
             async with self._cache_lock:
                 total = self._hit_count + self._miss_count
                 hit_rate = self._hit_count / total if total > 0 else 0.0
+                self._cache.expire()
                 return {
                     "cache_size": len(self._cache),
+                    "cache_bytes": self._cache.currsize,
+                    "cache_max_bytes": self._cache.maxsize,
+                    "evictions": self._cache.evictions,
+                    "oversize_skipped": self._oversize_count,
                     "hit_count": self._hit_count,
                     "miss_count": self._miss_count,
+                    "coalesced_count": self._coalesced_count,
+                    "error_count": self._error_count,
+                    "inflight": len(self._inflight),
                     "hit_rate": hit_rate
                 }
         return _get_stats()
@@ -149,13 +323,7 @@ def query_func(lon, lat, size = 3):
     server = "http://192.168.3.12:5555/"
     request = server + f"free/tinder/v3/box2/query?lon={lon}&lat={lat}&size={size}"
     response = requests.get(request)
-    data =response.content
-    parse_data = json.loads(data)
-    data = parse_data['data']
-    if data:
-        lla_data = [LLA(x['lon'], x['lat'], x['alt']) for x in data]
-        return lla_data
-    return None
+    return parse_elevation(response.content)
 
 
 def query_fn(lla:LLA):
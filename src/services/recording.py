@@ -0,0 +1,216 @@
+"""
+流量录制与回放：
+- TrafficRecorder：把每个 /path-planning 请求（参数、耗时、结果摘要）追加写入按大小轮转的 JSONL；
+  可选地把上游返回的高程瓦片按缓存键写入快照文件（每次上游取数时由后台线程写入，内容未变不重复写，同样按大小轮转）
+- RecordedQueryHelper：以瓦片快照代替上游高程服务的 AsyncQueryHelper，供回放工具离线重放录制的流量
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, List, Tuple, Iterator
+from src.core.grid import LLABuffer
+from src.services.query import AsyncQueryHelper
+
+TileKey = Tuple[float, float, int]
+
+
+def route_digest(path: List[dict]) -> Optional[str]:
+    """路径点坐标（保留 7 位小数）的摘要，用于比对回放前后路线是否一致"""
+    if not path:
+        return None
+    coords = [[round(p["lon"], 7), round(p["lat"], 7)] for p in path]
+    return hashlib.sha1(json.dumps(coords, separators=(",", ":")).encode()).hexdigest()[:16]
+
+
+def route_summary(response: dict) -> Dict:
+    """规划响应的摘要：状态、错误码、路径点数与摘要、是否来自路线缓存 / 代价场"""
+    path = response.get("path") or []
+    return {
+        "status": response.get("status"),
+        "error": response.get("error"),
+        "points": len(path),
+        "digest": route_digest(path),
+        "cached": bool(response.get("cached")),
+        "flow_field": bool(response.get("flow_field")),
+    }
+
+
+def log_files(path: str) -> List[str]:
+    """录制文件及其轮转备份，按时间从旧到新排列（path.N, ..., path.1, path）"""
+    backups = []
+    n = 1
+    while os.path.exists(f"{path}.{n}"):
+        backups.append(f"{path}.{n}")
+        n += 1
+    files = backups[::-1]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """按时间顺序读取录制的请求（含轮转备份），跳过损坏的行"""
+    for name in log_files(path):
+        with open(name, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+class TrafficRecorder:
+    """
+    请求录制：每行一个 JSON 对象，超过 max_bytes 时轮转（保留 backups 份，同 logging 的 RotatingFileHandler）。
+    tiles_path 非空时同时记录瓦片快照：record_tile 只把瓦片放入有界队列（满则丢弃并计数），
+    序列化与写文件在后台线程完成，不阻塞事件循环；快照文件超过 tiles_max_bytes（默认同 max_bytes）时同样轮转，
+    轮转后清空内容摘要，仍在使用的瓦片再次取数时重新写入新文件。回放时同一键以最后写入的为准。
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, backups: int = 5,
+                 tiles_path: Optional[str] = None, tiles_max_bytes: Optional[int] = None,
+                 max_tile_digests: int = 65536, tile_queue: int = 1024):
+        self.path = path
+        self.tiles_path = tiles_path
+        for p in (path, tiles_path):
+            if p and os.path.dirname(p):
+                os.makedirs(os.path.dirname(p), exist_ok=True)
+        self._handler, self._logger = self._rotating_logger(path, max_bytes, backups)
+        # 键 -> 最后写入内容的摘要（LRU，至多 max_tile_digests 个；淘汰后重复取数只会多写一行）
+        self._tile_digests: 'OrderedDict[TileKey, str]' = OrderedDict()
+        self.max_tile_digests = max_tile_digests
+        self._tile_queue: 'queue.Queue' = queue.Queue(maxsize=tile_queue)
+        self._tile_thread: Optional[threading.Thread] = None
+        if tiles_path:
+            self._tile_handler, self._tile_logger = self._rotating_logger(
+                tiles_path, max_bytes if tiles_max_bytes is None else tiles_max_bytes, backups)
+            self._tile_thread = threading.Thread(target=self._tile_writer, name="tile-recorder", daemon=True)
+            self._tile_thread.start()
+        self.records = 0
+        self.tiles = 0
+        self.tiles_dropped = 0
+
+    @staticmethod
+    def _rotating_logger(path: str, max_bytes: int, backups: int):
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                       encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger = logging.Logger(f"recording.{path}")
+        logger.propagate = False
+        logger.addHandler(handler)
+        return handler, logger
+
+    def record(self, endpoint: str, params: Dict, duration_s: float, response: Optional[dict] = None,
+               status: Optional[str] = None):
+        entry = {"ts": round(time.time(), 6), "endpoint": endpoint, "params": params,
+                 "duration_ms": round(duration_s * 1000, 3)}
+        if response is not None:
+            entry["result"] = route_summary(response)
+        else:
+            entry["result"] = {"status": status}
+        self._logger.info(json.dumps(entry, ensure_ascii=False))
+        self.records += 1
+
+    def record_tile(self, key: TileKey, result: Optional[LLABuffer], precision: float):
+        """AsyncQueryHelper.on_fetch 回调：只入队，由后台线程写入；队列已满时丢弃并计入 tiles_dropped"""
+        if self._tile_thread is None:
+            return
+        try:
+            self._tile_queue.put_nowait((key, result, precision))
+        except queue.Full:
+            self.tiles_dropped += 1
+
+    def _tile_writer(self):
+        while True:
+            item = self._tile_queue.get()
+            try:
+                if item is None:
+                    return
+                self._write_tile(*item)
+            except Exception as e:
+                logging.error(f"[Recording] 瓦片写入失败: {e}")
+            finally:
+                self._tile_queue.task_done()
+
+    def _write_tile(self, key: TileKey, result: Optional[LLABuffer], precision: float):
+        """瓦片内容与上次写入的不同才追加一行"""
+        data = result.to_records() if result else []
+        body = json.dumps(data, separators=(",", ":"))
+        digest = hashlib.sha1(body.encode()).hexdigest()
+        if self._tile_digests.get(key) == digest:
+            self._tile_digests.move_to_end(key)
+            return
+        line = f'{{"key":{json.dumps(list(key))},"precision":{precision},"data":{body}}}'
+        record = self._tile_logger.makeRecord(self._tile_logger.name, logging.INFO, "", 0, line, None, None)
+        if self._tile_handler.shouldRollover(record):
+            # 旧文件将被轮转（最终删除）：忘掉已写入的摘要，后续取数重新写入
+            self._tile_digests.clear()
+        self._tile_logger.handle(record)
+        self._tile_digests[key] = digest
+        self._tile_digests.move_to_end(key)
+        while len(self._tile_digests) > self.max_tile_digests:
+            self._tile_digests.popitem(last=False)
+        self.tiles += 1
+
+    def flush(self):
+        """等待已入队的瓦片全部写入"""
+        if self._tile_thread is not None:
+            self._tile_queue.join()
+
+    def stats(self) -> Dict:
+        return {"path": self.path, "tiles_path": self.tiles_path, "records": self.records, "tiles": self.tiles,
+                "tiles_pending": self._tile_queue.qsize(), "tiles_dropped": self.tiles_dropped}
+
+    def close(self):
+        if self._tile_thread is not None:
+            self._tile_queue.put(None)
+            self._tile_thread.join()
+            self._tile_thread = None
+            self._tile_handler.close()
+        self._handler.close()
+
+
+def load_tiles(path: str) -> Tuple[Dict[TileKey, Optional[LLABuffer]], Optional[float]]:
+    """读取瓦片快照（含轮转备份，从旧到新），返回 {缓存键: LLABuffer 或 None（空结果）} 与录制时的缓存精度"""
+    tiles: Dict[TileKey, Optional[LLABuffer]] = {}
+    precision = None
+    for name in log_files(path):
+        with open(name, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue
+                lon, lat, size = item["key"]
+                tiles[(lon, lat, int(size))] = LLABuffer.from_records(item["data"]) if item["data"] else None
+                precision = item.get("precision", precision)
+    return tiles, precision
+
+
+class RecordedQueryHelper(AsyncQueryHelper):
+    """
+    以录制的瓦片快照代替上游的 AsyncQueryHelper（缓存、并发合并逻辑不变）；
+    快照中缺失的键按空结果处理并计入 missing_tiles。latency 为模拟的上游延迟（秒）。
+    """
+
+    def __init__(self, tiles: Dict[TileKey, Optional[LLABuffer]], latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.tiles = tiles
+        self.latency = latency
+        self.missing_tiles = 0
+
+    async def _fetch(self, lon: float, lat: float, size: int = 3) -> Optional[LLABuffer]:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        key = self._make_cache_key(lon, lat, size)
+        if key not in self.tiles:
+            self.missing_tiles += 1
+            return None
+        return self.tiles[key]
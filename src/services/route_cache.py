@@ -0,0 +1,120 @@
+import asyncio
+from typing import Optional, Dict, Tuple, Callable, Awaitable, Any
+from cachetools import TTLCache
+
+
+class RouteCache:
+    """
+    路线级缓存：键为起点/终点按 precision（度）对齐后的格子 + 障碍阈值 alt。
+    每条缓存路线记录其依赖的高程瓦片（缓存键 -> 版本号），
+    任一瓦片过期或被重新查询（版本变化）时该路线失效。
+    相同键的并发规划请求合并为一次计算（只共享成功的结果）。
+    """
+
+    def __init__(self, precision: float = 0.0005, max_entries: int = 10000, ttl: float = 300):
+        self.precision = precision
+        self._cache = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.invalidated = 0
+
+    def make_key(self, lon1: float, lat1: float, lon2: float, lat2: float, alt: float) -> Tuple:
+        p = self.precision
+        return (round(lon1 / p), round(lat1 / p), round(lon2 / p), round(lat2 / p), float(alt))
+
+    def get(self, key: Tuple, tile_version: Callable[[Any], Optional[int]]) -> Optional[dict]:
+        """命中且依赖瓦片均未变化时返回缓存的响应，否则返回 None（失效条目同时删除）"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        response, deps = entry
+        for tile_key, version in deps.items():
+            if tile_version(tile_key) != version:
+                self._cache.pop(key, None)
+                self.invalidated += 1
+                return None
+        self.hits += 1
+        return response
+
+    def put(self, key: Tuple, response: dict, deps: Dict[Any, int]):
+        try:
+            self._cache[key] = (response, deps)
+        except ValueError:
+            # max_entries=0 时关闭缓存
+            pass
+
+    async def get_or_compute(
+        self,
+        key: Tuple,
+        tile_version: Callable[[Any], Optional[int]],
+        compute: Callable[[], Awaitable[Tuple[dict, Optional[Dict[Any, int]]]]]
+    ) -> Tuple[dict, str]:
+        """
+        返回 (响应, 来源)，来源为 hit / coalesced / miss。
+        compute 返回 (响应, 依赖瓦片版本)；依赖为 None 表示结果不可缓存（如规划失败）。
+        只有成功的响应会分给合并等待的请求；计算失败、抛出异常（如准入拒绝）或被取消时，
+        等待者各自用自己的 compute（即自己的截止时间）重试，其中一个成为新的计算者。
+        """
+        while True:
+            cached = self.get(key, tile_version)
+            if cached is not None:
+                return cached, "hit"
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            response = await asyncio.shield(pending)
+            if response is not None:
+                self.coalesced += 1
+                return response, "coalesced"
+            self.retried += 1
+
+        self.misses += 1
+        pending = asyncio.get_running_loop().create_future()
+        self._inflight[key] = pending
+        shared = None
+        try:
+            response, deps = await compute()
+            if deps is not None:
+                self.put(key, response, deps)
+            if response.get("status") == "success":
+                shared = response
+            return response, "miss"
+        finally:
+            self._inflight.pop(key, None)
+            # None 表示没有可共享的结果，等待者重试
+            pending.set_result(shared)
+
+    def stats(self) -> Dict:
+        self._cache.expire()
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._cache),
+            "max_entries": self._cache.maxsize,
+            "precision": self.precision,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "invalidated": self.invalidated,
+            "inflight": len(self._inflight),
+            "hit_rate": (self.hits + self.coalesced) / total if total else 0.0,
+        }
+
+
+def respond_for_request(response: dict, lon1: float, lat1: float, lon2: float, lat2: float) -> dict:
+    """
+    将缓存的成功响应改写为当前请求的精确起终点（缓存键按格子对齐，起终点可能与缓存时略有差异），
+    中间路径点直接复用，不做拷贝。
+    """
+    if response.get("status") != "success":
+        return response
+    origin = {**response["origin"], "lon": lon1, "lat": lat1}
+    target = {**response["target"], "lon": lon2, "lat": lat2}
+    path = response["path"]
+    first = {**path[0], "lon": lon1, "lat": lat1}
+    last = {**path[-1], "lon": lon2, "lat": lat2}
+    return {**response, "origin": origin, "target": target, "path": [first] + path[1:-1] + [last]}
@@ -1,16 +1,20 @@
-from typing import List
-from src.core.grid import LLA
+from typing import List, Union
+from src.core.grid import LLA, LLABuffer
 from .maze import Maze
+from .terrain import Terrain
 
 
-def query_area(lon: float, lat: float, maze: Maze, range_blocks: int = 3) -> List[LLA]:
+def query_area(lon: float, lat: float, maze: Union[Maze, Terrain], range_blocks: int = 3) -> Union[List[LLA], LLABuffer]:
     """
     返回以查询点所在块为中心的 range_blocks × range_blocks 块（一维数组）。
     每块包含 block_size × block_size 点。
     排序：从左到右，从下到上。
     range_blocks 必须是奇数，如 3、5、7
+    maze 为 Terrain 时直接切片返回 LLABuffer（O(窗口)，不排序）。
     """
     assert range_blocks % 2 == 1, "range_blocks 必须为奇数"
+    if isinstance(maze, Terrain):
+        return maze.window(lon, lat, range_blocks)
 
     block_size = 2
     num_blocks_x = maze.num_lon // block_size
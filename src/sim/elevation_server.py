@@ -0,0 +1,175 @@
+"""
+上游高程服务（box2）的本地替身，用于离线联调与压测：
+- GET /free/tinder/v3/box2/query?lon&lat&size：返回与上游相同结构的 {"code": 0, "data": [{"lon", "lat", "alt"}, ...]}，
+  数据为查询点周围 range_blocks × range_blocks 块（query_area），size 仅为接口兼容，不影响返回范围
+- 地形：DFS 迷宫（maze）、随机障碍场（field）、NumPy 生成的大规模地形（fractal / obstacles / perfect-maze，
+  见 src.sim.terrain），或高程文件（.npy 内存映射 / .json，altitude[i][j] 中 i 为纬度下标）
+- 故障注入：固定延迟 + 随机抖动、按比例返回 HTTP 500 / 空结果 / 超时（挂起 hang_s 秒）
+- GET /stats：调用计数（供压测统计上游调用次数）；POST /admin/faults：运行中调整故障参数
+
+    python -m src.sim.elevation_server --port 5555 --terrain field --size 400 --latency 0.01 --error-rate 0.01
+    python -m src.sim.elevation_server --port 5555 --terrain fractal --size 10000 --water 0.6
+    QUERY_HOST=127.0.0.1 QUERY_PORT=5555 python -m src.services.http_service
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, Optional, Union
+from fastapi import FastAPI, Query
+from fastapi.responses import Response, JSONResponse
+import uvicorn
+from src.core.grid import LLABuffer
+from .maze import Maze, obstacle_field
+from .area_query import query_area
+from . import terrain as terrain_gen
+from .terrain import Terrain
+
+DEFAULT_REQUEST = "free/tinder/v3/box2/query"
+
+
+class FaultConfig:
+    """注入的上游延迟与故障比例（各比例独立抽样，依次判定 error -> timeout -> empty）"""
+
+    FIELDS = ("latency", "jitter", "error_rate", "empty_rate", "timeout_rate", "hang_s")
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 empty_rate: float = 0.0, timeout_rate: float = 0.0, hang_s: float = 30.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.empty_rate = empty_rate
+        self.timeout_rate = timeout_rate
+        self.hang_s = hang_s
+
+    def update(self, **values):
+        for k, v in values.items():
+            if k in self.FIELDS and v is not None:
+                setattr(self, k, float(v))
+
+    def to_dict(self) -> Dict[str, float]:
+        return {k: getattr(self, k) for k in self.FIELDS}
+
+
+TERRAIN_KINDS = ["field", "maze", "fractal", "obstacles", "perfect-maze"]
+
+
+def build_terrain(kind: str = "field", size: int = 200, step: float = 0.001, density: float = 0.15,
+                  seed: int = 0, path: Optional[str] = None, water: float = 0.6) -> Union[Maze, Terrain]:
+    """按参数构建仿真地形；压测端用相同参数即可得到同一地形来挑选起终点"""
+    if path:
+        return Terrain.load(path, step)
+    if kind == "fractal":
+        return terrain_gen.fractal(size, size, step, seed, water=water)
+    if kind == "obstacles":
+        return terrain_gen.obstacles(size, size, step, density, seed)
+    if kind == "perfect-maze":
+        return terrain_gen.maze(size, size, step, seed)
+    if kind == "maze":
+        state = random.getstate()
+        random.seed(seed)
+        try:
+            return Maze(size, size, step)
+        finally:
+            random.setstate(state)
+    return obstacle_field(size, size, step, density, seed)
+
+
+def create_app(maze: Union[Maze, Terrain], range_blocks: int = 5, request_path: str = DEFAULT_REQUEST,
+               faults: Optional[FaultConfig] = None, seed: Optional[int] = None) -> FastAPI:
+    faults = faults or FaultConfig()
+    rng = random.Random(seed)
+    stats = {"calls": 0, "ok": 0, "errors": 0, "timeouts": 0, "empty": 0, "points": 0, "busy_s": 0.0}
+    app = FastAPI(title="Elevation Service Stand-in", version="1.0.0")
+    app.state.maze = maze
+    app.state.faults = faults
+    app.state.stats = stats
+
+    @app.get("/" + request_path.strip("/"))
+    async def query(lon: float = Query(...), lat: float = Query(...), size: int = Query(3)):
+        stats["calls"] += 1
+        delay = faults.latency + (rng.uniform(0, faults.jitter) if faults.jitter > 0 else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if rng.random() < faults.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(status_code=500, content={"code": 500, "msg": "injected error"})
+        if rng.random() < faults.timeout_rate:
+            stats["timeouts"] += 1
+            await asyncio.sleep(faults.hang_s)
+        t0 = time.perf_counter()
+        if rng.random() < faults.empty_rate:
+            stats["empty"] += 1
+            data = []
+        else:
+            area = query_area(lon, lat, maze, range_blocks)
+            if isinstance(area, LLABuffer):
+                data = area.to_records()
+            else:
+                data = [{"lon": p.lon, "lat": p.lat, "alt": p.alt} for p in area]
+        body = json.dumps({"code": 0, "data": data})
+        stats["busy_s"] += time.perf_counter() - t0
+        stats["ok"] += 1
+        stats["points"] += len(data)
+        return Response(body, media_type="application/json")
+
+    @app.get("/stats")
+    async def get_stats(reset: bool = Query(False)):
+        snapshot = {**stats, "busy_s": round(stats["busy_s"], 6), "faults": faults.to_dict(),
+                    "terrain": {"num_lon": maze.num_lon, "num_lat": maze.num_lat, "step": maze.step,
+                                "range_blocks": range_blocks}}
+        if reset:
+            for k in stats:
+                stats[k] = 0.0 if k == "busy_s" else 0
+        return snapshot
+
+    @app.post("/admin/faults")
+    async def set_faults(
+            latency: Optional[float] = Query(None, ge=0), jitter: Optional[float] = Query(None, ge=0),
+            error_rate: Optional[float] = Query(None, ge=0, le=1), empty_rate: Optional[float] = Query(None, ge=0, le=1),
+            timeout_rate: Optional[float] = Query(None, ge=0, le=1), hang_s: Optional[float] = Query(None, ge=0)
+    ):
+        faults.update(latency=latency, jitter=jitter, error_rate=error_rate, empty_rate=empty_rate,
+                      timeout_rate=timeout_rate, hang_s=hang_s)
+        return faults.to_dict()
+
+    return app
+
+
+def add_terrain_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--terrain", choices=TERRAIN_KINDS, default="field", help="仿真地形类型")
+    parser.add_argument("--terrain-file", default=None, help="高程文件（.npy / .json），指定后忽略 --terrain")
+    parser.add_argument("--size", type=int, default=200, help="仿真地形边长（格）")
+    parser.add_argument("--step", type=float, default=0.001, help="格距（度）")
+    parser.add_argument("--density", type=float, default=0.15, help="随机障碍场的障碍比例")
+    parser.add_argument("--water", type=float, default=0.6, help="fractal 地形中可通行（alt <= 0）的比例")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def terrain_from_args(args) -> Union[Maze, Terrain]:
+    return build_terrain(args.terrain, args.size, args.step, args.density, args.seed, args.terrain_file, args.water)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--request", default=DEFAULT_REQUEST, help="查询路径（与 QUERY_REQUEST 一致）")
+    parser.add_argument("--range-blocks", type=int, default=21, help="每次返回的块数（奇数，每块 2×2 点）")
+    add_terrain_args(parser)
+    parser.add_argument("--latency", type=float, default=0.0, help="固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外的 [0, jitter) 均匀随机延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 HTTP 500 的比例")
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="返回空 data 的比例")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="挂起 --hang-s 秒再返回的比例")
+    parser.add_argument("--hang-s", type=float, default=30.0)
+    args = parser.parse_args()
+
+    faults = FaultConfig(args.latency, args.jitter, args.error_rate, args.empty_rate, args.timeout_rate, args.hang_s)
+    app = create_app(terrain_from_args(args), args.range_blocks, args.request, faults, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
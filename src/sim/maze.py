@@ -92,4 +92,19 @@ class Maze:
         print()
 
 
-
+def obstacle_field(num_lon: int, num_lat: int, step: float, density: float = 0.2, seed: int = 0) -> Maze:
+    """随机障碍地形（复用 Maze 的数据结构与 query_area），边界一圈保持可通行"""
+    maze = Maze(4, 4, step)
+    rng = random.Random(seed)
+    maze.num_lon, maze.num_lat = num_lon, num_lat
+    maze.grid = [
+        [1 if 0 < i < num_lat - 1 and 0 < j < num_lon - 1 and rng.random() < density else 0
+         for j in range(num_lon)]
+        for i in range(num_lat)
+    ]
+    maze.start = (1, 1)
+    maze.end = (num_lon - 2, num_lat - 2)
+    for x, y in (maze.start, maze.end):
+        maze.grid[y][x] = 0
+    maze.lla_grid = maze._to_lla()
+    return maze
@@ -0,0 +1,31 @@
+import asyncio
+from typing import Optional, List, Union
+from src.core.grid import LLA, LLABuffer
+from src.services.query import AsyncQueryHelper
+from .maze import Maze
+from .terrain import Terrain
+from .area_query import query_area
+
+
+class SimQueryHelper(AsyncQueryHelper):
+    """
+    以 Maze / Terrain 仿真地形代替上游高程服务的 AsyncQueryHelper（缓存、并发合并等逻辑保持不变），
+    用于离线测试与基准测试。latency 为模拟的上游延迟（秒）。
+    """
+
+    def __init__(self, maze: Union[Maze, Terrain], range_blocks: int = 5, latency: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.maze = maze
+        self.range_blocks = range_blocks
+        self.latency = latency
+        self.fetch_count = 0
+
+    async def _fetch(self, lon: float, lat: float, size: int = 3) -> Optional[LLABuffer]:
+        self.fetch_count += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        # 与真实上游解析结果一致，返回列式 LLABuffer
+        data = query_area(lon, lat, self.maze, self.range_blocks)
+        if not len(data):
+            return None
+        return data if isinstance(data, LLABuffer) else LLABuffer.from_llas(data)
@@ -0,0 +1,180 @@
+"""
+基于 NumPy 的可复现仿真地形：高程栅格 altitude[i, j]（i 为纬度下标、j 为经度下标，float32），
+格点坐标为 (j * step, i * step)，与 Maze 相同。生成均由 seed 决定，可扩展到 10k×10k：
+- fractal: 分形高程（多倍频值噪声 fBm），按 water 比例定海平面，alt <= 0 为可通行水域
+- maze: 二叉树算法挖出的完美迷宫（全向量化；通道偏向北/东，规模大时远快于 DFS）
+- obstacles: 指定密度的随机障碍场，边界一圈保持可通行
+
+障碍/通行取值与 Maze 一致（障碍 1.0，可通行 -5.0），规划阈值 alt=0 即可。
+window() 直接按块切片返回列式 LLABuffer，耗时与窗口大小成正比，无需逐点排序。
+"""
+import json
+from typing import Optional, Tuple
+import numpy as np
+from src.core.grid import LLABuffer
+
+OBSTACLE_ALT = 1.0
+FREE_ALT = -5.0
+
+
+class Terrain:
+    def __init__(self, altitude: np.ndarray, step: float):
+        self.altitude = altitude
+        self.step = step
+
+    @property
+    def num_lat(self) -> int:
+        return self.altitude.shape[0]
+
+    @property
+    def num_lon(self) -> int:
+        return self.altitude.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.altitude.nbytes
+
+    def moveable(self, pos: Tuple[int, int], thred: float = 0.0) -> bool:
+        x, y = pos
+        return 0 <= x < self.num_lon and 0 <= y < self.num_lat and self.altitude[y, x] <= thred
+
+    def window(self, lon: float, lat: float, range_blocks: int = 3, block_size: int = 2) -> LLABuffer:
+        """
+        以查询点所在块为中心的 range_blocks × range_blocks 块（块的选取与边界收缩同 query_area），
+        按经度、纬度升序排列（经度为外层）。
+        """
+        assert range_blocks % 2 == 1, "range_blocks 必须为奇数"
+        half = range_blocks // 2
+        num_blocks_x = self.num_lon // block_size
+        num_blocks_y = self.num_lat // block_size
+        block_x = max(half, min(num_blocks_x - 1 - half, int(lon / (block_size * self.step))))
+        block_y = max(half, min(num_blocks_y - 1 - half, int(lat / (block_size * self.step))))
+        x0, x1 = max(0, (block_x - half) * block_size), min(self.num_lon, (block_x + half + 1) * block_size)
+        y0, y1 = max(0, (block_y - half) * block_size), min(self.num_lat, (block_y + half + 1) * block_size)
+        if x0 >= x1 or y0 >= y1:
+            return LLABuffer.empty()
+        xs = np.arange(x0, x1) * self.step
+        ys = np.arange(y0, y1) * self.step
+        alt = np.asarray(self.altitude[y0:y1, x0:x1], dtype=np.float64).T.ravel()
+        return LLABuffer(np.repeat(xs, len(ys)), np.tile(ys, len(xs)), alt)
+
+    @classmethod
+    def from_maze(cls, maze) -> 'Terrain':
+        """由 Maze（lla_grid）构建，用于与原 query_area 对照"""
+        altitude = np.array([[p.alt for p in row] for row in maze.lla_grid], dtype=np.float32)
+        return cls(altitude, maze.step)
+
+    def save(self, path: str):
+        """保存为 .npy（高程数组）；格距需在加载时另行给出"""
+        np.save(path, self.altitude)
+
+    @classmethod
+    def load(cls, path: str, step: float, mmap: bool = True) -> 'Terrain':
+        """
+        加载 .npy（默认内存映射，大地形无需整体读入）或 .json
+        （二维数组，或含 altitude / step 字段的对象）
+        """
+        if path.endswith(".npy"):
+            return cls(np.load(path, mmap_mode="r" if mmap else None), step)
+        with open(path, encoding="utf-8") as f:
+            content = json.load(f)
+        if isinstance(content, dict):
+            return cls(np.asarray(content["altitude"], dtype=np.float32), content.get("step", step))
+        return cls(np.asarray(content, dtype=np.float32), step)
+
+
+def _smooth(t: np.ndarray) -> np.ndarray:
+    return t * t * (3 - 2 * t)
+
+
+def _interp_axis(n: int, cell: float):
+    """第 k 个格点在格网轴上的左格点下标与平滑插值权重"""
+    u = np.arange(n, dtype=np.float64) / cell
+    k0 = np.floor(u).astype(np.int64)
+    return k0, _smooth(u - k0).astype(np.float32)
+
+
+def fbm(num_lon: int, num_lat: int, seed: int = 0, octaves: int = 6, feature_cells: Optional[float] = None,
+        persistence: float = 0.5, chunk_rows: int = 512) -> np.ndarray:
+    """
+    多倍频值噪声：每个倍频在随机格网上做平滑双线性插值（先沿经度、再沿纬度，按行分块），
+    倍频间格网尺寸减半、振幅乘以 persistence。feature_cells 为最低倍频的格网尺寸（格），默认边长的 1/4。
+    只分配输出数组与每块的临时数组，内存约为 4 字节/格。
+    """
+    rng = np.random.default_rng(seed)
+    out = np.zeros((num_lat, num_lon), dtype=np.float32)
+    cell = float(feature_cells or max(2.0, max(num_lon, num_lat) / 4))
+    amp = 1.0
+    for _ in range(octaves):
+        if cell < 1.0:
+            break
+        lattice = rng.uniform(-1, 1, (int(num_lat / cell) + 2, int(num_lon / cell) + 2)).astype(np.float32)
+        x0, tx = _interp_axis(num_lon, cell)
+        y0, ty = _interp_axis(num_lat, cell)
+        for r0 in range(0, num_lat, chunk_rows):
+            r1 = min(num_lat, r0 + chunk_rows)
+            k0, k1 = y0[r0], y0[r1 - 1] + 2
+            rows = lattice[k0:k1]
+            lx = rows[:, x0] * (1 - tx) + rows[:, x0 + 1] * tx
+            local = y0[r0:r1] - k0
+            s = ty[r0:r1, None]
+            out[r0:r1] += amp * (lx[local] * (1 - s) + lx[local + 1] * s)
+        cell /= 2
+        amp *= persistence
+    return out
+
+
+def fractal(num_lon: int, num_lat: int, step: float, seed: int = 0, water: float = 0.6, relief: float = 50.0,
+            **fbm_kwargs) -> Terrain:
+    """
+    分形高程：fBm 噪声平移使约 water 比例的格子不高于 0（海平面取抽样分位数），再缩放到约 ±relief 米。
+    """
+    noise = fbm(num_lon, num_lat, seed, **fbm_kwargs)
+    rng = np.random.default_rng(seed + 1)
+    sample = noise.ravel()[rng.integers(0, noise.size, min(noise.size, 1_000_000))]
+    level = np.float32(np.quantile(sample, water))
+    spread = np.float32(max(float(np.abs(sample - level).max()), 1e-6))
+    noise -= level
+    noise *= np.float32(relief) / spread
+    return Terrain(noise, step)
+
+
+def maze(num_lon: int, num_lat: int, step: float, seed: int = 0) -> Terrain:
+    """
+    二叉树算法的完美迷宫：奇数坐标为房间，每个房间随机打通北侧或东侧的墙（最北行只向东、最东列只向北），
+    任意两个房间之间有且只有一条通路。
+    """
+    rng = np.random.default_rng(seed)
+    walls = np.ones((num_lat, num_lon), dtype=bool)
+    ry = np.arange(1, num_lat - 1, 2)
+    rx = np.arange(1, num_lon - 1, 2)
+    if len(ry) and len(rx):
+        walls[np.ix_(ry, rx)] = False
+        north = rng.random((len(ry), len(rx))) < 0.5
+        # 能向北打通的房间（不在最北行）；最东列只能向北
+        can_north = (ry + 2 < num_lat - 1)[:, None] & np.ones(len(rx), dtype=bool)
+        can_east = np.ones(len(ry), dtype=bool)[:, None] & (rx + 2 < num_lon - 1)[None, :]
+        go_north = can_north & (north | ~can_east)
+        go_east = can_east & ~go_north
+        iy, ix = np.nonzero(go_north)
+        walls[ry[iy] + 1, rx[ix]] = False
+        iy, ix = np.nonzero(go_east)
+        walls[ry[iy], rx[ix] + 1] = False
+    return Terrain(np.where(walls, np.float32(OBSTACLE_ALT), np.float32(FREE_ALT)), step)
+
+
+def obstacles(num_lon: int, num_lat: int, step: float, density: float = 0.2, seed: int = 0,
+              chunk_rows: int = 1024) -> Terrain:
+    """随机障碍场（按行分块生成，避免 10k×10k 的 float64 临时数组），边界一圈保持可通行"""
+    rng = np.random.default_rng(seed)
+    altitude = np.empty((num_lat, num_lon), dtype=np.float32)
+    for r0 in range(0, num_lat, chunk_rows):
+        r1 = min(num_lat, r0 + chunk_rows)
+        hit = rng.random((r1 - r0, num_lon), dtype=np.float32) < density
+        altitude[r0:r1] = np.where(hit, np.float32(OBSTACLE_ALT), np.float32(FREE_ALT))
+    altitude[[0, -1], :] = FREE_ALT
+    altitude[:, [0, -1]] = FREE_ALT
+    return Terrain(altitude, step)
+
+
+GENERATORS = {"fractal": fractal, "maze": maze, "obstacles": obstacles}
@@ -0,0 +1,105 @@
+import asyncio
+import math
+import httpx
+from src.core.astar import AStar, DeadlineExceeded
+from src.core.grid import LLABuffer
+from src.services import http_service as hs
+from src.services.admission import AdmissionController, Overloaded
+from src.sim.area_query import query_area
+from src.sim.maze import obstacle_field
+
+
+def test_queue_full_and_timeout_shedding():
+    admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05, retry_after=2)
+
+    async def run():
+        reasons = []
+        async with admission.slot():
+            waiter = asyncio.ensure_future(admission.slot().__aenter__())
+            await asyncio.sleep(0)
+            assert admission.waiting == 1
+            try:
+                async with admission.slot():
+                    pass
+            except Overloaded as e:
+                reasons.append((e.reason, e.retry_after))
+            try:
+                await waiter
+            except Overloaded as e:
+                reasons.append((e.reason, e.retry_after))
+        # 截止时间早于排队超时：按截止时间拒绝
+        async with admission.slot():
+            try:
+                async with admission.slot(deadline=0.0):
+                    pass
+            except Overloaded as e:
+                reasons.append((e.reason, e.retry_after))
+        return reasons
+
+    assert asyncio.run(run()) == [("queue_full", 2), ("queue_timeout", 2), ("queue_timeout", 2)]
+    stats = admission.stats()
+    assert (stats["admitted"], stats["shed_queue_full"], stats["shed_timeout"]) == (2, 1, 2)
+    assert stats["running"] == stats["waiting"] == 0
+
+
+class ExpiringAStar(AStar):
+    """第 expire_at 次截止时间检查时超时"""
+    DEADLINE_CHECK_EVERY = 16
+    checks = 0
+    expire_at = 3
+
+    def check_deadline(self):
+        self.checks += 1
+        if self.checks >= self.expire_at:
+            raise DeadlineExceeded("规划超时")
+
+
+def test_deadline_exceeded_mid_search_restores_workspace():
+    maze = obstacle_field(60, 60, 0.001, 0.1, 4)
+    astar = ExpiringAStar(0.0)
+    astar.init(LLABuffer.from_llas(query_area(0.03, 0.03, maze, 59)))
+    astar.set_start_idx((1, 1))
+    astar.set_end_idx((astar.num_lon - 2, astar.num_lat - 2))
+    astar.deadline = math.inf
+    try:
+        astar.path_plan()
+        assert False, "应在搜索中途超时"
+    except DeadlineExceeded:
+        pass
+    assert astar.checks == 3
+    ws = astar.workspace
+    assert not ws.touched and not any(ws.closed) and all(g == math.inf for g in ws.g)
+    # 复用同一工作区的下一次搜索不受影响
+    astar.deadline = None
+    path, ok = astar.path_plan()
+    assert ok and path[0] == (1, 1)
+
+
+def test_planning_stats_counts_shed_requests():
+    saved = hs.planning_admission
+    hs.planning_admission = AdmissionController(max_concurrent=1, max_queue=0, retry_after=3)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=hs.app), base_url="http://test") as client:
+            params = {"lon1": 0.01, "lat1": 0.01, "lon2": 0.02, "lat2": 0.02, "debug": "trace"}
+            async with hs.planning_admission.slot():
+                shed = await client.get("/path-planning", params=params)
+            stats = (await client.get("/admin/planning-stats")).json()
+            return shed, stats
+
+    try:
+        shed, stats = asyncio.run(run())
+    finally:
+        hs.planning_admission = saved
+    assert shed.status_code == 503 and shed.headers["Retry-After"] == "3"
+    assert shed.json()["error"] == "overloaded" and shed.json()["reason"] == "queue_full"
+    assert (stats["admitted"], stats["shed_queue_full"], stats["shed_timeout"]) == (1, 1, 0)
+    assert stats["max_concurrent"] == 1 and stats["running"] == 0
+    assert set(stats["queue_time"]) == {"p50_ms", "p95_ms", "p99_ms"}
+
+
+if __name__ == "__main__":
+    test_queue_full_and_timeout_shedding()
+    test_deadline_exceeded_mid_search_restores_workspace()
+    test_planning_stats_counts_shed_requests()
+    print("ok")
@@ -0,0 +1,83 @@
+import asyncio
+import httpx
+from src.core.grid import LLABuffer
+from src.core.path_planner import GridCache, raster_nbytes
+from src.services import http_service as hs
+from src.services.admission import AdmissionController
+from src.services.route_cache import RouteCache
+from src.sim.maze import obstacle_field
+from src.sim.sim_query import SimQueryHelper
+
+PAIRS = [
+    {"lon1": 0.006, "lat1": 0.004, "lon2": 0.07, "lat2": 0.06},
+    {"lon1": 200.0, "lat1": 0.005, "lon2": 0.07, "lat2": 0.06},
+    {"lon1": 0.006, "lat1": 0.004, "lon2": 0.068, "lat2": 0.061},
+    {"lon1": 0.005, "lat1": 0.005, "lon2": 0.07, "lat2": 0.06},
+    {"lon1": 0.07, "lat1": 0.01, "lon2": 0.01, "lat2": 0.07},
+]
+
+
+def post_batch(body: dict, admission: AdmissionController, hold_slot: bool = False) -> dict:
+    """以仿真地形替换全局查询助手、关闭路线缓存后，进程内调用批量接口"""
+    saved = hs._global_query_helper, hs.route_cache, hs.planning_admission
+    hs._global_query_helper = SimQueryHelper(obstacle_field(80, 80, 0.001, 0.15, 2), range_blocks=15,
+                                             cache_precision=0.005)
+    hs.route_cache = RouteCache(max_entries=0)
+    hs.planning_admission = admission
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=hs.app), base_url="http://test") as client:
+            if not hold_slot:
+                return (await client.post("/path-planning/batch", json=body)).json()
+            async with admission.slot():
+                return (await client.post("/path-planning/batch", json=body)).json()
+
+    try:
+        return asyncio.run(run())
+    finally:
+        hs._global_query_helper, hs.route_cache, hs.planning_admission = saved
+
+
+def test_batch_keeps_input_order_and_reuses_grids():
+    admission = AdmissionController(2, 8)
+    resp = post_batch({"pairs": PAIRS, "workers": 2}, admission)
+    results = resp["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert [r["status"] for r in results] == ["success", "failed", "success", "failed", "success"]
+    assert [r.get("error") for r in results[1::2]] == ["invalid_parameters", "origin_blocked"]
+    for pair, r in zip(PAIRS, results):
+        if r["status"] == "success":
+            assert (r["origin"]["lon"], r["origin"]["lat"]) == (pair["lon1"], pair["lat1"])
+            assert (r["target"]["lon"], r["target"]["lat"]) == (pair["lon2"], pair["lat2"])
+    assert (resp["count"], resp["succeeded"], resp["failed"]) == (5, 3, 2)
+    # 第 0、2 对起点相同：后规划的一对直接复用已构建的起点栅格
+    assert resp["grid_reuse"]["hits"] >= 1 and resp["grid_reuse"]["bytes"] > 0
+    # 每个合法的对单独占用准入名额
+    assert admission.admitted == 4 and admission.running == 0
+
+
+def test_batch_pairs_shed_individually():
+    """准入名额被占满且不允许排队：每个合法的对各自返回 overloaded，整批仍为 200"""
+    resp = post_batch({"pairs": PAIRS, "workers": 4}, AdmissionController(1, 0), hold_slot=True)
+    errors = [r.get("error") for r in resp["results"]]
+    assert errors == ["overloaded", "invalid_parameters", "overloaded", "overloaded", "overloaded"]
+    assert resp["results"][0]["reason"] == "queue_full" and resp["succeeded"] == 0
+
+
+def test_grid_cache_byte_bound():
+    tiles = [LLABuffer.from_llas([]) for _ in range(4)]
+    raster = ({"num_lon": 10, "num_lat": 10}, [[0.0] * 10 for _ in range(10)])
+    cache = GridCache(max_bytes=raster_nbytes(raster) * 2)
+    for tile in tiles:
+        cache.put(tile, raster)
+    assert cache.stats()["entries"] == 2 and cache.evictions == 2
+    assert cache.get(tiles[0]) is None and cache.get(tiles[3]) is raster
+    cache.put(tiles[0], ({"num_lon": 100, "num_lat": 100}, []))
+    assert cache.get(tiles[0]) is None and cache.bytes == raster_nbytes(raster) * 2
+
+
+if __name__ == "__main__":
+    test_batch_keeps_input_order_and_reuses_grids()
+    test_batch_pairs_shed_individually()
+    test_grid_cache_byte_bound()
+    print("ok")
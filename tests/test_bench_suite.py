@@ -0,0 +1,25 @@
+from benchmarks.bench_suite import BENCHMARKS, compare, run_suite
+
+
+def test_suite_runs_all_benchmarks_offline():
+    """最小规模下每个基准都能跑通，A* 在各障碍密度下都能找到路径"""
+    results = run_suite(list(BENCHMARKS), [20], False, [0.0, 0.3], repeat=1, budget=0.0)
+    assert {k.split("/")[0] for k in results} == set(BENCHMARKS)
+    assert all(r["runs"] >= 1 and r["min_ms"] <= r["median_ms"] for r in results.values())
+    assert results["astar.path_plan/n=20/d=0.3"]["found"]
+    assert results["astar.straight_check/n=20/d=0.0"]["clear"] == 200
+
+
+def test_compare_flags_regressions_beyond_tolerance_and_noise():
+    baseline = {"a": {"min_ms": 10.0}, "b": {"min_ms": 10.0}, "c": {"min_ms": 0.1}, "d": {"min_ms": 10.0}}
+    results = {"a": {"min_ms": 14.0}, "b": {"min_ms": 11.0}, "c": {"min_ms": 0.2}, "d": {"min_ms": 5.0},
+               "e": {"min_ms": 1.0}}
+    report = compare(results, baseline, tolerance=0.25, noise_ms=0.2)
+    assert {k: r["status"] for k, r in report.items()} == {
+        "a": "regression", "b": "ok", "c": "ok", "d": "improvement", "e": "new"}
+
+
+if __name__ == "__main__":
+    test_suite_runs_all_benchmarks_offline()
+    test_compare_flags_regressions_beyond_tolerance_and_noise()
+    print("ok")
@@ -0,0 +1,43 @@
+import asyncio
+import httpx
+from src.services.query import parse_elevation
+from src.sim.area_query import query_area
+from src.sim.elevation_server import FaultConfig, build_terrain, create_app
+
+
+def test_standin_serves_query_area_and_injects_faults():
+    """替身返回与 query_area 一致、可被 parse_elevation 解析的响应；故障注入与调用计数生效"""
+    maze = build_terrain("field", 60, 0.001, 0.2, 1)
+    faults = FaultConfig()
+    app = create_app(maze, range_blocks=5, faults=faults, seed=0)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://up") as client:
+            params = {"lon": 0.03, "lat": 0.02, "size": 3}
+            resp = await client.get("/free/tinder/v3/box2/query", params=params)
+            buf = parse_elevation(resp.content)
+            expect = query_area(0.03, 0.02, maze, 5)
+            assert [(p.lon, p.lat, p.alt) for p in buf] == [(p.lon, p.lat, p.alt) for p in expect]
+
+            await client.post("/admin/faults", params={"error_rate": 1})
+            assert (await client.get("/free/tinder/v3/box2/query", params=params)).status_code == 500
+            await client.post("/admin/faults", params={"error_rate": 0, "empty_rate": 1})
+            resp = await client.get("/free/tinder/v3/box2/query", params=params)
+            assert parse_elevation(resp.content) is None
+            return (await client.get("/stats")).json()
+
+    stats = asyncio.run(run())
+    assert (stats["calls"], stats["ok"], stats["errors"], stats["empty"]) == (3, 2, 1, 1)
+    assert stats["terrain"]["num_lon"] == 60
+
+
+def test_maze_terrain_is_seeded():
+    a = build_terrain("maze", 31, 0.001, seed=7)
+    b = build_terrain("maze", 31, 0.001, seed=7)
+    assert a.grid == b.grid
+
+
+if __name__ == "__main__":
+    test_standin_serves_query_area_and_injects_faults()
+    test_maze_terrain_is_seeded()
+    print("ok")
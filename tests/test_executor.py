@@ -0,0 +1,98 @@
+import asyncio
+import os
+import threading
+from src.core.astar import AStar
+from src.core.executor import ComputeExecutor
+from src.core.grid import LLA, LLABuffer, pack_llas, unpack_llas
+from src.core.path_planner import PathPlan
+from src.sim.area_query import query_area
+from src.sim.maze import obstacle_field
+
+
+def test_modes_run_off_loop():
+    """inline 在事件循环线程执行，thread 在池线程执行，process 在子进程执行"""
+    async def run(executor):
+        return (await executor.run(threading.get_ident) if executor.mode != "process" else None,
+                await executor.run(os.getpid), await executor.run(pow, 2, 10))
+
+    for mode in ComputeExecutor.MODES:
+        executor = ComputeExecutor(mode, 1)
+        try:
+            ident, pid, value = asyncio.run(run(executor))
+        finally:
+            executor.shutdown()
+        assert value == 1024
+        assert (pid == os.getpid()) == (mode != "process")
+        if mode != "process":
+            assert (ident == threading.get_ident()) == (mode == "inline")
+        assert executor.submitted == {"inline": 0, "thread": 3, "process": 2}[mode]
+
+
+def test_pool_backlog_bounded_by_workers_plus_queue():
+    """池中（执行 + 排队）至多 max_workers + max_queue 个任务，其余在事件循环内等待"""
+    executor = ComputeExecutor("thread", 1, 1)
+    gate = threading.Event()
+
+    async def run():
+        tasks = [asyncio.ensure_future(executor.run(gate.wait, 5)) for _ in range(5)]
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+        in_pool = executor.submitted
+        gate.set()
+        await asyncio.gather(*tasks)
+        return in_pool
+
+    try:
+        assert asyncio.run(run()) == 2
+    finally:
+        gate.set()
+        executor.shutdown()
+    assert executor.submitted == 5
+
+
+def test_pack_and_header_round_trip():
+    llas = [LLA(121.0 + i * 1e-3, 25.0 - i * 2e-3, -float(i)) for i in range(7)]
+    packed = pack_llas(llas)
+    assert len(packed) == 21
+    assert [(p.lon, p.lat, p.alt) for p in unpack_llas(packed)] == [(p.lon, p.lat, p.alt) for p in llas]
+    buf = LLABuffer.from_llas(llas)
+    assert pack_llas(buf) is buf and unpack_llas(buf) is buf
+
+    maze = obstacle_field(30, 30, 0.001, 0.2, 2)
+    src = AStar(0.0)
+    src.init(LLABuffer.from_llas(query_area(0.015, 0.015, maze, 11)))
+    dst = AStar(0.0)
+    dst.apply_header(src.header())
+    dst.altitude = src.altitude
+    assert dst.header() == src.header()
+    probe = LLA(0.013, 0.017, 0)
+    assert dst.get_index(probe) == src.get_index(probe)
+    assert dst.index_to_lla((3, 4)) == src.index_to_lla((3, 4))
+
+
+def test_path_plan_pair_same_under_each_mode():
+    maze = obstacle_field(100, 100, 0.001, 0.15, 3)
+    query_fn = lambda lla: query_area(lla.lon, lla.lat, maze, 15)
+    ori, ter = LLA(0.005, 0.005, 0), LLA(0.09, 0.08, 0)
+
+    def plan(executor):
+        async def run():
+            return await PathPlan(query_fn, executor=executor).PathPlanPair(ori, ter, 0)
+        try:
+            path, ok = asyncio.run(run())
+        finally:
+            executor.shutdown()
+        return [(p.lon, p.lat, p.alt) for p in path], ok
+
+    expect = plan(ComputeExecutor("inline"))
+    assert expect[1] and len(expect[0]) > 2
+    assert plan(ComputeExecutor("thread", 2)) == expect
+    assert plan(ComputeExecutor("process", 1)) == expect
+
+
+if __name__ == "__main__":
+    test_modes_run_off_loop()
+    test_pool_backlog_bounded_by_workers_plus_queue()
+    test_pack_and_header_round_trip()
+    test_path_plan_pair_same_under_each_mode()
+    print("ok")
@@ -0,0 +1,56 @@
+import math
+import random
+from src.core.astar import AStar
+from src.core.path_planner import build_flow_field
+from src.services.flow_field_cache import FlowFieldCache
+from src.sim.area_query import query_area
+from src.sim.maze import obstacle_field
+
+
+def path_cost(astar, path):
+    return sum(astar.heuristic8d_idx(a, b) for a, b in zip(path, path[1:]))
+
+
+def test_gradient_path_is_shortest():
+    """沿代价场梯度得到的路径代价与 A* 最短路一致，不可达起点返回空"""
+    maze = obstacle_field(40, 40, 0.001, 0.25, 5)
+    data = query_area(0.02, 0.02, maze, 19)
+    field = build_flow_field(AStar(0), data, maze.lla_grid[20][20])
+    assert field is not None
+    astar = field.astar
+    rng = random.Random(0)
+    for _ in range(30):
+        start = (rng.randrange(astar.num_lon), rng.randrange(astar.num_lat))
+        path = astar.follow_field(field.costs, start)
+        if not astar.moveable(start) or field.costs[start[0] * astar.num_lat + start[1]] == math.inf:
+            assert path == []
+            continue
+        astar.start, astar.end = start, field.goal
+        expect, ok = astar.path_plan()
+        assert path[0] == start and path[-1] == field.goal
+        assert abs(path_cost(astar, path) - path_cost(astar, expect)) < 1e-9
+
+
+def test_cache_bounds_and_invalidation():
+    maze = obstacle_field(20, 20, 0.001, 0.0, 1)
+    data = query_area(0.01, 0.01, maze, 9)
+    field = build_flow_field(AStar(0), data, maze.lla_grid[10][10])
+    versions = {"tile": 1}
+    cache = FlowFieldCache(max_entries=2, max_bytes=field.nbytes * 10)
+    for i in range(3):
+        cache.put(("k", i), field, {"tile": 1})
+    assert cache.get(("k", 0), versions.get) is None and cache.evictions == 1
+    assert cache.get(("k", 2), versions.get) is field
+    versions["tile"] = 2
+    assert cache.get(("k", 2), versions.get) is None and cache.invalidated == 1
+
+    small = FlowFieldCache(max_entries=8, max_bytes=field.nbytes * 2)
+    for i in range(3):
+        small.put(("k", i), field, {})
+    assert len(small._fields) == 2 and small.bytes == field.nbytes * 2
+
+
+if __name__ == "__main__":
+    test_gradient_path_is_shortest()
+    test_cache_bounds_and_invalidation()
+    print("ok")
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import httpx
+from src.services import formats
+from src.services import http_service as hs
+
+
+def test_polyline_and_binary_roundtrip():
+    # Google 官方示例
+    coords = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert formats.encode_polyline(coords) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert formats.decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == coords
+
+    path = [{"lon": 121.5 + i * 1e-3, "lat": 25.3 - i * 1e-3, "alt": -5.0} for i in range(10)]
+    response = {"status": "success", "origin": {"lon": 121.5}, "path": path}
+    packed = formats.render_route(response, "binary", "f8")
+    assert formats.unpack_path(packed.body, "f8") == [(p["lon"], p["lat"], p["alt"]) for p in path]
+    assert json.loads(packed.headers["x-route-meta"]) == {"status": "success", "origin": {"lon": 121.5}}
+
+    failed = {"status": "failed", "error": "unreachable"}
+    assert json.loads(formats.render_route(failed, "binary").body) == failed
+    assert formats.negotiate_format(None, "application/x-msgpack;q=0.9, */*") == "msgpack"
+    assert formats.negotiate_format("polyline", "application/octet-stream") == "polyline"
+
+def test_msgpack_roundtrip():
+    """msgpack 为可选依赖：已安装时整个响应可还原，path 为打包的二进制数组"""
+    if formats.msgpack is None:
+        print("msgpack 未安装，跳过")
+        return
+    path = [{"lon": 121.5 + i * 1e-3, "lat": 25.3 - i * 1e-3, "alt": -5.0} for i in range(10)]
+    response = {"status": "success", "origin": {"lon": 121.5}, "path": path}
+    for dtype in ("f8", "f4"):
+        resp = formats.render_route(response, "msgpack", dtype)
+        assert resp.media_type == "application/msgpack"
+        body = formats.msgpack.unpackb(resp.body, raw=False)
+        assert body["status"] == "success" and body["origin"] == {"lon": 121.5} and body["path_dtype"] == dtype
+        points = formats.unpack_path(body["path"], dtype)
+        assert len(points) == len(path)
+        tol = 1e-9 if dtype == "f8" else 1e-4
+        assert all(abs(a - b) <= tol for p, q in zip(path, points) for a, b in zip((p["lon"], p["lat"], p["alt"]), q))
+
+
+def test_msgpack_unavailable_returns_406():
+    saved = formats.msgpack
+    formats.msgpack = None
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=hs.app), base_url="http://test") as client:
+            params = {"lon1": 0.01, "lat1": 0.01, "lon2": 0.02, "lat2": 0.02}
+            return await client.get("/path-planning", params=params, headers={"Accept": "application/msgpack"})
+
+    try:
+        resp = asyncio.run(run())
+    finally:
+        formats.msgpack = saved
+    assert resp.status_code == 406 and resp.json()["error"] == "unsupported_format"
+    assert "msgpack" not in resp.json()["supported"]
+
+
+if __name__ == "__main__":
+    test_polyline_and_binary_roundtrip()
+    test_msgpack_roundtrip()
+    test_msgpack_unavailable_returns_406()
+    print("ok")
@@ -0,0 +1,51 @@
+import json
+from src.core.grid import LLA, Grid, LLABuffer, nearest_lla
+from src.core.astar import AStar
+from src.core.path_planner import merge_trajectories_smart
+from src.services.query import parse_elevation
+from src.sim.area_query import query_area
+from src.sim.maze import obstacle_field
+
+
+def test_init_arrays_matches_init():
+    """规则方阵瓦片：列式解析 + 向量化建网格与 LLA 列表 + Grid.init 结果一致"""
+    maze = obstacle_field(60, 60, 0.001, 0.2, 1)
+    for lon, lat, blocks in [(0.03, 0.03, 11), (0.001, 0.001, 7), (0.05, 0.02, 29)]:
+        llas = query_area(lon, lat, maze, blocks)
+        payload = json.dumps({"data": [{"lon": p.lon, "lat": p.lat, "alt": p.alt} for p in llas]}).encode()
+        columns = parse_elevation(payload)
+        assert isinstance(columns, LLABuffer) and len(columns) == len(llas)
+
+        expect, got = Grid(), Grid()
+        assert expect.init(llas) and got.init(columns)
+        assert got.header() == expect.header()
+        assert got.altitude == expect.altitude
+        assert nearest_lla(columns, lon, lat) == nearest_lla(llas, lon, lat)
+
+    assert parse_elevation(b'{"data": []}') is None
+
+
+def test_search_and_merge_use_buffers():
+    """A* 搜索返回 LLABuffer；合并接受 LLABuffer 与 LLA 列表，结果一致"""
+    maze = obstacle_field(60, 60, 0.001, 0.2, 1)
+    astar = AStar(0)
+    assert astar.init(query_area(0.03, 0.03, maze, 31))
+    astar.set_start(LLA(0.02, 0.02, 0))
+    astar.set_end(LLA(0.04, 0.045, 0))
+    path, ok = astar.search()
+    assert ok and isinstance(path, LLABuffer) and len(path) > 2
+
+    mid = len(path) // 2
+    segments = [path[:mid + 1], path[mid:]]
+    got = merge_trajectories_smart(segments, gap_lon=astar.gap_lon, gap_lat=astar.gap_lat)
+    expect = merge_trajectories_smart([s.tolist() for s in segments], gap_lon=astar.gap_lon, gap_lat=astar.gap_lat)
+    assert isinstance(got, LLABuffer)
+    assert got.to_records() == expect.to_records()
+    assert got[0] == path[0]
+    assert len(merge_trajectories_smart([])) == 0
+
+
+if __name__ == "__main__":
+    test_init_arrays_matches_init()
+    test_search_and_merge_use_buffers()
+    print("ok")
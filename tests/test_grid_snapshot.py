@@ -0,0 +1,52 @@
+import os
+import tempfile
+import numpy as np
+from src.core.astar import AStar
+from src.core.grid import LLA, LLABuffer, component_labels
+from src.core.thresholds import connected
+from src.sim.area_query import query_area
+from src.sim.maze import obstacle_field
+
+
+def _tile_grid() -> AStar:
+    maze = obstacle_field(80, 80, 0.001, 0.25, 5)
+    astar = AStar(0.0)
+    astar.init(LLABuffer.from_llas(query_area(0.04, 0.04, maze, 21)))
+    return astar
+
+
+def test_snapshot_roundtrip_npz_and_mmap():
+    """npz 与目录（内存映射）快照加载后网格元信息、高程与 A* 结果均与原网格一致"""
+    src = _tile_grid()
+    src.set_start(LLA(0.001, 0.001, 0))
+    src.set_end(LLA(0.079, 0.079, 0))
+    expect = src.path_plan()
+    with tempfile.TemporaryDirectory() as d:
+        for path in (os.path.join(d, "tile.npz"), os.path.join(d, "tile")):
+            src.save_snapshot(path, obstacle=True, labels=True)
+            dst = AStar(0.0)
+            meta, layers = dst.load_snapshot(path)
+            assert dst.header() == src.header() and dst.altitude == src.altitude
+            assert meta["thred"] == 0.0 and sorted(layers) == ["altitude", "labels", "obstacle"]
+            if not path.endswith(".npz"):
+                assert isinstance(layers["altitude"], np.memmap)
+            assert np.array_equal(layers["obstacle"], np.asarray(src.altitude) > 0.0)
+            dst.start, dst.end = src.start, src.end
+            assert dst.path_plan() == expect
+
+
+def test_component_labels_match_connectivity():
+    rng = np.random.default_rng(1)
+    free = rng.random((30, 25)) > 0.45
+    labels = component_labels(free)
+    assert ((labels > 0) == free).all()
+    cells = list(zip(*np.nonzero(free)))
+    for _ in range(50):
+        a, b = (cells[i] for i in rng.integers(0, len(cells), 2))
+        assert (labels[a] == labels[b]) == connected(free, a, b)
+
+
+if __name__ == "__main__":
+    test_snapshot_roundtrip_npz_and_mmap()
+    test_component_labels_match_connectivity()
+    print("ok")
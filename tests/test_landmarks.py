@@ -0,0 +1,85 @@
+import math
+import os
+import tempfile
+import numpy as np
+from src.core.astar import AStar
+from src.core.landmarks import LandmarkTable, build_tables
+from src.core.workspace import WorkspacePool
+from benchmarks.bench_landmarks import build_astar, make_terrain, od_pairs, path_cost
+
+
+def heuristic_grid(h, astar) -> np.ndarray:
+    """逐格求启发式，扁平下标同 cost_field"""
+    return np.array([h(x, y) for x in range(astar.num_lon) for y in range(astar.num_lat)])
+
+
+def test_alt_is_admissible_and_keeps_optimal_cost():
+    """ALT 启发式不超过真实代价（cost_field），A* 路径代价与八向距离时一致，迷宫上扩展节点更少"""
+    astar = build_astar(make_terrain("maze", 61, 0))
+    table = LandmarkTable.build(astar, 6)
+    assert table.count == 6 and table.dist.dtype == np.float32
+    expanded = {"octile": 0, "alt": 0}
+    for start, end in od_pairs(astar, 10, 1):
+        truth = np.frombuffer(astar.cost_field(end), dtype=np.float64)
+        h = heuristic_grid(table.heuristic_to(astar, end), astar)
+        reachable = np.isfinite(truth)
+        assert (h[reachable] <= truth[reachable] + 1e-12).all()
+        astar.set_start_idx(start)
+        astar.set_end_idx(end)
+        costs = []
+        for mode in ("octile", "alt"):
+            astar.use_landmarks([table] if mode == "alt" else [])
+            path, ok = astar.path_plan()
+            assert ok
+            costs.append(path_cost(astar, path))
+            expanded[mode] += astar.expansions
+        assert math.isclose(costs[0], costs[1], rel_tol=1e-6)
+    assert expanded["alt"] < expanded["octile"] * 0.7
+
+
+def test_tables_follow_threshold_and_grid():
+    astar = build_astar(make_terrain("obstacles", 41, 2))
+    tables = build_tables(astar, [0.0, 20.0], count=2)
+    astar.use_landmarks(tables.values())
+    astar.set_start_idx((1, 1))
+    end = (39, 39)
+    assert astar.landmark_heuristic(end) is not None
+    astar.thred = 5.0
+    assert astar.landmark_heuristic(end) is None
+    astar.thred = 0.0
+    # 重新建网格后旧表不再使用
+    astar.init_arrays(make_terrain("obstacles", 41, 3).window(0.0205, 0.0205, 21))
+    assert astar.landmark_heuristic(end) is None
+
+    pool = WorkspacePool()
+    with pool.checkout(0.0) as pooled:
+        pooled.load_raster(astar.export_raster())
+        pooled.use_landmarks([LandmarkTable.build(pooled, 2)])
+    assert pool.acquire().landmarks is None
+
+
+def test_snapshot_roundtrip_with_landmarks():
+    src = build_astar(make_terrain("perfect-maze", 41, 4))
+    tables = build_tables(src, [0.0, 1.0], count=3)
+    (start, end), = od_pairs(src, 1, 0)
+    with tempfile.TemporaryDirectory() as d:
+        for path in (os.path.join(d, "tile.npz"), os.path.join(d, "tile")):
+            src.save_snapshot(path, landmarks=list(tables.values()))
+            dst = AStar(0.0)
+            meta, layers = dst.load_snapshot(path)
+            assert sorted(dst.landmarks) == [0.0, 1.0] and meta["landmarks"][0]["cells"]
+            if not path.endswith(".npz"):
+                assert isinstance(dst.landmarks[0.0].dist, np.memmap)
+            assert np.array_equal(dst.landmarks[0.0].dist, tables[0.0].dist)
+            dst.set_start_idx(start)
+            dst.set_end_idx(end)
+            expect = heuristic_grid(tables[0.0].heuristic_to(src, end), src)
+            assert np.array_equal(heuristic_grid(dst.landmark_heuristic(end), dst), expect)
+            assert dst.path_plan()[1]
+
+
+if __name__ == "__main__":
+    test_alt_is_admissible_and_keeps_optimal_cost()
+    test_tables_follow_threshold_and_grid()
+    test_snapshot_roundtrip_with_landmarks()
+    print("ok")
@@ -0,0 +1,31 @@
+from src.core.metrics import Registry
+
+
+def test_render_and_disabled():
+    """直方图/计数器按 Prometheus 文本格式输出；关闭后打点不生效"""
+    registry = Registry()
+    hist = registry.histogram("demo_seconds", "demo", ("stage",), buckets=(0.1, 1.0))
+    counter = registry.counter("demo_total", "demo")
+    registry.add_collector(lambda: [("demo_gauge", "gauge", "demo", [({"cache": "q\"x"}, 3)])])
+
+    hist.observe(0.05, stage="a")
+    hist.observe(0.5, stage="a")
+    hist.observe(5, stage="a")
+    counter.inc(2)
+    text = registry.render()
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="a",le="1"} 2' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="a"} 3' in text
+    assert "demo_total 2" in text
+    assert 'demo_gauge{cache="q\\"x"} 3' in text
+
+    registry.enabled = False
+    hist.observe(0.05, stage="a")
+    counter.inc()
+    assert hist.count(stage="a") == 3 and counter.value() == 2
+
+
+if __name__ == "__main__":
+    test_render_and_disabled()
+    print("ok")
@@ -0,0 +1,95 @@
+import asyncio
+import math
+import random
+from contextlib import asynccontextmanager
+from src.core.astar import AStar
+from src.core.grid import LLA, LLABuffer
+from src.core.path_planner import PathPlan
+from src.sim.area_query import query_area
+from src.sim.maze import obstacle_field
+
+
+def test_one_to_many_matches_pairs():
+    """共享最短路树的一对多结果与逐个 PathPlanPair 的可达性一致，且路径从起点出发"""
+    maze = obstacle_field(60, 60, 0.001, 0.2, 3)
+    query_fn = lambda lla: query_area(lla.lon, lla.lat, maze, 29)
+    free = [(x, y) for y in range(60) for x in range(60) if maze.grid[y][x] == 0]
+    ori = LLA(30 * 0.001, 30 * 0.001, 0)
+    ters = [LLA(x * 0.001, y * 0.001, 0) for x, y in random.Random(0).sample(free, 12)]
+
+    async def run():
+        many = await PathPlan(query_fn).PathPlanOneToMany(ori, ters, 0)
+        pairs = [await PathPlan(query_fn).PathPlanPair(ori, t, 0) for t in ters]
+        return many, pairs
+
+    many, pairs = asyncio.run(run())
+    assert len(many) == len(ters)
+    for (path, ok), (_, ok_pair) in zip(many, pairs):
+        assert ok == ok_pair
+        if ok:
+            assert (path[0].lon, path[0].lat) == (ori.lon, ori.lat)
+
+
+def test_path_plan_many_matches_path_plan():
+    """共享树的各路径代价与逐个 A* 相同；搜索缓冲区与 path_plan 共用且结束后复原"""
+    maze = obstacle_field(50, 50, 0.001, 0.25, 5)
+    astar = AStar(0.0)
+    astar.init(LLABuffer.from_llas(query_area(0.025, 0.025, maze, 49)))
+    free = [(x, y) for x in range(astar.num_lon) for y in range(astar.num_lat) if astar.moveable((x, y))]
+    rng = random.Random(1)
+    start = rng.choice(free)
+    targets = rng.sample(free, 20) + [(0, -1)]
+    cost = lambda path: sum(astar.heuristic8d_idx(a, b) for a, b in zip(path, path[1:]))
+    astar.set_start_idx(start)
+    many = astar.path_plan_many(targets)
+    ws = astar.workspace
+    assert not ws.touched and all(g == math.inf for g in ws.g) and not any(ws.closed)
+    for t in targets[:-1]:
+        astar.set_start_idx(start)
+        astar.set_end_idx(t)
+        path, ok = astar.path_plan()
+        assert (t in many) == ok
+        if ok:
+            assert many[t][0] == start and many[t][-1] == t
+            assert math.isclose(cost(many[t]), cost(path), rel_tol=1e-9)
+    assert (0, -1) not in many and astar.workspace is ws
+
+
+def test_outside_targets_bounded_and_admitted():
+    """瓦片外终点同时至多 max_parallel 个，每个各占一个准入名额；被拒绝的终点单独返回异常"""
+    maze = obstacle_field(120, 120, 0.001, 0.1, 6)
+    query_fn = lambda lla: query_area(lla.lon, lla.lat, maze, 15)
+    ori = LLA(0.005, 0.005, 0)
+    ters = [LLA(0.006, 0.007, 0)] + [LLA(0.03 + 0.01 * i, 0.1, 0) for i in range(6)]
+    state = {"active": 0, "peak": 0, "slots": 0}
+
+    class Rejected(Exception):
+        pass
+
+    @asynccontextmanager
+    async def admit():
+        state["slots"] += 1
+        if state["slots"] == 3:
+            raise Rejected()
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(0.001)
+            yield
+        finally:
+            state["active"] -= 1
+
+    async def run():
+        return await PathPlan(query_fn).PathPlanOneToMany(ori, ters, 0, max_parallel=2, admit=admit)
+
+    results = asyncio.run(run())
+    assert state["slots"] == 1 + 6 and state["peak"] <= 2
+    assert results[0][1] and sum(isinstance(r, Rejected) for r in results) == 1
+    assert all(isinstance(r, tuple) for r in results[1:] if not isinstance(r, Rejected))
+
+
+if __name__ == "__main__":
+    test_one_to_many_matches_pairs()
+    test_path_plan_many_matches_path_plan()
+    test_outside_targets_bounded_and_admitted()
+    print("ok")
@@ -0,0 +1,36 @@
+from src.core.grid import LLABuffer
+from src.core.path_planner import merge_trajectories_smart
+from src.core.postprocess import douglas_peucker, loop_prune, run_stages
+from benchmarks.bench_postprocess import legacy_merge, raw_path
+
+
+def test_pipeline_matches_legacy_merge():
+    """流水线与原逐点实现输出一致（含格距与无格距两种回环判定）"""
+    for seed in range(5):
+        segments = raw_path(600, 6, 0.001, seed)
+        origin, target = segments[0][0], segments[-1][-1]
+        for gap in (0.001, None):
+            expect = legacy_merge(segments, origin=origin, target=target, gap_lon=gap, gap_lat=gap)
+            got = merge_trajectories_smart([LLABuffer.from_llas(s) for s in segments],
+                                           origin=origin, target=target, gap_lon=gap, gap_lat=gap)
+            assert [(p.lon, p.lat, p.alt) for p in got] == [(p.lon, p.lat, p.alt) for p in expect]
+
+
+def test_loop_prune_and_douglas_peucker():
+    """回环收缩回最早的相邻点；Douglas–Peucker 去掉直线上的中间点、保留拐点"""
+    gap = 0.001
+    square = [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (1, 2), (0, 1), (5, 5)]
+    path = LLABuffer([x * gap for x, _ in square], [y * gap for _, y in square], [0.0] * len(square))
+    pruned = run_stages(path, [loop_prune(0.0001, gap, gap)])
+    # (0, 1) 与 (0, 0) 相邻，中间回环被丢弃
+    assert [(round(p.lon / gap), round(p.lat / gap)) for p in pruned] == [(0, 0), (5, 5)]
+
+    line = LLABuffer([i * gap for i in range(10)] + [9 * gap], [0.0] * 10 + [5 * gap], [0.0] * 11)
+    simp = run_stages(line, [douglas_peucker(0.01)])
+    assert [(round(p.lon / gap), round(p.lat / gap)) for p in simp] == [(0, 0), (9, 0), (9, 5)]
+
+
+if __name__ == "__main__":
+    test_pipeline_matches_legacy_merge()
+    test_loop_prune_and_douglas_peucker()
+    print("ok")
@@ -0,0 +1,64 @@
+import asyncio
+import math
+from src.core import metrics
+from src.core.grid import LLA
+from src.core.prefetch import CorridorPrefetcher
+
+
+def test_corridor_points_on_tile_exits():
+    """每个预测点位于上一跳瓦片的边界上（沿起终点直线），终点落入当前瓦片后不再预测"""
+    start, end = LLA(0.0, 0.0, 0), LLA(0.095, 0.019, 0)
+    points = CorridorPrefetcher.corridor_points(start, end, 0.01, 0.01, 20)
+    assert len(points) == 9
+    prev = start
+    for p in points:
+        assert abs(abs(p.lon - prev.lon) - 0.01) < 1e-12 and abs(p.lat - prev.lat) < 0.01
+        assert abs(p.lat - p.lon * 0.2) < 1e-12
+        prev = p
+    assert abs(end.lon - prev.lon) <= 0.01
+    # 纬向为主时按纬向半跨度步进；max_tiles 截断；终点已在瓦片内时为空
+    steep = CorridorPrefetcher.corridor_points(start, LLA(0.01, 0.1, 0), 0.01, 0.005, 3)
+    assert [round(p.lat, 6) for p in steep] == [0.005, 0.01, 0.015]
+    assert CorridorPrefetcher.corridor_points(start, LLA(0.005, -0.009, 0), 0.01, 0.01, 4) == []
+    assert CorridorPrefetcher.corridor_points(start, start, 0.01, 0.01, 4) == []
+
+
+def test_prefetch_counters():
+    """预取按缓存格去重、跳过起点所在格；逐跳查询落在已预取格子计为命中（每格一次）；关闭后未开始的预取计为放弃"""
+    snap = lambda lon, lat: (math.floor(lon / 0.02) * 0.02, math.floor(lat / 0.02) * 0.02)
+    queried = []
+
+    async def query(lla):
+        queried.append((lla.lon, lla.lat))
+        await asyncio.sleep(0)
+        return []
+
+    before = {r: metrics.PREFETCH_TILES.value(result=r) for r in ("issued", "hit", "skipped")}
+
+    async def run():
+        pf = CorridorPrefetcher(query, max_in_flight=1, max_tiles=4, snap=snap)
+        start, end = LLA(0.0, 0.0, 0), LLA(0.1, 0.0, 0)
+        pf.schedule_corridor(start, end, 0.01, 0.01)
+        pf.schedule_corridor(start, end, 0.01, 0.01)
+        await asyncio.sleep(0.01)
+        assert pf.issued == 2 and len(queried) == 2
+        assert sorted(queried) == [(0.02, 0.0), (0.04, 0.0)]
+        pf.note_query(LLA(0.021, 0.001, 0))
+        pf.note_query(LLA(0.039, 0.019, 0))
+        pf.note_query(LLA(0.07, 0.0, 0))
+        assert pf.hits == 1
+        pf.schedule_corridor(LLA(0.03, 0.0, 0), end, 0.01, 0.01)
+        pf.close()
+        await asyncio.sleep(0.01)
+        return pf
+
+    pf = asyncio.run(run())
+    assert pf.issued == 2 and pf.skipped == 1 and len(queried) == 2
+    after = {r: metrics.PREFETCH_TILES.value(result=r) for r in before}
+    assert {r: after[r] - before[r] for r in before} == {"issued": 2, "hit": 1, "skipped": 1}
+
+
+if __name__ == "__main__":
+    test_corridor_points_on_tile_exits()
+    test_prefetch_counters()
+    print("ok")
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from src.services.preload import PreloadJob, RateLimiter, area_points
+from src.services.query import estimate_entry_bytes
+from src.sim.maze import obstacle_field
+from src.sim.sim_query import SimQueryHelper
+
+
+class FlakyHelper(SimQueryHelper):
+    """纬度为 0.01 的一行瓦片上游查询失败"""
+
+    async def _fetch(self, lon, lat, size=3):
+        if abs(lat - 0.01) < 1e-9:
+            raise ConnectionError("upstream down")
+        return await super()._fetch(lon, lat, size)
+
+
+def make_helper(cls=SimQueryHelper, **kwargs):
+    return cls(obstacle_field(40, 40, 0.001, 0.2, 1), range_blocks=5, cache_precision=0.005, **kwargs)
+
+
+def test_area_points_cover_bbox():
+    points = area_points(0.012, 0.021, 0.0, 0.0, 0.005)
+    assert points[0] == (0.0, 0.0) and len(points) == 4 * 6
+    assert {round(lon, 6) for lon, _ in points} == {0.0, 0.005, 0.01, 0.015}
+    assert max(lat for _, lat in points) >= 0.021
+    try:
+        area_points(0, 0, 1, 1, 0)
+        assert False, "step=0 应抛出 ValueError"
+    except ValueError:
+        pass
+
+
+def test_rate_limiter_spacing():
+    async def run(rate, n):
+        limiter = RateLimiter(rate)
+        t0 = time.monotonic()
+        await asyncio.gather(*(limiter.wait() for _ in range(n)))
+        return time.monotonic() - t0
+
+    assert asyncio.run(run(50, 6)) >= 5 / 50 * 0.9
+    assert asyncio.run(run(None, 100)) < 0.05
+
+
+def test_preload_progress_and_failures():
+    helper = make_helper(FlakyHelper)
+    seen = []
+    job = PreloadJob(helper, (0.0, 0.0, 0.02, 0.02), concurrency=3, progress=seen.append)
+    result = asyncio.run(job.run())
+    assert result["state"] == "finished" and result["total"] == 25
+    assert [p["done"] for p in seen] == list(range(1, 26))
+    assert result["failed"] == 5 and result["loaded"] + result["empty"] == 20
+    assert result["loaded"] + result["empty"] + result["failed"] + result["already_cached"] == 25
+
+    # 成功的瓦片已在缓存中；失败的瓦片重试
+    again = asyncio.run(PreloadJob(helper, (0.0, 0.0, 0.02, 0.02)).run())
+    assert again["already_cached"] == 20 and again["failed"] == 5
+
+
+def test_preload_rejects_area_larger_than_cache():
+    helper = make_helper()
+    tile = asyncio.run(helper.query(0.02, 0.02))
+    limit = estimate_entry_bytes(tile) * 10
+    warm = make_helper(cache_max_bytes=limit)
+    asyncio.run(warm.query(0.02, 0.02))
+    try:
+        PreloadJob(warm, (0.0, 0.0, 0.02, 0.02))
+        assert False, "25 个瓦片超过 10 个瓦片的缓存应被拒绝"
+    except ValueError:
+        pass
+    assert PreloadJob(warm, (0.0, 0.0, 0.01, 0.01)).total == 9
+
+    # 缓存为空无法预估：按已加载瓦片推算，超出后提前停止
+    cold = make_helper(cache_max_bytes=limit)
+    result = asyncio.run(PreloadJob(cold, (0.0, 0.0, 0.02, 0.02), concurrency=1).run())
+    assert result["state"] == "too_large" and result["error"]
+    assert PreloadJob.MIN_SAMPLE_TILES <= result["done"] < result["total"]
+
+
+if __name__ == "__main__":
+    test_area_points_cover_bbox()
+    test_rate_limiter_spacing()
+    test_preload_progress_and_failures()
+    test_preload_rejects_area_larger_than_cache()
+    print("ok")
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import pstats
+import tempfile
+from src.core.grid import LLA
+from src.core.executor import ComputeExecutor
+from src.core.path_planner import PathPlan
+from src.services.profiling import ProfileStore, RequestProfiler
+from src.sim.sim_query import SimQueryHelper
+from src.sim.maze import obstacle_field
+
+
+def _plan(profiler: RequestProfiler, executor: ComputeExecutor, force: bool):
+    maze = obstacle_field(100, 100, 0.001, 0.15, 3)
+    helper = SimQueryHelper(maze, range_blocks=15, cache_precision=0.005)
+
+    async def run():
+        async with profiler.profile("/path-planning", {"lon1": 0.005}, force) as record:
+            planner = PathPlan(helper.query_fn, executor=executor)
+            _, ok = await planner.PathPlanPair(LLA(0.005, 0.005, 0), LLA(0.09, 0.08, 0), 0)
+            record["status"] = "success" if ok else "failed"
+        return record
+
+    try:
+        return asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+
+def test_forced_cprofile_includes_compute_stages():
+    """强制 profile 时保存 pstats 可读的 .prof，包含计算线程/进程内的 A* 搜索"""
+    with tempfile.TemporaryDirectory() as d:
+        profiler = RequestProfiler(ProfileStore(d, 10))
+        for executor in (ComputeExecutor("thread", 2), ComputeExecutor("process", 1)):
+            record = _plan(profiler, executor, force=True)
+            meta = profiler.store.get(record["profile_id"])
+            assert meta["mode"] == "cprofile" and meta["status"] == "success"
+            assert meta["params"] == {"lon1": 0.005}
+            stats = pstats.Stats(profiler.store.data_path(meta))
+            assert any(name == "search" and file.endswith("astar.py") for file, _, name in stats.stats)
+
+
+def test_threshold_sampling_and_pruning():
+    """阈值模式只保存超时请求（折叠栈）；超出保留份数时删除最旧的"""
+    with tempfile.TemporaryDirectory() as d:
+        profiler = RequestProfiler(ProfileStore(d, 2), threshold=3600, interval=0.001)
+        assert "profile_id" not in _plan(profiler, ComputeExecutor("thread", 2), force=False)
+        assert profiler.store.list() == []
+
+        profiler.threshold = 1e-6
+        ids = [_plan(profiler, ComputeExecutor("thread", 2), force=False)["profile_id"] for _ in range(3)]
+        listed = profiler.store.list()
+        assert [m["id"] for m in listed] == ids[:0:-1]
+        assert sorted(os.listdir(d)) == sorted(f"{i}{ext}" for i in ids[1:] for ext in (".folded", ".json"))
+        meta = listed[0]
+        assert meta["mode"] == "sampling" and meta["samples"] > 0
+        with open(profiler.store.data_path(meta), encoding="utf-8") as f:
+            folded = f.read()
+        assert "path_planner.py:" in folded
+        assert profiler.store.get("../x") is None
+
+
+if __name__ == "__main__":
+    test_forced_cprofile_includes_compute_stages()
+    test_threshold_sampling_and_pruning()
+    print("ok")
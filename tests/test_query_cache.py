@@ -0,0 +1,62 @@
+import asyncio
+import time
+from src.core.grid import LLA
+from src.services.query import AsyncQueryHelper, estimate_entry_bytes
+
+
+def make_tile(n):
+    return [LLA(121.0 + i * 1e-3, 25.0, -5.0) for i in range(n)]
+
+
+async def fill_cache(helper, entries):
+    async with helper._cache_lock:
+        for key, value in entries:
+            helper._cache_put(key, value)
+    return await helper.get_cache_stats()
+
+
+def test_byte_budget_eviction():
+    tile = make_tile(100)
+    budget = estimate_entry_bytes(tile) * 3
+    helper = AsyncQueryHelper(cache_max_bytes=budget)
+    stats = asyncio.run(fill_cache(helper, [((k,), make_tile(100)) for k in range(5)]))
+    assert stats["cache_size"] == 3
+    assert stats["evictions"] == 2
+    assert stats["cache_bytes"] <= budget
+
+
+def test_negative_ttl():
+    helper = AsyncQueryHelper(cache_negative_ttl=0.05)
+    asyncio.run(fill_cache(helper, [(("ok",), make_tile(4)), (("empty",), None)]))
+    time.sleep(0.1)
+    stats = asyncio.run(helper.get_cache_stats())
+    assert stats["cache_size"] == 1
+
+
+class SlowHelper(AsyncQueryHelper):
+    fetch_count = 0
+
+    async def _fetch(self, lon, lat, size=3):
+        self.fetch_count += 1
+        await asyncio.sleep(0.02)
+        return make_tile(9)
+
+
+def test_concurrent_queries_coalesced():
+    helper = SlowHelper()
+
+    async def main():
+        results = await asyncio.gather(*(helper.query(121.0, 25.0) for _ in range(5)))
+        return results, await helper.get_cache_stats()
+
+    results, stats = asyncio.run(main())
+    assert helper.fetch_count == 1
+    assert stats["coalesced_count"] == 4
+    assert all(r is results[0] for r in results)
+
+
+if __name__ == "__main__":
+    test_byte_budget_eviction()
+    test_negative_ttl()
+    test_concurrent_queries_coalesced()
+    print("OK")
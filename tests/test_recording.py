@@ -0,0 +1,99 @@
+import asyncio
+import os
+import tempfile
+import threading
+from src.core.grid import LLA
+from src.core.path_planner import PathPlan
+from src.services.http_service import path_records
+from src.services.recording import (
+    TrafficRecorder, RecordedQueryHelper, load_tiles, log_files, read_records, route_digest
+)
+from src.sim.sim_query import SimQueryHelper
+from src.sim.maze import obstacle_field
+
+
+async def _plan(helper):
+    planner = PathPlan(helper.query_fn)
+    path, ok = await planner.PathPlanPair(LLA(0.005, 0.005, 0), LLA(0.09, 0.08, 0), 0)
+    return path_records(path) if ok else None
+
+
+def test_recorded_tiles_reproduce_route():
+    """录制上游取到的瓦片后，RecordedQueryHelper 离线重放得到相同路线且不缺瓦片"""
+    maze = obstacle_field(100, 100, 0.001, 0.15, 3)
+    with tempfile.TemporaryDirectory() as d:
+        recorder = TrafficRecorder(os.path.join(d, "req.jsonl"), tiles_path=os.path.join(d, "tiles.jsonl"))
+        live = SimQueryHelper(maze, range_blocks=15, cache_precision=0.005)
+        live.on_fetch = lambda key, result: recorder.record_tile(key, result, live.cache_precision)
+        path = asyncio.run(_plan(live))
+        recorder.flush()
+        assert path and recorder.tiles == live.counters()["miss"]
+
+        tiles, precision = load_tiles(recorder.tiles_path)
+        assert precision == 0.005
+        replayed = RecordedQueryHelper(tiles, cache_precision=precision)
+        assert route_digest(asyncio.run(_plan(replayed))) == route_digest(path)
+        assert replayed.missing_tiles == 0
+        recorder.close()
+
+
+def test_request_log_rotates_and_reads_in_order():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "req.jsonl")
+        recorder = TrafficRecorder(path, max_bytes=600, backups=20)
+        response = {"status": "success", "path": [{"lon": 0.1, "lat": 0.2, "alt": 0}], "cached": True}
+        for i in range(30):
+            recorder.record("/path-planning", {"lon1": i}, 0.01, response if i % 2 else None, "overloaded")
+        recorder.close()
+        assert len(log_files(path)) > 1
+        records = list(read_records(path))
+        assert [r["params"]["lon1"] for r in records] == list(range(30))
+        assert records[0]["result"] == {"status": "overloaded"}
+        assert records[1]["result"]["points"] == 1 and records[1]["result"]["cached"]
+
+
+def test_tile_snapshot_rotates_and_stays_replayable():
+    """瓦片快照按大小轮转、摘要表有上限；load_tiles 合并备份，回调异常不影响查询结果"""
+    maze = obstacle_field(100, 100, 0.001, 0.15, 3)
+    with tempfile.TemporaryDirectory() as d:
+        recorder = TrafficRecorder(os.path.join(d, "req.jsonl"), backups=50, tiles_path=os.path.join(d, "tiles.jsonl"),
+                                   tiles_max_bytes=20000, max_tile_digests=4)
+        live = SimQueryHelper(maze, range_blocks=15, cache_precision=0.005)
+        live.on_fetch = lambda key, result: recorder.record_tile(key, result, live.cache_precision)
+        path = asyncio.run(_plan(live))
+        recorder.flush()
+        assert len(log_files(recorder.tiles_path)) > 1 and len(recorder._tile_digests) <= 4
+        tiles, _ = load_tiles(recorder.tiles_path)
+        assert len(tiles) == live.counters()["miss"]
+        assert route_digest(asyncio.run(_plan(RecordedQueryHelper(tiles, cache_precision=0.005)))) == route_digest(path)
+        recorder.close()
+
+        def broken(key, result):
+            raise OSError("disk full")
+        failing = SimQueryHelper(maze, range_blocks=15, cache_precision=0.005)
+        failing.on_fetch = broken
+        assert route_digest(asyncio.run(_plan(failing))) == route_digest(path)
+
+
+def test_tile_queue_full_drops():
+    with tempfile.TemporaryDirectory() as d:
+        recorder = TrafficRecorder(os.path.join(d, "req.jsonl"), tiles_path=os.path.join(d, "tiles.jsonl"),
+                                   tile_queue=1)
+        gate = threading.Event()
+        recorder._tile_queue.put(("block", gate))
+        original = recorder._write_tile
+        recorder._write_tile = lambda *item: gate.wait(5) if item[0] == "block" else original(*item)
+        for i in range(5):
+            recorder.record_tile((i * 0.005, 0.0, 3), None, 0.005)
+        gate.set()
+        recorder.flush()
+        assert recorder.tiles_dropped >= 4 and recorder.tiles <= 1
+        recorder.close()
+
+
+if __name__ == "__main__":
+    test_recorded_tiles_reproduce_route()
+    test_request_log_rotates_and_reads_in_order()
+    test_tile_snapshot_rotates_and_stays_replayable()
+    test_tile_queue_full_drops()
+    print("ok")
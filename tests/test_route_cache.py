@@ -0,0 +1,89 @@
+import asyncio
+from src.services.route_cache import RouteCache, respond_for_request
+
+
+def make_response(lon1, lat1, lon2, lat2):
+    return {
+        "status": "success",
+        "origin": {"lon": lon1, "lat": lat1, "alt": 0, "query_alt": -5},
+        "target": {"lon": lon2, "lat": lat2, "alt": 0, "query_alt": -5},
+        "path": [{"lon": lon1, "lat": lat1, "alt": 0}, {"lon": 0.5, "lat": 0.5, "alt": -1},
+                 {"lon": lon2, "lat": lat2, "alt": 0}],
+    }
+
+
+def test_hit_coalesce_and_invalidate():
+    versions = {"tile": 1}
+    cache = RouteCache(precision=0.001)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return make_response(0.1, 0.1, 0.9, 0.9), {"tile": versions["tile"]}
+
+    async def main():
+        key = cache.make_key(0.1, 0.1, 0.9, 0.9, 0)
+        first = await asyncio.gather(*(cache.get_or_compute(key, versions.get, compute) for _ in range(3)))
+        hit = await cache.get_or_compute(cache.make_key(0.1002, 0.1, 0.9, 0.9, 0), versions.get, compute)
+        versions["tile"] = 2
+        after_change = await cache.get_or_compute(key, versions.get, compute)
+        return first, hit, after_change
+
+    first, hit, after_change = asyncio.run(main())
+    assert sorted(src for _, src in first) == ["coalesced", "coalesced", "miss"]
+    assert hit[1] == "hit"
+    assert after_change[1] == "miss"
+    assert len(calls) == 2
+    assert cache.invalidated == 1
+
+
+def test_waiters_retry_after_failed_leader():
+    """首个计算超时/抛出异常时等待者不复用该结果，各自重试（彼此之间仍合并），只共享成功结果"""
+    cache = RouteCache(precision=0.001, max_entries=0)
+    key = cache.make_key(0.1, 0.1, 0.9, 0.9, 0)
+    calls = []
+
+    def make_compute(outcome):
+        async def compute():
+            calls.append(outcome)
+            await asyncio.sleep(0.01)
+            if outcome == "overloaded":
+                raise RuntimeError("overloaded")
+            if outcome == "deadline":
+                return {"status": "failed", "error": "deadline_exceeded"}, None
+            return make_response(0.1, 0.1, 0.9, 0.9), None
+        return compute
+
+    async def call(outcome):
+        try:
+            return await cache.get_or_compute(key, lambda k: None, make_compute(outcome))
+        except RuntimeError as e:
+            return str(e)
+
+    async def main():
+        first = await asyncio.gather(call("deadline"), call("ok"), call("ok"))
+        second = await asyncio.gather(call("overloaded"), call("ok"), call("ok"))
+        return first, second
+
+    first, second = asyncio.run(main())
+    for results in (first, second):
+        assert results[0] in ("overloaded", ({"status": "failed", "error": "deadline_exceeded"}, "miss"))
+        assert sorted(src for _, src in results[1:]) == ["coalesced", "miss"]
+        assert all(r[0]["status"] == "success" for r in results[1:])
+    assert calls == ["deadline", "ok", "overloaded", "ok"]
+    assert cache.retried == 4 and cache.coalesced == 2
+
+
+def test_respond_for_request_uses_exact_endpoints():
+    res = respond_for_request(make_response(0.1, 0.1, 0.9, 0.9), 0.1002, 0.1001, 0.9, 0.8999)
+    assert res["path"][0]["lon"] == 0.1002 and res["path"][-1]["lat"] == 0.8999
+    assert res["origin"]["query_alt"] == -5
+    assert len(res["path"]) == 3
+
+
+if __name__ == "__main__":
+    test_hit_coalesce_and_invalidate()
+    test_waiters_retry_after_failed_leader()
+    test_respond_for_request_uses_exact_endpoints()
+    print("OK")
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import time
+import httpx
+from src.services import http_service as hs
+from src.services.admission import AdmissionController
+from src.sim.maze import obstacle_field
+from src.sim.sim_query import SimQueryHelper
+
+ROUTE = {"lon1": 0.001, "lat1": 0.001, "lon2": 0.118, "lat2": 0.118}
+
+
+def with_sim_service(fn, latency: float = 0.0):
+    """以仿真地形替换全局查询助手与准入控制后执行 fn(helper, admission)"""
+    saved = hs._global_query_helper, hs.planning_admission
+    helper = SimQueryHelper(obstacle_field(120, 120, 0.001, 0.15, 4), range_blocks=15, latency=latency,
+                            cache_precision=0.005)
+    hs._global_query_helper = helper
+    hs.planning_admission = AdmissionController(2, 4)
+    try:
+        return fn(helper, hs.planning_admission)
+    finally:
+        hs._global_query_helper, hs.planning_admission = saved
+
+
+def fetch_stream(fmt: str) -> str:
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=hs.app), base_url="http://test") as client:
+            resp = await client.get("/path-planning/stream", params={**ROUTE, "format": fmt})
+            assert resp.headers["content-type"].startswith(
+                "text/event-stream" if fmt == "sse" else "application/x-ndjson")
+            return resp.text
+    return with_sim_service(lambda helper, admission: asyncio.run(run()))
+
+
+def check_records(records):
+    kinds = [kind for kind, _ in records]
+    assert kinds[0] == "segment" and kinds[-2:] == ["result", "summary"]
+    assert set(kinds[:-2]) == {"segment"}
+    segments = [r for kind, r in records if kind == "segment"]
+    assert [s["index"] for s in segments] == list(range(len(segments))) and len(segments) > 1
+    assert all(s["points"] for s in segments)
+    result, summary = records[-2][1], records[-1][1]
+    assert result["status"] == "success" and result["path"]
+    assert summary["status"] == "success" and summary["segments"] == len(segments)
+    assert 0 <= summary["first_segment_s"] <= summary["elapsed_s"]
+
+
+def test_ndjson_framing():
+    text = fetch_stream("ndjson")
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    records = [(r.pop("type"), r) for r in map(json.loads, lines)]
+    check_records(records)
+
+
+def test_sse_framing():
+    text = fetch_stream("sse")
+    events = text.split("\n\n")
+    assert events[-1] == ""
+    records = []
+    for event in events[:-1]:
+        kind_line, data_line = event.split("\n")
+        assert kind_line.startswith("event: ") and data_line.startswith("data: ")
+        records.append((kind_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    check_records(records)
+
+
+def test_disconnect_cancels_planning():
+    """读到第一段后关闭流（客户端断开）：后台规划被取消、准入名额归还，不再向上游查询"""
+    async def run(helper, admission):
+        gen = hs.stream_route(*ROUTE.values(), 0, time.time() + 30, "ndjson")
+        first = json.loads(await gen.__anext__())
+        assert first["type"] == "segment" and admission.running == 1
+        await gen.aclose()
+        for _ in range(100):
+            if admission.running == 0:
+                break
+            await asyncio.sleep(0.01)
+        fetched = helper.fetch_count
+        await asyncio.sleep(0.2)
+        return admission.running, fetched, helper.fetch_count
+
+    running, before, after = with_sim_service(lambda helper, admission: asyncio.run(run(helper, admission)),
+                                              latency=0.02)
+    assert running == 0 and after == before
+
+
+if __name__ == "__main__":
+    test_ndjson_framing()
+    test_sse_framing()
+    test_disconnect_cancels_planning()
+    print("ok")
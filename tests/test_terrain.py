@@ -0,0 +1,71 @@
+import asyncio
+import os
+import tempfile
+from collections import deque
+import numpy as np
+from src.core.grid import LLA
+from src.core.path_planner import PathPlan
+from src.sim import terrain
+from src.sim.area_query import query_area
+from src.sim.sim_query import SimQueryHelper
+from src.sim.maze import obstacle_field
+
+
+def test_window_matches_query_area():
+    """Terrain.window 与 Maze 上的 query_area 返回相同的点与顺序（含边界收缩）"""
+    maze = obstacle_field(61, 47, 0.001, 0.2, 3)
+    t = terrain.Terrain.from_maze(maze)
+    for lon, lat in [(0, 0), (0.03, 0.02), (0.06, 0.046), (0.01, 0.045)]:
+        for range_blocks in (3, 5, 21, 99):
+            expect = [(p.lon, p.lat, p.alt) for p in query_area(lon, lat, maze, range_blocks)]
+            assert [(p.lon, p.lat, p.alt) for p in query_area(lon, lat, t, range_blocks)] == expect
+
+
+def test_generators_are_seeded():
+    for gen in terrain.GENERATORS.values():
+        a, b = gen(300, 200, 0.001, seed=5), gen(300, 200, 0.001, seed=5)
+        assert a.altitude.shape == (200, 300) and a.altitude.dtype == np.float32
+        assert np.array_equal(a.altitude, b.altitude)
+        assert not np.array_equal(a.altitude, gen(300, 200, 0.001, seed=6).altitude)
+
+
+def test_maze_is_connected_and_densities_hold():
+    t = terrain.maze(41, 31, 0.001, seed=2)
+    free = {(x, y) for y in range(31) for x in range(41) if t.moveable((x, y))}
+    start = next(iter(free))
+    seen, queue = {start}, deque([start])
+    while queue:
+        x, y = queue.popleft()
+        for nxt in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if nxt in free and nxt not in seen:
+                seen.add(nxt)
+                queue.append(nxt)
+    assert seen == free
+
+    field = terrain.obstacles(500, 400, 0.001, density=0.3, seed=1)
+    assert abs(float((field.altitude[1:-1, 1:-1] > 0).mean()) - 0.3) < 0.01
+    assert (field.altitude[[0, -1], :] <= 0).all() and (field.altitude[:, [0, -1]] <= 0).all()
+    land = terrain.fractal(400, 400, 0.001, seed=1, water=0.7)
+    assert abs(float((land.altitude <= 0).mean()) - 0.7) < 0.02
+
+
+def test_plan_on_saved_terrain():
+    """保存为 .npy 后以内存映射加载，经 SimQueryHelper 规划成功"""
+    t = terrain.obstacles(120, 120, 0.001, density=0.15, seed=4)
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "t.npy")
+        t.save(path)
+        loaded = terrain.Terrain.load(path, 0.001)
+        assert isinstance(loaded.altitude, np.memmap)
+        helper = SimQueryHelper(loaded, range_blocks=15, cache_precision=0.005)
+        planner = PathPlan(helper.query_fn)
+        _, ok = asyncio.run(planner.PathPlanPair(LLA(0.0, 0.0, 0), LLA(0.119, 0.119, 0), 0))
+        assert ok
+
+
+if __name__ == "__main__":
+    test_window_matches_query_area()
+    test_generators_are_seeded()
+    test_maze_is_connected_and_densities_hold()
+    test_plan_on_saved_terrain()
+    print("ok")
@@ -0,0 +1,112 @@
+import asyncio
+import random
+import httpx
+import numpy as np
+from src.core.thresholds import connected, free_mask, lowest_feasible
+from src.services import http_service as hs
+from src.services.admission import AdmissionController
+from src.services.route_cache import RouteCache
+from src.sim.maze import obstacle_field
+from src.sim.sim_query import SimQueryHelper
+
+
+def bfs_connected(free, a, b):
+    if not free[a] or not free[b]:
+        return False
+    seen, stack = {a}, [a]
+    while stack:
+        x, y = stack.pop()
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                n = (x + dx, y + dy)
+                if 0 <= n[0] < free.shape[0] and 0 <= n[1] < free.shape[1] and free[n] and n not in seen:
+                    seen.add(n)
+                    stack.append(n)
+    return b in seen
+
+
+def test_connectivity_and_lowest_threshold():
+    """向量化连通性与 BFS 一致；二分得到的最小阈值恰好是连通/不连通的分界"""
+    rng = random.Random(0)
+    for _ in range(20):
+        alt = np.array([[-rng.uniform(0, 10) for _ in range(15)] for _ in range(12)])
+        a, b = (0, 0), (11, 14)
+        for t in (-8.0, -5.0, -2.0):
+            assert connected(free_mask(alt, t), a, b) == bfs_connected(free_mask(alt, t), a, b)
+        low = lowest_feasible(alt, a, b)
+        assert low is not None
+        assert connected(free_mask(alt, low), a, b)
+        below = alt[alt < low]
+        if len(below):
+            assert not connected(free_mask(alt, below.max()), a, b)
+        # 与逐个候选阈值 BFS 的结果一致
+        expect = next(t for t in np.unique(alt) if bfs_connected(free_mask(alt, t), a, b))
+        assert low == expect
+
+
+def test_serpentine_tile():
+    """蛇形通道：连通路径长度与格子数同阶，标号/并查集仍一次完成；抬高一个缺口后瓶颈随之升高"""
+    n = 201
+    alt = np.full((n, n), -5.0)
+    for i, x in enumerate(range(1, n - 1, 2)):
+        alt[x, :] = 10.0
+        alt[x, 0 if i % 2 else -1] = -5.0
+    a, b = (0, 0), (n - 1, n - 1)
+    assert connected(free_mask(alt, 0.0), a, b) is True
+    assert lowest_feasible(alt, a, b) == -5.0
+    alt[101, 0 if 50 % 2 else -1] = 3.0
+    assert not connected(free_mask(alt, 0.0), a, b)
+    assert lowest_feasible(alt, a, b) == 3.0
+
+
+def post_thresholds(body: dict, admission: AdmissionController) -> httpx.Response:
+    """以仿真地形替换全局查询助手、关闭路线缓存后，进程内调用多阈值接口"""
+    saved = hs._global_query_helper, hs.route_cache, hs.planning_admission
+    hs._global_query_helper = SimQueryHelper(obstacle_field(40, 40, 0.001, 0.15, 2), range_blocks=15,
+                                             cache_precision=0.005)
+    hs.route_cache = RouteCache(max_entries=0)
+    hs.planning_admission = admission
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=hs.app), base_url="http://test") as client:
+            return await client.post("/path-planning/thresholds", json=body)
+
+    try:
+        return asyncio.run(run())
+    finally:
+        hs._global_query_helper, hs.route_cache, hs.planning_admission = saved
+
+
+def test_thresholds_endpoint_target_in_origin_tile():
+    """终点在起点瓦片内：可行性为 JSON 布尔值，不连通的阈值不做搜索"""
+    body = {"lon1": 0.001, "lat1": 0.001, "lon2": 0.006, "lat2": 0.006, "alts": [-6, 0, 2], "search_lowest": True}
+    for plan in (False, True):
+        admission = AdmissionController(2, 8)
+        resp = post_thresholds({**body, "plan": plan}, admission)
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["status"] == "success" and data["target_in_origin_grid"] is True
+        assert data["lowest_feasible_alt"] == 1.0
+        results = data["results"]
+        assert [r["feasible"] for r in results] == [False, False, True]
+        assert [r.get("error") for r in results[:2]] == ["infeasible", "infeasible"]
+        assert results[2]["status"] == "success" and ("path" in results[2]) == plan
+        # 可行性判断一个名额，唯一可行的阈值规划时另占一个
+        assert admission.admitted == 1 + plan and admission.running == 0
+
+
+def test_thresholds_planning_admitted_per_alt():
+    """可行性判断结束后即归还名额；每个可行阈值的规划单独准入，与其他请求一样受并发上限约束"""
+    admission = AdmissionController(1, 4)
+    body = {"lon1": 0.001, "lat1": 0.001, "lon2": 0.008, "lat2": 0.002, "alts": [0, 2, 4]}
+    data = post_thresholds(body, admission).json()
+    assert [r["status"] for r in data["results"]] == ["success"] * 3
+    assert admission.admitted == 4 and admission.running == 0 and admission.shed_queue_full == 0
+
+
+if __name__ == "__main__":
+    test_connectivity_and_lowest_threshold()
+    test_serpentine_tile()
+    test_thresholds_endpoint_target_in_origin_tile()
+    test_thresholds_planning_admitted_per_alt()
+    print("ok")
@@ -0,0 +1,39 @@
+import asyncio
+from src.core.grid import LLA
+from src.core.executor import ComputeExecutor
+from src.core.path_planner import PathPlan
+from src.core.trace import PlanTrace
+from src.sim.sim_query import SimQueryHelper
+from src.sim.maze import obstacle_field
+
+
+def test_trace_records_hops_and_queries():
+    """PathPlan 传入 PlanTrace 后记录每跳网格、候选终点搜索统计、合并前后点数与查询缓存结果"""
+    maze = obstacle_field(100, 100, 0.001, 0.15, 3)
+    helper = SimQueryHelper(maze, range_blocks=15, cache_precision=0.005)
+
+    async def run(executor):
+        trace = PlanTrace()
+        planner = PathPlan(helper.query_fn, executor=executor, trace=trace)
+        path, ok = await planner.PathPlanPair(LLA(0.005, 0.005, 0), LLA(0.09, 0.08, 0), 0)
+        return path, ok, trace.to_dict()
+
+    for executor in (ComputeExecutor("inline"), ComputeExecutor("process", 1)):
+        try:
+            path, ok, trace = asyncio.run(run(executor))
+        finally:
+            executor.shutdown()
+        assert ok and trace["outcome"] == "reached"
+        assert trace["summary"]["hops"] == len(trace["hops"]) > 1
+        hop = trace["hops"][0]
+        assert hop["grid"]["num_lon"] > 0 and hop["tile_points"] > 0
+        assert hop["candidates"] and hop["candidates"][-1]["found"]
+        assert all(c["expanded"] > 0 and c["pushed"] >= c["expanded"] for c in hop["candidates"])
+        assert trace["merge"]["points_after"] == len(path) <= trace["merge"]["points_before"]
+        assert {q["cache"] for q in trace["queries"]} <= {"hit", "miss", "coalesced", "error"}
+        assert trace["queries"]
+
+
+if __name__ == "__main__":
+    test_trace_records_hops_and_queries()
+    print("ok")
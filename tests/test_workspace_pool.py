@@ -0,0 +1,120 @@
+import asyncio
+import random
+import threading
+from src.core.astar import AStar
+from src.core.executor import ComputeExecutor
+from src.core.grid import LLA, LLABuffer
+from src.core.path_planner import PathPlan
+from src.core.workspace import WorkspacePool
+from src.sim.area_query import query_area
+from src.sim.maze import obstacle_field
+
+
+def test_pool_reuses_workspaces():
+    pool = WorkspacePool(max_idle=1)
+    a = pool.acquire(0.0)
+    b = pool.acquire(0.0)
+    assert a is not b and pool.stats()["high_water"] == 2
+    ws = a.workspace
+    a.deadline, a.expansions, a.request_tag = 1.0, 5, "req-1"
+    pool.release(a)
+    pool.release(b)
+    stats = pool.stats()
+    assert stats["idle"] == 1 and stats["in_use"] == 0 and stats["discarded"] == 1
+    with pool.checkout(5.0) as c:
+        assert c is a and c.workspace is ws and c.thred == 5.0
+        assert c.altitude == [] and c.deadline is None and c.expansions == 0
+        # 请求级属性整体清空，后来新增的属性也不会残留
+        assert not hasattr(c, "request_tag")
+    assert pool.stats()["created"] == 2 and pool.stats()["checkouts"] == 3
+
+
+def test_pooled_search_matches_fresh():
+    """复用工作区（不同瓦片、不同阈值交替）的 A* 结果与每次新建 AStar 完全一致"""
+    maze = obstacle_field(80, 80, 0.001, 0.25, 7)
+    rng = random.Random(0)
+    pool = WorkspacePool(max_idle=1)
+    for _ in range(20):
+        lon, lat = rng.randrange(10, 70) * 0.001, rng.randrange(10, 70) * 0.001
+        tile = LLABuffer.from_llas(query_area(lon, lat, maze, rng.choice((5, 9, 21))))
+        thred = rng.choice((0.0, 0.5))
+        start, end = rng.sample(tile.tolist(), 2)
+        fresh = AStar(thred)
+        fresh.init(tile)
+        fresh.set_start(start)
+        fresh.set_end(end)
+        expect = fresh.path_plan()
+        with pool.checkout(thred) as astar:
+            astar.init(tile)
+            astar.set_start(start)
+            astar.set_end(end)
+            assert astar.path_plan() == expect
+            assert astar.expansions == fresh.expansions
+
+
+def test_repeated_pair_on_same_planner():
+    """同一 PathPlan 实例重复规划同一多跳路线：已访问起点不跨调用累积"""
+    maze = obstacle_field(120, 120, 0.001, 0.15, 4)
+    query_fn = lambda lla: query_area(lla.lon, lla.lat, maze, 15)
+    ori, ter = LLA(0.001, 0.001, 0), LLA(0.118, 0.118, 0)
+    pool = WorkspacePool()
+
+    async def run():
+        with PathPlan(query_fn, workspace_pool=pool) as planner:
+            return [await planner.PathPlanPair(ori, ter, 0) for _ in range(3)]
+
+    results = asyncio.run(run())
+    assert all(ok for _, ok in results)
+    assert results[0][0].tolist() == results[1][0].tolist() == results[2][0].tolist()
+    assert pool.stats()["in_use"] == 0 and pool.stats()["idle"] == 1
+
+
+def test_release_waits_for_cancelled_compute_job():
+    """请求被取消时线程池中的任务仍在使用工作区：release 推迟到任务结束，期间不会被别的请求借出"""
+    pool = WorkspacePool()
+    executor = ComputeExecutor("thread", 1, 0)
+    started, finish = threading.Event(), threading.Event()
+    seen = []
+
+    def busy(astar: AStar):
+        started.set()
+        finish.wait(5)
+        seen.append(astar.thred)
+
+    async def run():
+        planner = PathPlan(lambda lla: None, executor=executor, workspace_pool=pool)
+        planner._AStar.thred = 7.0
+        task = asyncio.ensure_future(planner._run(busy, planner._AStar))
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        planner.release()
+        assert pool.stats()["idle"] == 0 and pool.stats()["in_use"] == 1
+        other = pool.acquire()
+        assert other is not planner._AStar
+        pool.release(other)
+        finish.set()
+        for _ in range(500):
+            if pool.stats()["in_use"] == 0:
+                break
+            await asyncio.sleep(0.01)
+
+    try:
+        asyncio.run(run())
+    finally:
+        finish.set()
+        executor.shutdown()
+    assert seen == [7.0]
+    assert pool.stats()["in_use"] == 0 and pool.stats()["idle"] == 2
+
+
+if __name__ == "__main__":
+    test_pool_reuses_workspaces()
+    test_pooled_search_matches_fresh()
+    test_repeated_pair_on_same_planner()
+    test_release_waits_for_cancelled_compute_job()
+    print("ok")